@@ -0,0 +1,118 @@
+import csv
+import importlib.util
+from pathlib import Path
+
+import torch
+import torchvision.transforms as transforms
+from PIL import Image
+from torch.utils.data import Dataset, DataLoader, random_split
+
+CLASS_INDEX = {"sin_octogono": 0, "con_octogono": 1}
+DATASET_STORE_PATH = Path(__file__).resolve().parent.parent / "scrapper_y_tag" / "src" / "utils" / "dataset_store.py"
+
+# Mismo preprocesamiento que usa la API al servir el modelo
+DEFAULT_TRANSFORM = transforms.Compose([
+    transforms.Resize((500, 500)),
+    transforms.ToTensor(),
+    transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225]),
+])
+
+
+def read_labels(csv_path, images_root):
+    """
+    Lee etiquetas_octogonos.csv y devuelve las imágenes disponibles localmente.
+
+    Args:
+        csv_path (str): Ruta al CSV con columnas image,label.
+        images_root (str): Directorio desde el cual se resuelven las rutas de la columna image.
+
+    Returns:
+        List[Tuple[Path, int]]: Pares (ruta de la imagen, clase) para las filas con etiqueta válida e imagen existente.
+    """
+    images_root = Path(images_root)
+    samples = []
+    with open(csv_path, newline="") as f:
+        for row in csv.DictReader(f):
+            label = CLASS_INDEX.get(row["label"].strip().lower())
+            path = images_root / row["image"]
+            if label is not None and path.exists():
+                samples.append((path, label))
+    return samples
+
+
+def _dataset_store_module():
+    # Se carga por ruta: el paquete utils del scraper choca con Clasificador/utils.py
+    spec = importlib.util.spec_from_file_location("dataset_store", DATASET_STORE_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def read_labels_from_store(dataset_dir, images_root, label=None, brand=None):
+    """
+    Igual que read_labels pero leyendo del dataset Parquet del scraper (ver
+    scrapper_y_tag/src/utils/dataset_store.py), con filtros por etiqueta o marca.
+
+    Args:
+        dataset_dir (str): Directorio del DatasetStore.
+        images_root (str): Directorio desde el cual se resuelven las rutas de las imágenes.
+        label (str, optional): Solo imágenes con esta etiqueta.
+        brand (str, optional): Solo productos de esta marca.
+
+    Returns:
+        List[Tuple[Path, int]]: Pares (ruta de la imagen, clase) con imagen existente.
+    """
+    store = _dataset_store_module().DatasetStore(dataset_dir)
+    table = store.labeled_products(label=label, brand=brand).select(["image", "label"])
+    images_root = Path(images_root)
+    samples = []
+    for image, name in zip(table.column("image").to_pylist(), table.column("label").to_pylist()):
+        target = CLASS_INDEX.get((name or "").strip().lower())
+        path = images_root / image
+        if target is not None and path.exists():
+            samples.append((path, target))
+    return samples
+
+
+class OctagonDataset(Dataset):
+    def __init__(self, samples, transform=DEFAULT_TRANSFORM):
+        """
+        Args:
+            samples (List[Tuple[Path, int]]): Pares (ruta de la imagen, clase), por ejemplo los de read_labels.
+            transform (callable): Transformación aplicada a cada imagen PIL.
+        """
+        self.samples = samples
+        self.transform = transform
+
+    def __len__(self):
+        return len(self.samples)
+
+    def __getitem__(self, idx):
+        path, label = self.samples[idx]
+        image = Image.open(path).convert("RGB")
+        return self.transform(image), label
+
+
+def make_loaders(csv_path, images_root, batch_size=16, val_fraction=0.2, transform=DEFAULT_TRANSFORM, num_workers=0, seed=42):
+    """
+    Arma los DataLoaders de entrenamiento y validación a partir del CSV de etiquetas.
+
+    Args:
+        csv_path (str): Ruta a etiquetas_octogonos.csv.
+        images_root (str): Directorio donde están las imágenes scrapeadas.
+        batch_size (int): Tamaño de lote (default: 16).
+        val_fraction (float): Fracción de los datos para validación (default: 0.2).
+        transform (callable): Transformación de las imágenes (default: la de la API).
+        num_workers (int): Procesos del DataLoader (default: 0).
+        seed (int): Semilla para el split (default: 42).
+
+    Returns:
+        Tuple[DataLoader, DataLoader]: Loaders de entrenamiento y validación.
+    """
+    dataset = OctagonDataset(read_labels(csv_path, images_root), transform)
+    n_val = int(len(dataset) * val_fraction)
+    generator = torch.Generator().manual_seed(seed)
+    train_set, val_set = random_split(dataset, [len(dataset) - n_val, n_val], generator=generator)
+    train_loader = DataLoader(train_set, batch_size=batch_size, shuffle=True, num_workers=num_workers)
+    val_loader = DataLoader(val_set, batch_size=batch_size, shuffle=False, num_workers=num_workers)
+    return train_loader, val_loader
@@ -0,0 +1,274 @@
+"""
+Destilación de ResNet18_4 (maestro) a un clasificador compacto (alumno).
+
+El alumno es la misma arquitectura ResNet18_4 con los anchos de todos los
+grupos de canales escalados por --width-mult. Se guarda en el formato de
+los modelos podados ({"arch", "state_dict"}), así OctagonDetector y
+build_model lo cargan sin cambios. La API sirve a 500x500, que es la
+resolución de entrenamiento por defecto (--size); con una menor el modelo
+igual carga (el avgpool es adaptativo) y la resolución queda registrada en
+arch["input_size"].
+
+Se entrena con la pérdida de destilación (KL entre las salidas suavizadas
+del maestro y del alumno) combinada con las etiquetas reales de
+etiquetas_octogonos.csv. Los logits del maestro se calculan una sola vez y
+se guardan en un cache, así el maestro no se vuelve a correr en cada época.
+
+Uso:
+    python distillation.py --teacher ../api/model/Resnet18_podado.pth \
+        --labels ../etiquetas_octogonos.csv --images-root .. \
+        --size 500 --width-mult 0.25 --epochs 20 --output ../api/model/student_025.pth
+"""
+import argparse
+import sys
+from pathlib import Path
+
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+import torchvision.transforms as transforms
+from PIL import Image
+from torch.utils.data import Dataset, DataLoader
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "api"))
+
+from model.predictor import DEFAULT_WIDTHS, OctagonDetector, ResNet18_4, model_architecture  # noqa: E402
+from utils import train  # noqa: E402
+from dataset import DEFAULT_TRANSFORM, OctagonDataset, read_labels  # noqa: E402
+from pruning import count_parameters, measure_latency  # noqa: E402
+
+
+def student_transform(size):
+    return transforms.Compose([
+        transforms.Resize((size, size)),
+        transforms.ToTensor(),
+        transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225]),
+    ])
+
+
+def student_widths(width_mult):
+    """
+    Anchos de ResNet18_4 escalados por width_mult.
+
+    Args:
+        width_mult (float): Factor de escala de cada grupo de canales, en (0, 1].
+
+    Returns:
+        dict: Anchos para ResNet18_4(widths=...).
+    """
+    if not 0 < width_mult <= 1:
+        raise ValueError(f"width_mult debe estar en (0, 1], no {width_mult}")
+    return {name: max(1, int(round(width * width_mult))) for name, width in DEFAULT_WIDTHS.items()}
+
+
+def build_student(width_mult=0.25, in_channels=3, n_classes=2):
+    return ResNet18_4(in_channels=in_channels, n_classes=n_classes, widths=student_widths(width_mult))
+
+
+def precompute_teacher_logits(teacher, samples, cache_path, device, batch_size=32, teacher_id=None):
+    """
+    Calcula (o lee del cache) los logits del maestro para cada imagen.
+
+    Args:
+        teacher (torch.nn.Module): Modelo maestro (ResNet18_4).
+        samples (List[Tuple[Path, int]]): Imágenes y etiquetas, por ejemplo las de read_labels.
+        cache_path (str): Archivo .pt donde se guardan los logits.
+        device (str): Dispositivo donde corre el maestro.
+        batch_size (int): Tamaño de lote para la inferencia del maestro (default: 32).
+        teacher_id (str, optional): Identificador del maestro; si cambia se invalida el cache.
+
+    Returns:
+        torch.Tensor: Logits del maestro de forma (N, n_classes), en el orden de samples.
+    """
+    keys = [str(path) for path, _ in samples]
+    cache_path = Path(cache_path)
+    if cache_path.exists():
+        cache = torch.load(cache_path, weights_only=True)
+        if cache["keys"] == keys and cache.get("teacher_id") == teacher_id:
+            print(f"Usando logits del maestro cacheados en {cache_path}")
+            return cache["logits"]
+
+    loader = DataLoader(OctagonDataset(samples, DEFAULT_TRANSFORM), batch_size=batch_size, shuffle=False)
+    teacher = teacher.to(device).eval()
+    logits = []
+    with torch.no_grad():
+        for x, _ in loader:
+            logits.append(teacher(x.to(device)).cpu())
+    logits = torch.cat(logits)
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    torch.save({"keys": keys, "teacher_id": teacher_id, "logits": logits}, cache_path)
+    print(f"Logits del maestro guardados en {cache_path}")
+    return logits
+
+
+class DistillationDataset(Dataset):
+    """
+    Devuelve (imagen a la resolución del alumno, objetivo), donde el objetivo
+    es un tensor [etiqueta, logits del maestro...]. Así utils.train puede
+    usarse sin cambios: sólo mueve x e y al dispositivo y llama al criterio.
+    """
+
+    def __init__(self, samples, teacher_logits, transform):
+        self.samples = samples
+        self.teacher_logits = teacher_logits
+        self.transform = transform
+
+    def __len__(self):
+        return len(self.samples)
+
+    def __getitem__(self, idx):
+        path, label = self.samples[idx]
+        image = self.transform(Image.open(path).convert("RGB"))
+        target = torch.cat([torch.tensor([float(label)]), self.teacher_logits[idx].float()])
+        return image, target
+
+
+class DistillationLoss(nn.Module):
+    def __init__(self, temperature=4.0, alpha=0.7):
+        """
+        Args:
+            temperature (float): Temperatura para suavizar las salidas (default: 4.0).
+            alpha (float): Peso de la pérdida de destilación frente a la de etiquetas reales (default: 0.7).
+        """
+        super(DistillationLoss, self).__init__()
+        self.temperature = temperature
+        self.alpha = alpha
+
+    def forward(self, output, target):
+        labels = target[:, 0].long()
+        teacher_logits = target[:, 1:]
+        t = self.temperature
+        soft = F.kl_div(
+            F.log_softmax(output / t, dim=1), F.softmax(teacher_logits / t, dim=1), reduction="batchmean"
+        ) * (t * t)
+        hard = F.cross_entropy(output, labels)
+        return self.alpha * soft + (1 - self.alpha) * hard
+
+
+def split_samples(samples, val_fraction=0.2, seed=42):
+    generator = torch.Generator().manual_seed(seed)
+    order = torch.randperm(len(samples), generator=generator).tolist()
+    n_val = int(len(samples) * val_fraction)
+    return order[n_val:], order[:n_val]
+
+
+def train_distillation(student, teacher, samples, device, cache_path, size=500, temperature=4.0, alpha=0.7,
+                       lr=1e-3, epochs=20, patience=5, batch_size=32, val_fraction=0.2, teacher_id=None):
+    """
+    Entrena el alumno por destilación usando utils.train.
+
+    Args:
+        student (torch.nn.Module): Modelo alumno.
+        teacher (torch.nn.Module): Modelo maestro.
+        samples (List[Tuple[Path, int]]): Imágenes y etiquetas.
+        device (str): Dispositivo de entrenamiento.
+        cache_path (str): Cache de logits del maestro.
+        size (int): Resolución de entrada del alumno (default: 500).
+        temperature (float): Temperatura de la destilación (default: 4.0).
+        alpha (float): Peso de la pérdida de destilación (default: 0.7).
+        lr (float): Learning rate (default: 1e-3).
+        epochs (int): Épocas de entrenamiento (default: 20).
+        patience (int): Paciencia del early stopping (default: 5).
+        batch_size (int): Tamaño de lote (default: 32).
+        val_fraction (float): Fracción de validación (default: 0.2).
+        teacher_id (str, optional): Identificador del maestro para el cache.
+
+    Returns:
+        Tuple[List[float], List[float], List[int]]: Errores de entrenamiento, de validación e índices de validación.
+    """
+    logits = precompute_teacher_logits(teacher, samples, cache_path, device, teacher_id=teacher_id)
+    train_idx, val_idx = split_samples(samples, val_fraction)
+    transform = student_transform(size)
+    train_set = DistillationDataset([samples[i] for i in train_idx], logits[train_idx], transform)
+    val_set = DistillationDataset([samples[i] for i in val_idx], logits[val_idx], transform)
+    train_loader = DataLoader(train_set, batch_size=batch_size, shuffle=True)
+    val_loader = DataLoader(val_set, batch_size=batch_size, shuffle=False)
+
+    student = student.to(device)
+    optimizer = torch.optim.Adam(student.parameters(), lr=lr)
+    criterion = DistillationLoss(temperature, alpha)
+    train_errors, val_errors = train(
+        student, optimizer, criterion, train_loader, val_loader, device,
+        do_early_stopping=True, patience=patience, epochs=epochs,
+    )
+    return train_errors, val_errors, val_idx
+
+
+def compare_models(teacher, student, samples, teacher_logits, size, device="cpu"):
+    """
+    Compara accuracy y latencia de maestro y alumno sobre las mismas imágenes.
+    La accuracy del maestro sale de los logits cacheados.
+
+    Returns:
+        dict: Accuracy, parámetros y latencia de cada modelo, más speedup y diferencia de accuracy.
+    """
+    labels = torch.tensor([label for _, label in samples])
+    teacher_acc = (teacher_logits.argmax(dim=1) == labels).float().mean().item()
+
+    student = student.to(device).eval()
+    loader = DataLoader(OctagonDataset(samples, student_transform(size)), batch_size=32, shuffle=False)
+    preds = []
+    with torch.no_grad():
+        for x, _ in loader:
+            preds.append(student(x.to(device)).argmax(dim=1).cpu())
+    student_acc = (torch.cat(preds) == labels).float().mean().item()
+
+    teacher_latency = measure_latency(teacher, (1, 3, 500, 500), device=device)
+    student_latency = measure_latency(student, (1, 3, size, size), device=device)
+    return {
+        "teacher": {"accuracy": teacher_acc, "parameters": count_parameters(teacher), "latency_ms": teacher_latency * 1000},
+        "student": {"accuracy": student_acc, "parameters": count_parameters(student), "latency_ms": student_latency * 1000},
+        "speedup": teacher_latency / student_latency,
+        "accuracy_delta": student_acc - teacher_acc,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Destilación de ResNet18_4 a un alumno compacto")
+    parser.add_argument("--teacher", type=str, required=True, help="Checkpoint del maestro")
+    parser.add_argument("--labels", type=str, required=True, help="etiquetas_octogonos.csv")
+    parser.add_argument("--images-root", type=str, default="..")
+    parser.add_argument("--cache", type=str, default="teacher_logits.pt", help="Cache de logits del maestro")
+    parser.add_argument("--output", type=str, required=True, help="Checkpoint del alumno")
+    parser.add_argument("--size", type=int, default=500, help="Resolución de entrenamiento del alumno (la API sirve a 500)")
+    parser.add_argument("--width-mult", type=float, default=0.25, help="Escala de los anchos de ResNet18_4")
+    parser.add_argument("--temperature", type=float, default=4.0)
+    parser.add_argument("--alpha", type=float, default=0.7)
+    parser.add_argument("--epochs", type=int, default=20)
+    parser.add_argument("--lr", type=float, default=1e-3)
+    args = parser.parse_args()
+
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    teacher_path = Path(args.teacher).resolve()
+    teacher = OctagonDetector(str(teacher_path)).model
+    if teacher is None:
+        raise SystemExit("No se pudo cargar el maestro")
+    teacher_id = f"{teacher_path}:{teacher_path.stat().st_mtime_ns}"
+    samples = read_labels(args.labels, args.images_root)
+    print(f"Imágenes etiquetadas: {len(samples)}")
+
+    student = build_student(args.width_mult)
+    _, _, val_idx = train_distillation(
+        student, teacher, samples, device, args.cache, size=args.size, temperature=args.temperature,
+        alpha=args.alpha, lr=args.lr, epochs=args.epochs, teacher_id=teacher_id,
+    )
+    # Mismo formato que pruning.save_pruned: OctagonDetector arma el modelo desde "arch"
+    torch.save({"arch": {**model_architecture(student), "input_size": args.size},
+                "state_dict": student.cpu().state_dict()}, args.output)
+
+    logits = precompute_teacher_logits(teacher, samples, args.cache, device, teacher_id=teacher_id)
+    report = compare_models(teacher.cpu(), student.cpu(), [samples[i] for i in val_idx], logits[val_idx], args.size)
+    print(
+        f"Maestro: accuracy={report['teacher']['accuracy']:.4f} | {report['teacher']['parameters']:,} params | "
+        f"{report['teacher']['latency_ms']:.1f}ms"
+    )
+    print(
+        f"Alumno:  accuracy={report['student']['accuracy']:.4f} | {report['student']['parameters']:,} params | "
+        f"{report['student']['latency_ms']:.1f}ms"
+    )
+    print(f"Speedup: {report['speedup']:.2f}x | Diferencia de accuracy: {report['accuracy_delta']:+.4f}")
+    print(f"✅ Alumno guardado en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""
+Poda estructurada de filtros para ResNet18_4.
+
+A diferencia de poner pesos en cero, acá se eliminan filtros completos y se
+reconstruye una ResNet18_4 más angosta y densa, que sí corre más rápido en
+CPU. Los canales se podan por grupos: los canales internos de cada bloque
+residual (block*) se podan de forma independiente, y los canales del camino
+residual de cada etapa (stage*) se podan de forma conjunta en todas las
+convs que escriben sobre él (incluido concat_adjust_*), para que las sumas
+con los atajos sigan teniendo la misma forma.
+
+Uso:
+    python pruning.py --model ../api/model/Resnet18_podado.pth --ratio 0.5 \
+        --labels ../etiquetas_octogonos.csv --images-root .. --epochs 5 \
+        --output ../api/model/Resnet18_pruned50.pth
+"""
+import argparse
+import copy
+import sys
+import time
+from pathlib import Path
+
+import torch
+import torch.nn as nn
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "api"))
+
+from model.predictor import OctagonDetector, ResNet18_4, model_architecture  # noqa: E402
+from utils import train  # noqa: E402
+from dataset import make_loaders  # noqa: E402
+
+# Para cada grupo de canales: capas que lo producen (conv/linear y su
+# batchnorm, si tiene) y capas que lo consumen como entrada.
+CHANNEL_GROUPS = {
+    "stage2": {
+        "producers": [("conv1", "batchnorm1"), ("conv2_1_2", "batchnorm2_1_2"), ("conv2_2_2", "batchnorm2_2_2")],
+        "consumers": ["conv2_1_1", "conv2_2_1", "conv3_1_1", "concat_adjust_3"],
+    },
+    "block2_1": {"producers": [("conv2_1_1", "batchnorm2_1_1")], "consumers": ["conv2_1_2"]},
+    "block2_2": {"producers": [("conv2_2_1", "batchnorm2_2_1")], "consumers": ["conv2_2_2"]},
+    "stage3": {
+        "producers": [("conv3_1_2", "batchnorm3_1_2"), ("concat_adjust_3", None), ("conv3_2_2", "batchnorm3_2_2")],
+        "consumers": ["conv3_2_1", "conv4_1_1", "concat_adjust_4"],
+    },
+    "block3_1": {"producers": [("conv3_1_1", "batchnorm3_1_1")], "consumers": ["conv3_1_2"]},
+    "block3_2": {"producers": [("conv3_2_1", "batchnorm3_2_1")], "consumers": ["conv3_2_2"]},
+    "stage4": {
+        "producers": [("conv4_1_2", "batchnorm4_1_2"), ("concat_adjust_4", None), ("conv4_2_2", "batchnorm4_2_2")],
+        "consumers": ["conv4_2_1", "conv5_1_1", "concat_adjust_5"],
+    },
+    "block4_1": {"producers": [("conv4_1_1", "batchnorm4_1_1")], "consumers": ["conv4_1_2"]},
+    "block4_2": {"producers": [("conv4_2_1", "batchnorm4_2_1")], "consumers": ["conv4_2_2"]},
+    "stage5": {
+        "producers": [("conv5_1_2", "batchnorm5_1_2"), ("concat_adjust_5", None), ("conv5_2_2", "batchnorm5_2_2")],
+        "consumers": ["conv5_2_1", "fc"],
+    },
+    "block5_1": {"producers": [("conv5_1_1", "batchnorm5_1_1")], "consumers": ["conv5_1_2"]},
+    "block5_2": {"producers": [("conv5_2_1", "batchnorm5_2_1")], "consumers": ["conv5_2_2"]},
+    "fc": {"producers": [("fc", None)], "consumers": ["out"]},
+}
+
+
+def channel_importance(model, group):
+    """
+    Importancia de cada canal de un grupo: norma L1 de los filtros que lo
+    producen, escalada por |gamma| del batchnorm cuando existe. Cada capa
+    productora se normaliza por su media para que todas pesen parecido.
+
+    Args:
+        model (ResNet18_4): Modelo a podar.
+        group (str): Nombre del grupo de canales (clave de CHANNEL_GROUPS).
+
+    Returns:
+        torch.Tensor: Puntaje por canal (mayor = más importante).
+    """
+    scores = None
+    for layer_name, bn_name in CHANNEL_GROUPS[group]["producers"]:
+        weight = getattr(model, layer_name).weight.detach()
+        score = weight.abs().reshape(weight.shape[0], -1).sum(dim=1)
+        if bn_name is not None:
+            score = score * getattr(model, bn_name).weight.detach().abs()
+        score = score / (score.mean() + 1e-12)
+        scores = score if scores is None else scores + score
+    return scores
+
+
+def _n_keep(width, ratio, round_to):
+    keep = max(1, int(round(width * (1 - ratio))))
+    if round_to > 1:
+        # Múltiplos de round_to aprovechan mejor las instrucciones vectoriales
+        keep = min(width, max(round_to, int(round(keep / round_to)) * round_to))
+    return keep
+
+
+def select_channels(model, ratio=0.5, stage_ratio=None, fc_ratio=None, round_to=8):
+    """
+    Elige qué canales se conservan en cada grupo.
+
+    Args:
+        model (ResNet18_4): Modelo a podar.
+        ratio (float): Fracción de canales a eliminar en los grupos block* (default: 0.5).
+        stage_ratio (float, optional): Fracción para los grupos stage* (default: igual a ratio).
+        fc_ratio (float, optional): Fracción de neuronas de fc a eliminar (default: igual a ratio).
+        round_to (int): Redondea la cantidad de canales conservados a este múltiplo (default: 8).
+
+    Returns:
+        Dict[str, torch.Tensor]: Índices ordenados de los canales que se conservan por grupo.
+    """
+    stage_ratio = ratio if stage_ratio is None else stage_ratio
+    fc_ratio = ratio if fc_ratio is None else fc_ratio
+    keep = {}
+    for group in CHANNEL_GROUPS:
+        group_ratio = stage_ratio if group.startswith("stage") else fc_ratio if group == "fc" else ratio
+        scores = channel_importance(model, group)
+        n_keep = _n_keep(len(scores), group_ratio, round_to)
+        keep[group] = torch.topk(scores, n_keep).indices.sort().values
+    return keep
+
+
+def _copy_sliced(old, new, out_idx, in_idx):
+    weight = old.weight.detach()
+    if out_idx is not None:
+        weight = weight[out_idx]
+    if in_idx is not None:
+        weight = weight[:, in_idx]
+    new.weight.data.copy_(weight)
+    if old.bias is not None:
+        bias = old.bias.detach()
+        new.bias.data.copy_(bias[out_idx] if out_idx is not None else bias)
+
+
+def _copy_batchnorm(old, new, idx):
+    new.weight.data.copy_(old.weight.detach()[idx])
+    new.bias.data.copy_(old.bias.detach()[idx])
+    new.running_mean.copy_(old.running_mean[idx])
+    new.running_var.copy_(old.running_var[idx])
+    new.num_batches_tracked.copy_(old.num_batches_tracked)
+
+
+def prune_model(model, ratio=0.5, stage_ratio=None, fc_ratio=None, round_to=8):
+    """
+    Construye una ResNet18_4 más angosta con los filtros más importantes del modelo original.
+
+    Args:
+        model (ResNet18_4): Modelo entrenado (no se modifica).
+        ratio (float): Fracción de canales a eliminar en los bloques (default: 0.5).
+        stage_ratio (float, optional): Fracción para los caminos residuales (default: igual a ratio).
+        fc_ratio (float, optional): Fracción de neuronas de fc a eliminar (default: igual a ratio).
+        round_to (int): Múltiplo al que se redondea cada ancho (default: 8).
+
+    Returns:
+        ResNet18_4: Nuevo modelo denso con los anchos reducidos y los pesos copiados.
+    """
+    model = copy.deepcopy(model).cpu().eval()
+    keep = select_channels(model, ratio, stage_ratio, fc_ratio, round_to)
+    widths = {group: len(idx) for group, idx in keep.items()}
+    pruned = ResNet18_4(in_channels=model.conv1.in_channels, n_classes=model.out.out_features, widths=widths)
+
+    out_group, in_group, bn_group = {}, {}, {}
+    for group, spec in CHANNEL_GROUPS.items():
+        for layer_name, bn_name in spec["producers"]:
+            out_group[layer_name] = group
+            if bn_name is not None:
+                bn_group[bn_name] = group
+        for layer_name in spec["consumers"]:
+            in_group[layer_name] = group
+
+    for name, module in model.named_children():
+        new_module = getattr(pruned, name)
+        if isinstance(module, (nn.Conv2d, nn.Linear)):
+            out_idx = keep[out_group[name]] if name in out_group else None
+            in_idx = keep[in_group[name]] if name in in_group else None
+            _copy_sliced(module, new_module, out_idx, in_idx)
+        elif isinstance(module, nn.BatchNorm2d):
+            _copy_batchnorm(module, new_module, keep[bn_group[name]])
+    return pruned
+
+
+def save_pruned(model, path):
+    """Guarda pesos y arquitectura; OctagonDetector reconstruye el modelo desde 'arch'"""
+    torch.save({"arch": model_architecture(model), "state_dict": model.state_dict()}, path)
+
+
+def count_parameters(model):
+    return sum(p.numel() for p in model.parameters())
+
+
+def measure_latency(model, input_size=(1, 3, 500, 500), runs=10, device="cpu"):
+    """Latencia media (segundos) de un forward en modo evaluación"""
+    model = model.to(device).eval()
+    x = torch.randn(*input_size, device=device)
+    with torch.no_grad():
+        model(x)  # warmup
+        start = time.perf_counter()
+        for _ in range(runs):
+            model(x)
+    return (time.perf_counter() - start) / runs
+
+
+def prune_and_finetune(model, train_loader, val_loader, device, ratio=0.5, stage_ratio=None, fc_ratio=None,
+                       lr=1e-4, epochs=5, patience=3, criterion=None):
+    """
+    Poda el modelo y lo reentrena con utils.train para recuperar accuracy.
+
+    Args:
+        model (ResNet18_4): Modelo entrenado.
+        train_loader (DataLoader): Datos de entrenamiento.
+        val_loader (DataLoader): Datos de validación.
+        device (str): Dispositivo de entrenamiento.
+        ratio (float): Fracción de canales a eliminar en los bloques (default: 0.5).
+        stage_ratio (float, optional): Fracción para los caminos residuales (default: igual a ratio).
+        fc_ratio (float, optional): Fracción de neuronas de fc a eliminar (default: igual a ratio).
+        lr (float): Learning rate del fine-tuning (default: 1e-4).
+        epochs (int): Épocas de fine-tuning (default: 5).
+        patience (int): Paciencia del early stopping (default: 3).
+        criterion (torch.nn.Module, optional): Función de pérdida (default: CrossEntropyLoss).
+
+    Returns:
+        Tuple[ResNet18_4, List[float], List[float]]: Modelo podado y reentrenado, errores de entrenamiento y de validación.
+    """
+    pruned = prune_model(model, ratio, stage_ratio, fc_ratio).to(device)
+    criterion = criterion or nn.CrossEntropyLoss()
+    optimizer = torch.optim.Adam(pruned.parameters(), lr=lr)
+    train_errors, val_errors = train(
+        pruned, optimizer, criterion, train_loader, val_loader, device,
+        do_early_stopping=True, patience=patience, epochs=epochs,
+    )
+    return pruned, train_errors, val_errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Poda estructurada de ResNet18_4")
+    parser.add_argument("--model", type=str, required=True, help="Checkpoint del modelo original")
+    parser.add_argument("--output", type=str, required=True, help="Checkpoint de salida (pesos + arquitectura)")
+    parser.add_argument("--ratio", type=float, default=0.5, help="Fracción de canales a eliminar en los bloques")
+    parser.add_argument("--stage-ratio", type=float, default=None, help="Fracción para los caminos residuales")
+    parser.add_argument("--fc-ratio", type=float, default=None, help="Fracción de neuronas de fc a eliminar")
+    parser.add_argument("--labels", type=str, default=None, help="etiquetas_octogonos.csv (sin esto no hay fine-tuning)")
+    parser.add_argument("--images-root", type=str, default="..")
+    parser.add_argument("--epochs", type=int, default=5)
+    parser.add_argument("--lr", type=float, default=1e-4)
+    parser.add_argument("--batch-size", type=int, default=16)
+    args = parser.parse_args()
+
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    original = OctagonDetector(str(Path(args.model).resolve())).model
+    if original is None:
+        raise SystemExit("No se pudo cargar el modelo original")
+
+    if args.labels:
+        train_loader, val_loader = make_loaders(args.labels, args.images_root, batch_size=args.batch_size)
+        pruned, _, _ = prune_and_finetune(
+            original, train_loader, val_loader, device, args.ratio, args.stage_ratio, args.fc_ratio,
+            lr=args.lr, epochs=args.epochs,
+        )
+    else:
+        print("⚠️ Sin --labels: se guarda el modelo podado sin fine-tuning")
+        pruned = prune_model(original, args.ratio, args.stage_ratio, args.fc_ratio)
+
+    pruned = pruned.cpu().eval()
+    save_pruned(pruned, args.output)
+    original_params, pruned_params = count_parameters(original), count_parameters(pruned)
+    original_latency, pruned_latency = measure_latency(original.cpu()), measure_latency(pruned)
+    print(f"Anchos: {pruned.widths}")
+    print(f"Parámetros: {original_params:,} -> {pruned_params:,} ({pruned_params / original_params:.1%})")
+    print(
+        f"Latencia CPU (1x3x500x500): {original_latency * 1000:.1f}ms -> {pruned_latency * 1000:.1f}ms "
+        f"({original_latency / pruned_latency:.2f}x)"
+    )
+    print(f"✅ Modelo podado guardado en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
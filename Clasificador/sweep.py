@@ -0,0 +1,298 @@
+"""
+Barrido de hiperparámetros de ResNet18_4 sobre utils.train.
+
+Cada trial arma el modelo (desde un checkpoint o desde cero), lo poda con
+pruning.prune_model si corresponde, ajusta las tasas de dropout y lo
+entrena con utils.train, que corta el trial con EarlyStopping cuando la
+pérdida de validación deja de mejorar. Los trials se reparten en un pool de
+procesos, cada uno con una cantidad fija de threads de torch para que
+procesos x threads no supere los cores.
+
+El espacio de búsqueda es un JSON. Una lista es un conjunto de valores
+posibles; un objeto {"low", "high", "log"} es un rango continuo:
+
+    {
+        "lr": {"low": 1e-5, "high": 1e-3, "log": true},
+        "dropout_3_4": [0.1, 0.2, 0.3],
+        "prune_ratio": [0.0, 0.3, 0.5]
+    }
+
+Sólo con listas se recorre la grilla completa; si hay algún rango se
+toman --samples configuraciones al azar (con --seed fija, así se regeneran
+las mismas al retomar). Parámetros: lr, weight_decay, batch_size,
+prune_ratio, dropout_1_2, dropout_3_4, dropout_5, dropout_fc.
+
+Cada trial terminado se agrega a un JSONL (--results); al volver a correr
+con el mismo archivo, los trials ya completos se saltean y los que quedaron
+a mitad retoman desde su último checkpoint (<results>.checkpoints/<trial>).
+
+Uso:
+    python sweep.py --space space.json --labels ../etiquetas_octogonos.csv --images-root .. \
+        --model ../api/model/Resnet18_podado.pth --epochs 10 --workers 4 --results sweep.jsonl
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import math
+import os
+import random
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import torch
+import torch.nn as nn
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "api"))
+
+from model.predictor import OctagonDetector, ResNet18_4  # noqa: E402
+from utils import train  # noqa: E402
+from dataset import make_loaders  # noqa: E402
+from pruning import prune_model  # noqa: E402
+
+# Grupo de tasa de dropout de cada capa de ResNet18_4
+DROPOUT_GROUPS = {
+    "dropout2_1": "dropout_1_2", "dropout2_2": "dropout_1_2",
+    "dropout3_1": "dropout_3_4", "dropout3_2": "dropout_3_4",
+    "dropout4_1": "dropout_3_4", "dropout4_2": "dropout_3_4",
+    "dropout5_1": "dropout_5", "dropout5_2": "dropout_5",
+    "dropout_fc": "dropout_fc",
+}
+DEFAULTS = {"lr": 1e-4, "weight_decay": 0.0, "batch_size": 16, "prune_ratio": 0.0}
+
+
+def expand_space(space, samples=20, seed=42):
+    """
+    Lista de configuraciones a probar.
+
+    Args:
+        space (dict): Parámetro -> lista de valores o rango {"low", "high", "log"}.
+        samples (int): Configuraciones a sortear si el espacio tiene rangos (default: 20).
+        seed (int): Semilla del sorteo (default: 42).
+
+    Returns:
+        List[dict]: Configuraciones, sin repetidos y en orden estable.
+    """
+    names = sorted(space)
+    if all(isinstance(space[name], list) for name in names):
+        configs = [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+    else:
+        rng = random.Random(seed)
+        configs = []
+        for _ in range(samples):
+            config = {}
+            for name in names:
+                spec = space[name]
+                if isinstance(spec, list):
+                    config[name] = rng.choice(spec)
+                elif spec.get("log"):
+                    config[name] = math.exp(rng.uniform(math.log(spec["low"]), math.log(spec["high"])))
+                else:
+                    config[name] = rng.uniform(spec["low"], spec["high"])
+            configs.append(config)
+    unique = {trial_id(config): config for config in configs}
+    return list(unique.values())
+
+
+def trial_id(config):
+    return hashlib.sha1(json.dumps(config, sort_keys=True).encode()).hexdigest()[:12]
+
+
+class ResultsStore:
+    """
+    Resultados del barrido en un JSONL, una línea por trial terminado.
+
+    Args:
+        path (str): Archivo de resultados; se crea si no existe.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+
+    def load(self):
+        if not self.path.exists():
+            return []
+        with open(self.path) as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def completed(self):
+        return {r["trial_id"] for r in self.load() if r["status"] == "ok"}
+
+    def append(self, record):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def build_model(config, base_model=None):
+    """Modelo del trial: checkpoint base (o uno nuevo), podado y con las tasas de dropout del config"""
+    if base_model:
+        model = OctagonDetector(str(Path(base_model).resolve())).model
+        if model is None:
+            raise RuntimeError(f"No se pudo cargar {base_model}")
+    else:
+        model = ResNet18_4(in_channels=3, n_classes=2)
+    if config.get("prune_ratio", 0.0) > 0:
+        model = prune_model(model, ratio=config["prune_ratio"])
+    for name, module in model.named_children():
+        group = DROPOUT_GROUPS.get(name)
+        if isinstance(module, nn.Dropout) and group in config:
+            module.p = config[group]
+    return model
+
+
+_loaders = {}
+
+
+def _init_worker(threads):
+    torch.set_num_threads(threads)
+
+
+def run_trial(config, data, base_model, epochs, patience):
+    """
+    Entrena un trial; corre en un proceso del pool.
+
+    Returns:
+        dict: Registro del trial para ResultsStore.
+    """
+    params = {**DEFAULTS, **config}
+    record = {"trial_id": trial_id(config), "config": config, "pid": os.getpid()}
+    start = time.perf_counter()
+    try:
+        # Los loaders se reutilizan entre trials del mismo proceso con igual batch_size
+        key = params["batch_size"]
+        if key not in _loaders:
+            _loaders[key] = make_loaders(data["labels"], data["images_root"], batch_size=int(key), seed=data["seed"])
+        train_loader, val_loader = _loaders[key]
+
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+        model = build_model(params, base_model).to(device)
+        optimizer = torch.optim.Adam(model.parameters(), lr=params["lr"], weight_decay=params["weight_decay"])
+        train_errors, val_errors = train(
+            model, optimizer, nn.CrossEntropyLoss(), train_loader, val_loader, device,
+            do_early_stopping=True, patience=patience, epochs=epochs, log_fn=None,
+            checkpoint_dir=str(Path(data["checkpoints"]) / record["trial_id"]),
+            resume=True,
+        )
+        best_epoch = min(range(len(val_errors)), key=val_errors.__getitem__)
+        record.update({
+            "status": "ok",
+            "best_val_loss": val_errors[best_epoch],
+            "best_epoch": best_epoch + 1,
+            "epochs_run": len(val_errors),
+            "early_stopped": len(val_errors) < epochs,
+            "train_errors": train_errors,
+            "val_errors": val_errors,
+        })
+    except Exception as e:
+        record.update({"status": "failed", "error": f"{type(e).__name__}: {e}", "traceback": traceback.format_exc()})
+    record["seconds"] = round(time.perf_counter() - start, 2)
+    record["finished_at"] = time.time()
+    return record
+
+
+def best_trials(records, top=5):
+    ok = [r for r in records if r["status"] == "ok"]
+    return sorted(ok, key=lambda r: r["best_val_loss"])[:top]
+
+
+def run_sweep(configs, store, data, base_model=None, epochs=10, patience=3, workers=1, threads=None):
+    """
+    Corre los trials pendientes en un pool de procesos.
+
+    Args:
+        configs (List[dict]): Configuraciones (ver expand_space).
+        store (ResultsStore): Resultados; los trials completos se saltean.
+        data (dict): labels, images_root, seed del split y checkpoints (directorio de checkpoints por trial).
+        base_model (str, optional): Checkpoint desde el que arranca cada trial (default: modelo nuevo).
+        epochs (int): Máximo de épocas por trial (default: 10).
+        patience (int): Paciencia de EarlyStopping (default: 3).
+        workers (int): Procesos en paralelo (default: 1).
+        threads (int, optional): Threads de torch por proceso (default: cores // workers).
+
+    Returns:
+        dict: Trials corridos, fallidos, segundos y trials/hora de esta corrida.
+    """
+    done = store.completed()
+    pending = [config for config in configs if trial_id(config) not in done]
+    print(f"Trials: {len(configs)} | ya completos: {len(configs) - len(pending)} | pendientes: {len(pending)}")
+    threads = threads or max(1, (os.cpu_count() or 1) // workers)
+    # Los procesos del pool heredan el entorno: OpenMP/MKL arrancan ya limitados
+    os.environ["OMP_NUM_THREADS"] = os.environ["MKL_NUM_THREADS"] = str(threads)
+
+    start = time.perf_counter()
+    finished, failed = 0, 0
+    if pending:
+        ctx = torch.multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(workers, mp_context=ctx, initializer=_init_worker, initargs=(threads,)) as pool:
+            futures = [pool.submit(run_trial, config, data, base_model, epochs, patience) for config in pending]
+            for future in as_completed(futures):
+                record = future.result()
+                store.append(record)
+                finished += 1
+                hours = (time.perf_counter() - start) / 3600
+                if record["status"] == "ok":
+                    print(
+                        f"[{finished}/{len(pending)}] {record['trial_id']} val_loss={record['best_val_loss']:.5f} "
+                        f"épocas={record['epochs_run']}{' (early stop)' if record['early_stopped'] else ''} "
+                        f"{record['seconds']:.0f}s | {finished / hours:.1f} trials/hora"
+                    )
+                else:
+                    failed += 1
+                    print(f"[{finished}/{len(pending)}] {record['trial_id']} falló: {record['error']}")
+    seconds = time.perf_counter() - start
+    return {
+        "trials": finished,
+        "failed": failed,
+        "seconds": round(seconds, 1),
+        "trials_per_hour": round(finished / (seconds / 3600), 2) if finished else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Barrido de hiperparámetros de ResNet18_4")
+    parser.add_argument("--space", type=str, required=True, help="JSON con el espacio de búsqueda")
+    parser.add_argument("--labels", type=str, required=True, help="etiquetas_octogonos.csv")
+    parser.add_argument("--images-root", type=str, default="..")
+    parser.add_argument("--model", type=str, default=None, help="Checkpoint base (sin esto se entrena desde cero)")
+    parser.add_argument("--results", type=str, default="sweep_results.jsonl", help="JSONL de resultados (permite retomar)")
+    parser.add_argument("--samples", type=int, default=20, help="Configuraciones a sortear si el espacio tiene rangos")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--epochs", type=int, default=10)
+    parser.add_argument("--patience", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=None, help="Procesos en paralelo (default: 1 con GPU, si no 4)")
+    parser.add_argument("--threads", type=int, default=None, help="Threads de torch por proceso (default: cores // workers)")
+    parser.add_argument("--top", type=int, default=5)
+    args = parser.parse_args()
+
+    with open(args.space) as f:
+        space = json.load(f)
+    configs = expand_space(space, args.samples, args.seed)
+    workers = args.workers or (1 if torch.cuda.is_available() else min(4, os.cpu_count() or 1))
+    data = {
+        "labels": str(Path(args.labels).resolve()),
+        "images_root": str(Path(args.images_root).resolve()),
+        "seed": args.seed,
+        "checkpoints": str(Path(args.results).resolve().with_suffix(".checkpoints")),
+    }
+
+    store = ResultsStore(args.results)
+    summary = run_sweep(configs, store, data, args.model, args.epochs, args.patience, workers, args.threads)
+    if summary["trials"]:
+        print(
+            f"Corrida: {summary['trials']} trials ({summary['failed']} fallidos) en {summary['seconds'] / 60:.1f} min "
+            f"| {summary['trials_per_hour']} trials/hora"
+        )
+
+    print(f"Mejores configuraciones ({args.results}):")
+    for rank, record in enumerate(best_trials(store.load(), args.top), start=1):
+        print(f"{rank}. val_loss={record['best_val_loss']:.5f} (época {record['best_epoch']}) {json.dumps(record['config'])}")
+
+
+if __name__ == "__main__":
+    main()
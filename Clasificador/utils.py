@@ -1,8 +1,15 @@
+import os
+import queue
+import threading
+from pathlib import Path
+
 import torch
 import matplotlib.pyplot as plt
 from sklearn.metrics import (
     accuracy_score,
-    classification_report
+    classification_report,
+    confusion_matrix,
+    precision_recall_fscore_support
 )
 
 
@@ -30,6 +37,43 @@ def evaluate(model, criterion, data_loader, device):
     return total_loss / len(data_loader)  # retornamos la perdida promedio
 
 
+def _cpu_copy(obj):
+    """Copia recursiva de un state dict (o lo que contenga) con los tensores clonados en CPU"""
+    if torch.is_tensor(obj):
+        return obj.detach().to("cpu", copy=True)
+    if isinstance(obj, dict):
+        return {key: _cpu_copy(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return type(obj)(_cpu_copy(value) for value in obj)
+    return obj
+
+
+def _run_config(model, optimizer, do_early_stopping, patience):
+    """
+    Arquitectura e hiperparámetros de un entrenamiento, para no retomar un
+    checkpoint de otra configuración.
+
+    Args:
+        model (torch.nn.Module): El modelo que se va a entrenar.
+        optimizer (torch.optim.Optimizer): El optimizador del entrenamiento.
+        do_early_stopping (bool): Si se usa early stopping.
+        patience (int): Paciencia del early stopping.
+
+    Returns:
+        dict: Clase y forma de cada parámetro del modelo, clase e hiperparámetros del optimizador y early stopping.
+    """
+    return {
+        "model": type(model).__name__,
+        "parameters": {name: tuple(value.shape) for name, value in model.state_dict().items()},
+        "optimizer": type(optimizer).__name__,
+        "param_groups": [
+            {key: value for key, value in group.items() if key != "params"}
+            for group in optimizer.state_dict()["param_groups"]
+        ],
+        "early_stopping": patience if do_early_stopping else None,
+    }
+
+
 class EarlyStopping:
     def __init__(self, patience=5):
         """
@@ -41,8 +85,16 @@ class EarlyStopping:
         self.best_score = float("inf")
         self.val_loss_min = float("inf")
         self.early_stop = False
+        self.best_state = None
+        self.best_epoch = None
 
-    def __call__(self, val_loss):
+    def __call__(self, val_loss, model=None, epoch=None):
+        """
+        Args:
+            val_loss (float): Pérdida de validación de la época.
+            model (torch.nn.Module, optional): Si se pasa, se guarda en memoria una copia de sus pesos cada vez que mejora.
+            epoch (int, optional): Época de la medición, para saber de cuándo es el mejor estado.
+        """
         if val_loss > self.best_score:
             self.counter += 1
             if self.counter >= self.patience:
@@ -50,6 +102,77 @@ class EarlyStopping:
         else:
             self.best_score = val_loss
             self.counter = 0
+            if model is not None:
+                self.best_state = _cpu_copy(model.state_dict())
+                self.best_epoch = epoch
+
+    def state_dict(self):
+        return {
+            "counter": self.counter,
+            "best_score": self.best_score,
+            "early_stop": self.early_stop,
+            "best_state": self.best_state,
+            "best_epoch": self.best_epoch,
+        }
+
+    def load_state_dict(self, state):
+        self.counter = state["counter"]
+        self.best_score = state["best_score"]
+        self.early_stop = state["early_stop"]
+        self.best_state = state["best_state"]
+        self.best_epoch = state["best_epoch"]
+
+
+class AsyncCheckpointer:
+    def __init__(self, checkpoint_dir, filename="last.pt"):
+        """
+        Escribe checkpoints en un hilo de fondo para no frenar el loop de
+        entrenamiento. El loop sólo paga la copia a CPU del estado; si el
+        hilo todavía está escribiendo el anterior, el pendiente se reemplaza
+        por el más nuevo.
+
+        Args:
+            checkpoint_dir (str): Directorio donde se guarda el checkpoint.
+            filename (str): Nombre del archivo de checkpoint (default: last.pt).
+        """
+        self.path = Path(checkpoint_dir) / filename
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._pending = queue.Queue(maxsize=1)
+        self.error = None
+        self._thread = threading.Thread(target=self._run, name="checkpointer", daemon=True)
+        self._thread.start()
+
+    def save(self, checkpoint):
+        try:
+            self._pending.get_nowait()  # descartamos el que no llegó a escribirse
+        except queue.Empty:
+            pass
+        self._pending.put(checkpoint)
+
+    def _run(self):
+        while True:
+            checkpoint = self._pending.get()
+            if checkpoint is None:
+                return
+            try:
+                # Escritura atómica: un corte a mitad de escritura deja el checkpoint anterior intacto
+                tmp_path = self.path.with_suffix(".tmp")
+                torch.save(checkpoint, tmp_path)
+                os.replace(tmp_path, self.path)
+            except Exception as e:
+                self.error = e
+                print(f"No se pudo guardar el checkpoint {self.path}: {e}")
+
+    def close(self):
+        """Espera a que termine de escribirse el último checkpoint"""
+        self._pending.put(None)
+        self._thread.join()
+
+    def load(self):
+        """Último checkpoint guardado, o None si no hay"""
+        if not self.path.exists():
+            return None
+        return torch.load(self.path, map_location="cpu", weights_only=False)
 
 
 def print_log(epoch, train_loss, val_loss):
@@ -69,6 +192,10 @@ def train(
     epochs=10,
     log_fn=print_log,
     log_every=1,
+    checkpoint_dir=None,
+    checkpoint_every=1,
+    resume=False,
+    restore_best=True,
 ):
     """
     Entrena el modelo utilizando el optimizador y la función de pérdida proporcionados.
@@ -84,6 +211,13 @@ def train(
         epochs (int): Número de épocas de entrenamiento (default: 10).
         log_fn (function): Función que se llamará después de cada log_every épocas con los argumentos (epoch, train_loss, val_loss) (default: None).
         log_every (int): Número de épocas entre cada llamada a log_fn (default: 1).
+        checkpoint_dir (str, optional): Directorio donde guardar checkpoints (modelo, optimizador y época) en segundo plano; sin esto no se guardan (default: None).
+        checkpoint_every (int): Número de épocas entre checkpoints (default: 1).
+        resume (bool): Si hay un checkpoint en checkpoint_dir, retomar el entrenamiento desde ahí; si es de otra arquitectura o de otros hiperparámetros se lanza ValueError. Sin esto el checkpoint existente se sobrescribe (default: False).
+        restore_best (bool): Al terminar, dejar en el modelo los pesos de la época con menor val_loss en lugar de los de la última (default: True).
+
+    Raises:
+        ValueError: Si resume es True y el checkpoint de checkpoint_dir no corresponde al modelo y los hiperparámetros de esta llamada.
 
     Returns:
         Tuple[List[float], List[float]]: Una tupla con dos listas, la primera con el error de entrenamiento de cada época y la segunda con el error de validación de cada época.
@@ -95,45 +229,100 @@ def train(
         early_stopping = EarlyStopping(
             patience=patience
         )  # instanciamos el early stopping
-
-    for epoch in range(epochs):  # loop de entrenamiento
-        model.train()  # ponemos el modelo en modo de entrenamiento
-        train_loss = 0  # acumulador de la perdida de entrenamiento
-        for x, y in train_loader:
-            x = x.to(device)  # movemos los datos al dispositivo
-            y = y.to(device)  # movemos los datos al dispositivo
-
-            optimizer.zero_grad()  # reseteamos los gradientes
-
-            output = model(x)  # forward pass (prediccion)
-            batch_loss = criterion(
-                output, y
-            )  # calculamos la perdida con la salida esperada
-
-            batch_loss.backward()  # backpropagation
-            optimizer.step()  # actualizamos los pesos
-
-            train_loss += batch_loss.item()  # acumulamos la perdida
-
-        train_loss /= len(train_loader)  # calculamos la perdida promedio de la epoca
-        epoch_train_errors.append(train_loss)  # guardamos la perdida de entrenamiento
-        val_loss = evaluate(
-            model, criterion, val_loader, device
-        )  # evaluamos el modelo en el conjunto de validacion
-        epoch_val_errors.append(val_loss)  # guardamos la perdida de validacion
-
-        if do_early_stopping:
-            early_stopping(val_loss)  # llamamos al early stopping
-
-        if log_fn is not None:  # si se pasa una funcion de log
-            if (epoch + 1) % log_every == 0:  # loggeamos cada log_every epocas
-                log_fn(epoch, train_loss, val_loss)  # llamamos a la funcion de log
-
-        if do_early_stopping and early_stopping.early_stop:
-            print(
-                f"Detener entrenamiento en la época {epoch}, la mejor pérdida fue {early_stopping.best_score:.5f}"
-            )
-            break
+    else:
+        early_stopping = None
+    best_score, best_state = float("inf"), None  # mejor estado cuando no hay early stopping
+
+    start_epoch = 0
+    run_config = _run_config(model, optimizer, do_early_stopping, patience)
+    checkpointer = AsyncCheckpointer(checkpoint_dir) if checkpoint_dir else None
+    if checkpointer is not None and resume:
+        checkpoint = checkpointer.load()
+        if checkpoint is not None:
+            if checkpoint.get("run_config") != run_config:
+                raise ValueError(
+                    f"El checkpoint {checkpointer.path} es de otra arquitectura o de otros hiperparámetros; "
+                    "usar otro checkpoint_dir o resume=False"
+                )
+            model.load_state_dict(checkpoint["model_state_dict"])
+            optimizer.load_state_dict(checkpoint["optimizer_state_dict"])
+            epoch_train_errors = checkpoint["train_errors"]
+            epoch_val_errors = checkpoint["val_errors"]
+            if early_stopping is not None and checkpoint["early_stopping"] is not None:
+                early_stopping.load_state_dict(checkpoint["early_stopping"])
+            best_score, best_state = checkpoint["best_score"], checkpoint["best_state"]
+            torch.set_rng_state(checkpoint["rng_state"])
+            start_epoch = checkpoint["epoch"] + 1
+            print(f"Retomando desde la época {start_epoch + 1} ({checkpointer.path})")
+
+    try:
+        for epoch in range(start_epoch, epochs):  # loop de entrenamiento
+            if early_stopping is not None and early_stopping.early_stop:
+                break  # el checkpoint retomado ya había cortado por early stopping
+            model.train()  # ponemos el modelo en modo de entrenamiento
+            train_loss = 0  # acumulador de la perdida de entrenamiento
+            for x, y in train_loader:
+                x = x.to(device)  # movemos los datos al dispositivo
+                y = y.to(device)  # movemos los datos al dispositivo
+
+                optimizer.zero_grad()  # reseteamos los gradientes
+
+                output = model(x)  # forward pass (prediccion)
+                batch_loss = criterion(
+                    output, y
+                )  # calculamos la perdida con la salida esperada
+
+                batch_loss.backward()  # backpropagation
+                optimizer.step()  # actualizamos los pesos
+
+                train_loss += batch_loss.item()  # acumulamos la perdida
+
+            train_loss /= len(train_loader)  # calculamos la perdida promedio de la epoca
+            epoch_train_errors.append(train_loss)  # guardamos la perdida de entrenamiento
+            val_loss = evaluate(
+                model, criterion, val_loader, device
+            )  # evaluamos el modelo en el conjunto de validacion
+            epoch_val_errors.append(val_loss)  # guardamos la perdida de validacion
+
+            if early_stopping is not None:
+                early_stopping(val_loss, model, epoch)  # llamamos al early stopping (guarda el mejor estado)
+            elif val_loss <= best_score:
+                best_score, best_state = val_loss, _cpu_copy(model.state_dict())
+
+            stopping = early_stopping is not None and early_stopping.early_stop
+            if checkpointer is not None and ((epoch + 1) % checkpoint_every == 0 or epoch + 1 == epochs or stopping):
+                # La copia a CPU es sincrónica (estado consistente); la escritura no
+                checkpointer.save({
+                    "epoch": epoch,
+                    "run_config": run_config,
+                    "model_state_dict": _cpu_copy(model.state_dict()),
+                    "optimizer_state_dict": _cpu_copy(optimizer.state_dict()),
+                    "train_errors": list(epoch_train_errors),
+                    "val_errors": list(epoch_val_errors),
+                    "early_stopping": early_stopping.state_dict() if early_stopping is not None else None,
+                    "best_score": best_score,
+                    "best_state": best_state,
+                    "rng_state": torch.get_rng_state(),
+                })
+
+            if log_fn is not None:  # si se pasa una funcion de log
+                if (epoch + 1) % log_every == 0:  # loggeamos cada log_every epocas
+                    log_fn(epoch, train_loss, val_loss)  # llamamos a la funcion de log
+
+            if stopping:
+                print(
+                    f"Detener entrenamiento en la época {epoch}, la mejor pérdida fue {early_stopping.best_score:.5f}"
+                )
+                break
+    finally:
+        if checkpointer is not None:
+            checkpointer.close()
+
+    if restore_best:
+        if early_stopping is not None:
+            best_state = early_stopping.best_state
+        if best_state is not None:
+            model.load_state_dict(best_state)  # dejamos el modelo con los pesos de la mejor epoca
 
     return epoch_train_errors, epoch_val_errors
 
@@ -151,6 +340,30 @@ def plot_taining(train_errors, val_errors):
     plt.show()  # Muestra el gráfico
 
 
+def classification_metrics(labels, preds, positive=1):
+    """
+    Métricas de clasificación binaria sobre predicciones ya calculadas.
+
+    Args:
+        labels (List[int]): Clases reales.
+        preds (List[int]): Clases predichas.
+        positive (int): Clase positiva para precision, recall y F1 (default: 1, con_octogono).
+
+    Returns:
+        dict: accuracy, precision, recall, f1 y la matriz de confusión (filas = clase real).
+    """
+    precision, recall, f1, _ = precision_recall_fscore_support(
+        labels, preds, average="binary", pos_label=positive, zero_division=0
+    )
+    return {
+        "accuracy": accuracy_score(labels, preds),
+        "precision": precision,
+        "recall": recall,
+        "f1": f1,
+        "confusion_matrix": confusion_matrix(labels, preds, labels=[0, 1]).tolist(),
+    }
+
+
 def model_calassification_report(model, dataloader, device, nclasses):
     # Evaluación del modelo
     model.eval()
@@ -0,0 +1,226 @@
+import asyncio
+import math
+import os
+import time
+from collections import OrderedDict, deque
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+
+from metrics import ADMISSION_DECISIONS, IN_FLIGHT
+
+ADMITTED_PREFIXES = ("/predict",)
+
+
+class Overloaded(Exception):
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Control de admisión delante de OctagonDetector.
+
+    - Como mucho max_requests requests de predicción en curso y max_images
+      imágenes en inferencia a la vez; el resto espera en una cola acotada.
+    - Con la cola llena, o después de esperar queue_timeout segundos, el
+      request se rechaza con 503 y un Retry-After estimado.
+    - Equidad por cliente: cada cliente puede tener a lo sumo per_client
+      requests entre en curso y en espera, y la cola se atiende en round
+      robin entre clientes, así un cliente con ráfagas no acapara la cola.
+      El cliente es la IP de la conexión; el header X-Client-Id sólo se
+      acepta si la conexión viene de un proxy de trusted_proxies.
+
+    Todo corre en el event loop, así que el estado no necesita locks.
+    """
+
+    def __init__(self, max_requests: int = None, max_images: int = None, max_queue: int = None,
+                 per_client: int = None, queue_timeout: float = None, trusted_proxies=None):
+        self.max_requests = max_requests or int(os.getenv("ADMISSION_MAX_REQUESTS", "8"))
+        self.max_images = max_images or int(os.getenv("ADMISSION_MAX_IMAGES", "32"))
+        self.max_queue = max_queue if max_queue is not None else int(os.getenv("ADMISSION_MAX_QUEUE", "32"))
+        self.per_client = per_client or int(os.getenv("ADMISSION_PER_CLIENT", "8"))
+        self.queue_timeout = queue_timeout or float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "5"))
+        if self.max_queue < 0:
+            raise ValueError(f"max_queue must be >= 0, got {self.max_queue}")
+        if trusted_proxies is None:
+            trusted_proxies = os.getenv("ADMISSION_TRUSTED_PROXIES", "").split(",")
+        self.trusted_proxies = {host.strip() for host in trusted_proxies if host.strip()}
+        self.in_flight = 0
+        self.images_in_flight = 0
+        self._per_client = {}
+        self._waiting = OrderedDict()
+        self._image_waiters = deque()
+        # Promedio móvil del tiempo de servicio, para estimar Retry-After
+        self._service_seconds = 0.5
+
+    @property
+    def queued(self) -> int:
+        return sum(len(waiters) for waiters in self._waiting.values())
+
+    def saturated(self) -> bool:
+        if self.max_queue == 0:
+            # Sin cola: saturado sólo mientras todos los slots están ocupados
+            return self.in_flight >= self.max_requests
+        return self.queued >= self.max_queue
+
+    def retry_after(self) -> int:
+        backlog = self.queued + self.in_flight
+        return max(1, min(30, math.ceil(backlog * self._service_seconds / self.max_requests)))
+
+    def info(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "max_requests": self.max_requests,
+            "images_in_flight": self.images_in_flight,
+            "max_images": self.max_images,
+            "queued": self.queued,
+            "max_queue": self.max_queue,
+            "per_client": self.per_client,
+            "saturated": self.saturated(),
+        }
+
+    # Slots de request
+
+    async def acquire(self, client: str):
+        if self._per_client.get(client, 0) >= self.per_client:
+            ADMISSION_DECISIONS.labels(decision="rejected_client").inc()
+            raise Overloaded("Too many concurrent requests from this client", self.retry_after())
+        if self.in_flight < self.max_requests and not self._waiting:
+            self._admit(client)
+            ADMISSION_DECISIONS.labels(decision="admitted").inc()
+            return
+        if self.queued >= self.max_queue:
+            ADMISSION_DECISIONS.labels(decision="rejected_full").inc()
+            raise Overloaded("Server is at capacity", self.retry_after())
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiting.setdefault(client, deque()).append(future)
+        self._per_client[client] = self._per_client.get(client, 0) + 1
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.queue_timeout)
+        except asyncio.CancelledError:
+            # El cliente se desconectó mientras esperaba
+            if future.done():
+                self.release(client, self._service_seconds)
+            else:
+                self._remove_waiter(client, future)
+            raise
+        except asyncio.TimeoutError:
+            if future.done():
+                # Se le asignó el slot justo al vencer el timeout: lo usa igual
+                ADMISSION_DECISIONS.labels(decision="queued").inc()
+                return
+            self._remove_waiter(client, future)
+            ADMISSION_DECISIONS.labels(decision="rejected_timeout").inc()
+            raise Overloaded("Timed out waiting for capacity", self.retry_after())
+        ADMISSION_DECISIONS.labels(decision="queued").inc()
+
+    def release(self, client: str, seconds: float):
+        self.in_flight -= 1
+        self._decrement_client(client)
+        self._service_seconds = 0.8 * self._service_seconds + 0.2 * seconds
+        IN_FLIGHT.set(self.in_flight)
+        self._dispatch()
+
+    def _admit(self, client: str):
+        self.in_flight += 1
+        self._per_client[client] = self._per_client.get(client, 0) + 1
+        IN_FLIGHT.set(self.in_flight)
+
+    def _dispatch(self):
+        # Round robin: se toma el primero de cada cliente y el cliente pasa al final
+        while self.in_flight < self.max_requests and self._waiting:
+            client, waiters = next(iter(self._waiting.items()))
+            future = waiters.popleft()
+            if waiters:
+                self._waiting.move_to_end(client)
+            else:
+                del self._waiting[client]
+            if future.cancelled():
+                self._decrement_client(client)
+                continue
+            # El cliente ya figura en _per_client desde que entró a la cola
+            self.in_flight += 1
+            IN_FLIGHT.set(self.in_flight)
+            future.set_result(None)
+
+    def _remove_waiter(self, client: str, future):
+        waiters = self._waiting.get(client)
+        if waiters is not None and future in waiters:
+            waiters.remove(future)
+            if not waiters:
+                del self._waiting[client]
+        self._decrement_client(client)
+
+    def _decrement_client(self, client: str):
+        remaining = self._per_client.get(client, 0) - 1
+        if remaining > 0:
+            self._per_client[client] = remaining
+        else:
+            self._per_client.pop(client, None)
+
+    # Presupuesto de imágenes
+
+    async def acquire_images(self, n: int) -> int:
+        """Reserva n imágenes del presupuesto de inferencia; devuelve lo reservado para release_images"""
+        n = min(n, self.max_images)
+        if self.images_in_flight + n <= self.max_images and not self._image_waiters:
+            self.images_in_flight += n
+            return n
+        future = asyncio.get_running_loop().create_future()
+        self._image_waiters.append((n, future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release_images(n)
+            elif (n, future) in self._image_waiters:
+                self._image_waiters.remove((n, future))
+                # Si era el primero de la cola, los siguientes pueden entrar ahora
+                self.release_images(0)
+            raise
+        return n
+
+    def release_images(self, n: int):
+        self.images_in_flight -= n
+        # FIFO estricto: un lote grande no queda postergado por lotes chicos
+        while self._image_waiters and self.images_in_flight + self._image_waiters[0][0] <= self.max_images:
+            wanted, future = self._image_waiters.popleft()
+            if future.done():
+                continue
+            self.images_in_flight += wanted
+            future.set_result(None)
+
+    # Middleware
+
+    def client_id(self, request: Request) -> str:
+        host = request.client.host if request.client else "unknown"
+        # Cualquiera puede mandar X-Client-Id: sólo vale si lo pone un proxy propio
+        if host in self.trusted_proxies:
+            return request.headers.get("x-client-id") or host
+        return host
+
+    async def middleware(self, request: Request, call_next):
+        if not request.url.path.startswith(ADMITTED_PREFIXES):
+            return await call_next(request)
+        client = self.client_id(request)
+        try:
+            await self.acquire(client)
+        except Overloaded as e:
+            return JSONResponse(
+                status_code=503,
+                content={"detail": e.reason},
+                headers={"Retry-After": str(e.retry_after)},
+            )
+        start = time.perf_counter()
+        try:
+            return await call_next(request)
+        finally:
+            self.release(client, time.perf_counter() - start)
+
+
+# Instancia compartida por main (middleware y health) y las rutas (presupuesto de imágenes)
+admission = AdmissionController()
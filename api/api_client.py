@@ -0,0 +1,89 @@
+import mimetypes
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Límite de archivos por request que acepta /predict/batch
+DEFAULT_BATCH_LIMIT = int(os.getenv("API_BATCH_LIMIT", "10"))
+DEFAULT_MAX_WORKERS = int(os.getenv("API_MAX_WORKERS", "4"))
+
+
+class OctagonAPIClient:
+    """
+    Cliente HTTP para la API de detección de octógonos.
+
+    Mantiene una sesión con pool de conexiones keep-alive, manda los bytes
+    originales de cada archivo con su content type (sin decodificar ni
+    re-codificar la imagen) y parte las selecciones grandes en lotes que
+    respetan el límite del backend, enviándolos en paralelo.
+    """
+
+    def __init__(self, base_url: str, batch_limit: int = DEFAULT_BATCH_LIMIT,
+                 max_workers: int = DEFAULT_MAX_WORKERS, timeout: float = 60.0):
+        self.base_url = base_url.rstrip("/")
+        self.batch_limit = batch_limit
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    @staticmethod
+    def read_file(path) -> tuple[str, bytes, str]:
+        """Lee un archivo tal cual está en disco y adivina su content type"""
+        path = Path(getattr(path, "name", path))
+        content_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        return path.name, path.read_bytes(), content_type
+
+    def health(self) -> dict:
+        response = self.session.get(f"{self.base_url}/health", timeout=5)
+        response.raise_for_status()
+        return response.json()
+
+    def predict_single(self, path) -> dict:
+        """Manda una imagen a /predict/single y devuelve el JSON de respuesta"""
+        files = {"file": self.read_file(path)}
+        response = self.session.post(f"{self.base_url}/predict/single", files=files, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def predict_batch(self, paths) -> dict:
+        """
+        Manda las imágenes a /predict/batch en lotes de hasta batch_limit archivos.
+
+        Los lotes se envían en paralelo y los resultados se devuelven en el
+        orden original, con el mismo formato que BatchPredictionResponse. Si
+        un lote falla, sus archivos aparecen como errores sin cortar el resto.
+        """
+        paths = list(paths)
+        chunks = [paths[i:i + self.batch_limit] for i in range(0, len(paths), self.batch_limit)]
+        workers = max(1, min(self.max_workers, len(chunks)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            responses = list(pool.map(self._post_batch_chunk, chunks))
+
+        merged = {"results": [], "total_processed": 0, "octagon_count": 0, "no_octagon_count": 0}
+        for response in responses:
+            merged["results"].extend(response["results"])
+            merged["total_processed"] += response["total_processed"]
+            merged["octagon_count"] += response["octagon_count"]
+            merged["no_octagon_count"] += response["no_octagon_count"]
+        return merged
+
+    def _post_batch_chunk(self, chunk) -> dict:
+        names = [Path(getattr(path, "name", path)).name for path in chunk]
+        try:
+            files = [("files", self.read_file(path)) for path in chunk]
+            response = self.session.post(f"{self.base_url}/predict/batch", files=files, timeout=self.timeout)
+            response.raise_for_status()
+            return response.json()
+        except (OSError, requests.RequestException) as e:
+            return {
+                "results": [{"filename": name, "error": str(e)} for name in names],
+                "total_processed": len(chunk),
+                "octagon_count": 0,
+                "no_octagon_count": 0,
+            }
@@ -0,0 +1,151 @@
+"""
+Evaluación del modo cascada de OctagonDetector sobre etiquetas_octogonos.csv.
+
+Corre una sola vez el pase de baja resolución y el modelo completo sobre
+todas las imágenes etiquetadas y, para cada umbral, simula la cascada:
+fracción de imágenes escaladas, accuracy frente a las etiquetas y al modelo
+completo, y ganancia de throughput estimada. Después mide la cascada real
+con el umbral elegido contra el modelo completo, de punta a punta sobre las
+imágenes ya decodificadas.
+
+Uso (desde el directorio api/):
+    python -m benchmarks.cascade_eval --images-root ../ --size 224 --thresholds 0.8 0.9 0.95 0.99
+"""
+import argparse
+import json
+import time
+from datetime import datetime
+from pathlib import Path
+
+import torch
+from PIL import Image
+
+from benchmarks.labeled_data import LABELS_CSV, read_labeled_images
+from benchmarks.load_test import DEFAULT_OUTPUT_DIR, REPO_DIR, _git_commit
+from model.predictor import OctagonDetector
+
+
+def _batches(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def collect_probabilities(detector, tensors, batch_size):
+    """Probabilidades del pase reducido y del completo, con el tiempo total de cada uno"""
+    screening, full = [], []
+    screening_seconds = full_seconds = 0.0
+    with torch.no_grad():
+        for batch in _batches(tensors, batch_size):
+            batch = torch.stack(batch).to(detector.device)
+            start = time.perf_counter()
+            screening.append(detector.screening_probabilities(batch).cpu())
+            screening_seconds += time.perf_counter() - start
+            start = time.perf_counter()
+            full.append(detector._probabilities(batch).cpu())
+            full_seconds += time.perf_counter() - start
+    return torch.cat(screening), torch.cat(full), screening_seconds, full_seconds
+
+
+def simulate(detector, screening, full, labels, screening_seconds, full_seconds, threshold, octagon_threshold):
+    detector.cascade_threshold = threshold
+    detector.cascade_octagon_threshold = octagon_threshold
+    escalate = detector.escalation_mask(screening)
+    combined = screening.clone()
+    combined[escalate] = full[escalate]
+    cascade_pred = combined.argmax(dim=1)
+    full_pred = full.argmax(dim=1)
+    fraction = escalate.float().mean().item()
+    # Costo estimado: todas pasan por el pase barato y una fracción por el completo
+    cascade_seconds = screening_seconds + fraction * full_seconds
+    return {
+        "threshold": threshold,
+        "octagon_threshold": octagon_threshold,
+        "escalated_fraction": round(fraction, 4),
+        "accuracy": round((cascade_pred == labels).float().mean().item(), 4),
+        "agreement_with_full": round((cascade_pred == full_pred).float().mean().item(), 4),
+        "estimated_speedup": round(full_seconds / cascade_seconds, 3) if cascade_seconds else None,
+    }
+
+
+def measure_end_to_end(detector, images, batch_size, cascade):
+    detector.cascade = cascade
+    detector.cascade_stats = {"screened": 0, "escalated": 0}
+    start = time.perf_counter()
+    for batch in _batches(images, batch_size):
+        detector.predict_batch(batch)
+    elapsed = time.perf_counter() - start
+    return {"seconds": round(elapsed, 3), "images_per_sec": round(len(images) / elapsed, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluación del modo cascada sobre etiquetas_octogonos.csv")
+    parser.add_argument("--model", type=str, default="Resnet18_podado.pth")
+    parser.add_argument("--labels", type=str, default=str(LABELS_CSV))
+    parser.add_argument("--images-root", type=str, default=str(REPO_DIR), help="Directorio donde están data/scraped_data/images/")
+    parser.add_argument("--size", type=int, default=224, help="Resolución del pase de screening")
+    parser.add_argument("--thresholds", nargs="+", type=float, default=[0.8, 0.9, 0.95, 0.99])
+    parser.add_argument("--octagon-threshold", type=float, default=None, help="Umbral para la clase con_octogono (por defecto igual al otro)")
+    parser.add_argument("--threshold", type=float, default=0.95, help="Umbral usado en la medición real")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--output", type=str, default=None)
+    args = parser.parse_args()
+
+    samples, skipped = read_labeled_images(args.labels, args.images_root, args.limit)
+    if not samples:
+        raise SystemExit(f"No se encontraron imágenes etiquetadas bajo {args.images_root}")
+    print(f"Imágenes etiquetadas: {len(samples)} (salteadas: {skipped})")
+
+    detector = OctagonDetector(args.model, cascade=False, cascade_size=args.size)
+    if not detector.is_loaded():
+        raise SystemExit("No se pudo cargar el modelo")
+    images = [Image.open(path).convert("RGB") for path, _ in samples]
+    labels = torch.tensor([label for _, label in samples])
+    tensors = [detector.preprocess(image) for image in images]
+    detector.warmup((args.batch_size,))
+
+    screening, full, screening_seconds, full_seconds = collect_probabilities(detector, tensors, args.batch_size)
+    full_accuracy = (full.argmax(dim=1) == labels).float().mean().item()
+    print(f"Modelo completo: accuracy={full_accuracy:.4f} | screening {screening_seconds:.2f}s vs completo {full_seconds:.2f}s")
+
+    sweep = []
+    for threshold in args.thresholds:
+        octagon_threshold = args.octagon_threshold if args.octagon_threshold is not None else threshold
+        result = simulate(detector, screening, full, labels, screening_seconds, full_seconds, threshold, octagon_threshold)
+        print(
+            f"umbral={threshold:.2f}/{octagon_threshold:.2f} | escaladas={result['escalated_fraction']:.1%} | "
+            f"accuracy={result['accuracy']:.4f} | acuerdo={result['agreement_with_full']:.4f} | "
+            f"speedup estimado={result['estimated_speedup']}x"
+        )
+        sweep.append(result)
+
+    detector.cascade_threshold = args.threshold
+    detector.cascade_octagon_threshold = args.octagon_threshold if args.octagon_threshold is not None else args.threshold
+    full_run = measure_end_to_end(detector, images, args.batch_size, cascade=False)
+    cascade_run = measure_end_to_end(detector, images, args.batch_size, cascade=True)
+    cascade_run["escalated_fraction"] = detector.get_cascade_info()["escalated_fraction"]
+    gain = cascade_run["images_per_sec"] / full_run["images_per_sec"]
+    print(
+        f"Medición real (umbral {args.threshold}): completo {full_run['images_per_sec']} img/s | "
+        f"cascada {cascade_run['images_per_sec']} img/s ({gain:.2f}x) | escaladas {cascade_run['escalated_fraction']:.1%}"
+    )
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "images": len(samples),
+        "skipped": skipped,
+        "screening_size": args.size,
+        "batch_size": args.batch_size,
+        "full_model_accuracy": round(full_accuracy, 4),
+        "threshold_sweep": sweep,
+        "end_to_end": {"threshold": args.threshold, "full": full_run, "cascade": cascade_run, "throughput_gain": round(gain, 3)},
+    }
+    output = Path(args.output) if args.output else DEFAULT_OUTPUT_DIR / f"cascade_eval_{report['timestamp'].replace(':', '')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+    print(f"Resultados guardados en {output}")
+
+
+if __name__ == "__main__":
+    main()
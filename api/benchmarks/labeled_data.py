@@ -0,0 +1,43 @@
+"""
+Imágenes etiquetadas de etiquetas_octogonos.csv para los benchmarks.
+
+La lectura del CSV es la de Clasificador/dataset.py (read_labels), así el
+entrenamiento y los benchmarks resuelven y filtran las filas igual. Los
+módulos de Clasificador se cargan por ruta: "utils" y "dataset" son
+ambiguos con los paquetes de la API y del scraper.
+"""
+import csv
+import importlib.util
+
+from benchmarks.load_test import REPO_DIR
+
+LABELS_CSV = REPO_DIR / "etiquetas_octogonos.csv"
+CLASIFICADOR_DIR = REPO_DIR / "Clasificador"
+
+_modules = {}
+
+
+def clasificador_module(name):
+    """Módulo Clasificador/<name>.py, cargado una sola vez por proceso"""
+    if name not in _modules:
+        spec = importlib.util.spec_from_file_location(f"clasificador_{name}", CLASIFICADOR_DIR / f"{name}.py")
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _modules[name] = module
+    return _modules[name]
+
+
+def read_labeled_images(csv_path=LABELS_CSV, images_root=REPO_DIR, limit=None):
+    """
+    Devuelve [(ruta_local, clase)] para las filas del CSV cuya imagen existe
+    bajo images_root y cuya etiqueta es válida (ver read_labels en
+    Clasificador/dataset.py), a lo sumo limit. También devuelve cuántas
+    filas se saltearon por no cumplir eso.
+    """
+    samples = clasificador_module("dataset").read_labels(csv_path, images_root)
+    with open(csv_path, newline="") as f:
+        rows = sum(1 for _ in csv.DictReader(f))
+    skipped = rows - len(samples)
+    if limit:
+        samples = samples[:limit]
+    return samples, skipped
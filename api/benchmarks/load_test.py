@@ -0,0 +1,271 @@
+"""
+Benchmark de carga para la API de detección de octógonos.
+
+Dispara requests concurrentes contra /predict/single y /predict/batch usando
+las imágenes de prueba del repositorio y reporta requests/seg, imágenes/seg y
+latencias p50/p95/p99. Los resultados se guardan en JSON para poder comparar
+corridas entre commits y configuraciones de serving.
+
+Uso (desde el directorio api/):
+    # Levanta la app en el mismo proceso
+    python -m benchmarks.load_test --concurrency 1 4 8 --batch-sizes 1 5 10
+
+    # Contra una instancia ya levantada
+    python -m benchmarks.load_test --url http://localhost:8000 --label docker-1worker
+"""
+import argparse
+import itertools
+import json
+import mimetypes
+import os
+import platform
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import requests
+
+API_DIR = Path(__file__).resolve().parent.parent
+REPO_DIR = API_DIR.parent
+DEFAULT_OUTPUT_DIR = API_DIR / "benchmarks" / "results"
+SAMPLE_PATTERNS = ["prueba*.jpg", "prueba*.webp"]
+
+
+def find_sample_images() -> list[Path]:
+    """Busca las imágenes de prueba incluidas en api/ y en la raíz del repo"""
+    paths = []
+    for directory in (API_DIR, REPO_DIR):
+        for pattern in SAMPLE_PATTERNS:
+            paths.extend(sorted(directory.glob(pattern)))
+    return paths
+
+
+def load_samples(paths) -> list[tuple[str, bytes, str]]:
+    """Lee las imágenes una sola vez para no medir I/O de disco en el benchmark"""
+    samples = []
+    for path in paths:
+        path = Path(path)
+        content_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        samples.append((path.name, path.read_bytes(), content_type))
+    if not samples:
+        raise FileNotFoundError("No se encontraron imágenes de prueba para el benchmark")
+    return samples
+
+
+def percentile(values, q):
+    """Percentil con interpolación lineal (q entre 0 y 100)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    pos = (len(ordered) - 1) * q / 100
+    lower = int(pos)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (pos - lower)
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_inprocess_server(host="127.0.0.1", port=None):
+    """Levanta uvicorn con la app de main.py en un hilo de este mismo proceso"""
+    import uvicorn
+
+    if str(API_DIR) not in sys.path:
+        sys.path.insert(0, str(API_DIR))
+    port = port or _free_port()
+    config = uvicorn.Config("main:app", host=host, port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    return server, thread, f"http://{host}:{port}"
+
+
+def wait_until_ready(url, timeout=120.0):
+    """Espera a que /health responda con el modelo cargado y precalentado"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            response = requests.get(f"{url}/health", timeout=2)
+            if response.status_code == 200 and response.json().get("ready"):
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    raise TimeoutError(f"La API en {url} no estuvo lista en {timeout:.0f}s")
+
+
+def _build_files(endpoint, samples, batch_size, counter):
+    if endpoint == "single":
+        name, data, content_type = samples[next(counter) % len(samples)]
+        return {"file": (name, data, content_type)}, 1
+    files = []
+    for _ in range(batch_size):
+        name, data, content_type = samples[next(counter) % len(samples)]
+        files.append(("files", (name, data, content_type)))
+    return files, batch_size
+
+
+def run_scenario(url, endpoint, samples, concurrency, batch_size=1, requests_per_worker=20, warmup=2, timeout=60.0):
+    """
+    Ejecuta un escenario de carga y devuelve sus métricas.
+
+    Cada worker usa su propia sesión keep-alive y manda requests_per_worker
+    requests medidos, precedidos por warmup requests que no se cuentan.
+    """
+    target = f"{url}/predict/{endpoint}"
+    batch_size = 1 if endpoint == "single" else batch_size
+    latencies = []
+    errors = []
+    images_ok = 0
+    lock = threading.Lock()
+    measure_start = []
+    # Todos los workers terminan el warmup antes de empezar a medir
+    barrier = threading.Barrier(concurrency, action=lambda: measure_start.append(time.perf_counter()))
+
+    def worker(worker_id):
+        nonlocal images_ok
+        counter = itertools.count(worker_id)
+        with requests.Session() as session:
+            for i in range(warmup + requests_per_worker):
+                if i == warmup:
+                    barrier.wait()
+                files, n_images = _build_files(endpoint, samples, batch_size, counter)
+                start = time.perf_counter()
+                try:
+                    response = session.post(target, files=files, timeout=timeout)
+                    ok = response.status_code == 200
+                    error = None if ok else f"HTTP {response.status_code}"
+                except requests.RequestException as e:
+                    ok, error = False, type(e).__name__
+                elapsed = time.perf_counter() - start
+                if i < warmup:
+                    continue
+                with lock:
+                    if ok:
+                        latencies.append(elapsed)
+                        images_ok += n_images
+                    else:
+                        errors.append(error)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, range(concurrency)))
+    wall = time.perf_counter() - measure_start[0]
+
+    completed = len(latencies)
+    error_counts = {}
+    for error in errors:
+        error_counts[error] = error_counts.get(error, 0) + 1
+    to_ms = lambda v: None if v is None else round(v * 1000, 2)
+    return {
+        "endpoint": endpoint,
+        "concurrency": concurrency,
+        "batch_size": batch_size,
+        "requests": completed + len(errors),
+        "errors": len(errors),
+        "error_types": error_counts,
+        "wall_seconds": round(wall, 3),
+        "requests_per_sec": round(completed / wall, 2),
+        "images_per_sec": round(images_ok / wall, 2),
+        "latency_ms": {
+            "mean": to_ms(sum(latencies) / completed) if completed else None,
+            "p50": to_ms(percentile(latencies, 50)),
+            "p95": to_ms(percentile(latencies, 95)),
+            "p99": to_ms(percentile(latencies, 99)),
+            "max": to_ms(max(latencies)) if latencies else None,
+        },
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(url, endpoints, concurrencies, batch_sizes, samples, requests_per_worker=20, warmup=2, label=None):
+    """Recorre la grilla endpoint x concurrencia x batch y arma el reporte completo"""
+    scenarios = []
+    for endpoint in endpoints:
+        sizes = [1] if endpoint == "single" else batch_sizes
+        for concurrency, batch_size in itertools.product(concurrencies, sizes):
+            result = run_scenario(url, endpoint, samples, concurrency, batch_size, requests_per_worker, warmup)
+            print_scenario(result)
+            scenarios.append(result)
+    return {
+        "label": label,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "url": url,
+        "host": {
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+        },
+        "samples": [name for name, _, _ in samples],
+        "requests_per_worker": requests_per_worker,
+        "warmup_requests": warmup,
+        "scenarios": scenarios,
+    }
+
+
+def print_scenario(result):
+    latency = result["latency_ms"]
+    print(
+        f"{result['endpoint']:>6} | conc={result['concurrency']:>3} | batch={result['batch_size']:>3} | "
+        f"{result['requests_per_sec']} req/s | {result['images_per_sec']} img/s | "
+        f"p50={latency['p50']}ms p95={latency['p95']}ms p99={latency['p99']}ms | errors={result['errors']}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de carga de la API de octógonos")
+    parser.add_argument("--url", type=str, default=None, help="URL de una API ya levantada (si no se pasa, se levanta en proceso)")
+    parser.add_argument("--endpoints", nargs="+", choices=["single", "batch"], default=["single", "batch"])
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 4, 8], help="Niveles de concurrencia a probar")
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[1, 5, 10], help="Tamaños de lote para /predict/batch")
+    parser.add_argument("--requests", type=int, default=20, help="Requests medidos por worker")
+    parser.add_argument("--warmup", type=int, default=2, help="Requests de warmup por worker (no se miden)")
+    parser.add_argument("--images", nargs="+", default=None, help="Imágenes a usar (por defecto prueba*.jpg/webp)")
+    parser.add_argument("--label", type=str, default=None, help="Etiqueta libre para identificar la configuración")
+    parser.add_argument("--output", type=str, default=None, help="Archivo JSON de salida")
+    args = parser.parse_args()
+
+    samples = load_samples(args.images or find_sample_images())
+
+    server = None
+    url = args.url
+    if url is None:
+        server, _, url = start_inprocess_server()
+        print(f"API levantada en proceso en {url}")
+    url = url.rstrip("/")
+    wait_until_ready(url)
+
+    try:
+        report = run_benchmark(
+            url, args.endpoints, args.concurrency, args.batch_sizes, samples,
+            requests_per_worker=args.requests, warmup=args.warmup, label=args.label,
+        )
+        report["mode"] = "in-process" if server else "remote"
+    finally:
+        if server is not None:
+            server.should_exit = True
+
+    output = Path(args.output) if args.output else DEFAULT_OUTPUT_DIR / f"load_test_{report['timestamp'].replace(':', '')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+    print(f"Resultados guardados en {output}")
+
+
+if __name__ == "__main__":
+    main()
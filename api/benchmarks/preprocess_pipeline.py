@@ -0,0 +1,157 @@
+"""
+Benchmark de la decodificación en paralelo de /predict/batch y /predict/urls,
+y del doble buffer de /predict/urls.
+
+Para cada tamaño de lote compara, sobre las mismas imágenes de prueba (ya
+leídas a memoria como bytes, igual que llegan en un upload):
+
+- serial: decodificar y preprocesar todo el lote en un solo hilo y recién
+  después pasarlo por el modelo (el camino anterior de /predict/batch).
+- parallel: el camino de /predict/batch; cada imagen se decodifica y
+  preprocesa con ingest.to_tensor en un pool de hilos (en el servidor, el
+  threadpool de Starlette vía asyncio.gather) y el lote completo pasa por
+  un único predict_tensors.
+- solapado (uno por cada --chunk-sizes): el camino de /predict/urls
+  (predict_downloads); el lote se parte en bloques y el siguiente se
+  decodifica en el pool mientras el actual está en el modelo.
+
+Para serial y parallel se reporta por separado el tiempo de decodificación y
+el de inferencia, para ver cuánto del lote se va en cada etapa; en el modo
+solapado las dos etapas se pisan y sólo se reporta el total.
+
+Uso (desde el directorio api/):
+    python -m benchmarks.preprocess_pipeline --batch-sizes 8 16 32 64 --batches 8 --workers 4 --chunk-sizes 4 8 16
+"""
+import argparse
+import io
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import torch
+
+import ingest
+from benchmarks.load_test import DEFAULT_OUTPUT_DIR, _git_commit, find_sample_images, load_samples
+from model.predictor import OctagonDetector
+
+
+def decode_serial(detector, payloads, pool):
+    return [ingest.bytes_to_tensor(detector, data) for data in payloads]
+
+
+def decode_parallel(detector, payloads, pool):
+    return list(pool.map(lambda data: ingest.to_tensor(detector, io.BytesIO(data)), payloads))
+
+
+def run_overlapped(detector, payloads, pool, chunk):
+    """Como predict_downloads: decodifica el bloque siguiente en el pool mientras corre el forward del actual"""
+    def submit(part):
+        return [pool.submit(ingest.to_tensor, detector, io.BytesIO(data)) for data in part]
+
+    chunks = [payloads[i:i + chunk] for i in range(0, len(payloads), chunk)]
+    pending = submit(chunks[0])
+    for i in range(len(chunks)):
+        tensors = [future.result() for future in pending]
+        if i + 1 < len(chunks):
+            pending = submit(chunks[i + 1])
+        detector.predict_tensors(torch.stack(tensors))
+
+
+def measure(decode, detector, payloads, batch_size, repeats, pool, chunk=None):
+    best = None
+    for _ in range(repeats):
+        decode_seconds = inference_seconds = 0.0
+        start_all = time.perf_counter()
+        for i in range(0, len(payloads), batch_size):
+            start = time.perf_counter()
+            if chunk:
+                # Decodificación y forward solapados: no se pueden separar los tiempos
+                run_overlapped(detector, payloads[i:i + batch_size], pool, chunk)
+                continue
+            tensors = decode(detector, payloads[i:i + batch_size], pool)
+            decoded = time.perf_counter()
+            detector.predict_tensors(torch.stack(tensors))
+            decode_seconds += decoded - start
+            inference_seconds += time.perf_counter() - decoded
+        total = time.perf_counter() - start_all
+        if best is None or total < best["seconds"]:
+            best = {
+                "seconds": round(total, 3),
+                "decode_seconds": round(decode_seconds, 3),
+                "inference_seconds": round(inference_seconds, 3),
+                "images_per_sec": round(len(payloads) / total, 2),
+            }
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Decodificación serial, en paralelo y solapada con la inferencia por lote")
+    parser.add_argument("--model", type=str, default="Resnet18_podado.pth")
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[8, 16, 32, 64])
+    parser.add_argument("--batches", type=int, default=8, help="Lotes por medición")
+    parser.add_argument("--workers", type=int, default=None, help="Hilos de decodificación (por defecto min(32, cores + 4))")
+    parser.add_argument("--repeats", type=int, default=3, help="Repeticiones por medición; se reporta la mejor")
+    parser.add_argument("--chunk-sizes", nargs="+", type=int, default=[4, 8, 16],
+                        help="Tamaños de bloque del modo solapado (se omiten los >= al lote)")
+    parser.add_argument("--output", type=str, default=None)
+    args = parser.parse_args()
+
+    samples = load_samples(find_sample_images())
+    detector = OctagonDetector(args.model, cascade=False)
+    if not detector.is_loaded():
+        raise SystemExit("No se pudo cargar el modelo")
+    workers = args.workers or min(32, (os.cpu_count() or 1) + 4)
+    print(f"Imágenes de prueba: {len(samples)} | hilos de decodificación: {workers}")
+
+    results = []
+    with ThreadPoolExecutor(workers, thread_name_prefix="decode") as pool:
+        for batch_size in args.batch_sizes:
+            total = batch_size * args.batches
+            payloads = [samples[i % len(samples)][1] for i in range(total)]
+            detector.warmup((batch_size,))
+            serial = measure(decode_serial, detector, payloads, batch_size, args.repeats, pool)
+            parallel = measure(decode_parallel, detector, payloads, batch_size, args.repeats, pool)
+            overlapped = {}
+            for chunk in args.chunk_sizes:
+                if chunk < batch_size:
+                    detector.warmup((chunk,))
+                    overlapped[chunk] = measure(None, detector, payloads, batch_size, args.repeats, pool, chunk)
+            speedup = parallel["images_per_sec"] / serial["images_per_sec"]
+            print(
+                f"lote={batch_size:>3} | serial {serial['images_per_sec']:>8} img/s "
+                f"(decode {serial['decode_seconds']}s) | parallel {parallel['images_per_sec']:>8} img/s "
+                f"(decode {parallel['decode_seconds']}s) | {speedup:.2f}x"
+            )
+            for chunk, result in overlapped.items():
+                print(
+                    f"{'':>9}| solapado en bloques de {chunk:>2}: {result['images_per_sec']:>8} img/s "
+                    f"| {result['images_per_sec'] / parallel['images_per_sec']:.2f}x vs. parallel"
+                )
+            results.append({
+                "batch_size": batch_size,
+                "images": total,
+                "serial": serial,
+                "parallel": parallel,
+                "overlapped": {str(chunk): result for chunk, result in overlapped.items()},
+                "speedup": round(speedup, 3),
+            })
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "samples": len(samples),
+        "decode_workers": workers,
+        "torch_threads": torch.get_num_threads(),
+        "results": results,
+    }
+    output = Path(args.output) if args.output else DEFAULT_OUTPUT_DIR / f"preprocess_pipeline_{report['timestamp'].replace(':', '')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+    print(f"Resultados guardados en {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""
+Matriz de variantes de serving de OctagonDetector: accuracy x latencia x memoria.
+
+Cada variante (checkpoint, resolución de entrada, threads de torch,
+cuantización, cascada, decodificación JPEG en modo draft) corre en su propio proceso, así el pico de RSS
+(ru_maxrss) es sólo de esa variante y la configuración de threads arranca
+limpia. Para cada una se mide:
+
+- accuracy, precision, recall y F1 sobre las imágenes de
+  etiquetas_octogonos.csv (classification_metrics de Clasificador/utils.py);
+- imágenes/seg y latencia p50/p99 por lote, para cada tamaño de lote;
+- pico de RSS del proceso.
+
+Las variantes por defecto están en DEFAULT_VARIANTS; con --variants se pasa
+un JSON con una lista de objetos con los mismos campos.
+
+"draft": true decodifica los JPEG como ingest.decode con
+UPLOAD_DRAFT_DECODE=1, para medir cuánta accuracy cuesta antes de activarlo.
+
+"quantize": "dynamic" aplica torch.ao.quantization.quantize_dynamic, que
+sólo cuantiza las capas lineales (fc y out); las convoluciones siguen en
+fp32.
+
+Uso (desde el directorio api/):
+    python -m benchmarks.serving_variants --images-root .. --batch-sizes 1 8 16 32
+    python -m benchmarks.serving_variants --images-root .. --only fp32 int8_dynamic --limit 200
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+from benchmarks.labeled_data import LABELS_CSV, clasificador_module, read_labeled_images
+from benchmarks.load_test import API_DIR, DEFAULT_OUTPUT_DIR, REPO_DIR, _git_commit, percentile
+
+RESULT_PREFIX = "RESULT "
+
+DEFAULT_VARIANTS = [
+    {"name": "fp32"},
+    {"name": "fp32_1thread", "threads": 1},
+    {"name": "int8_dynamic", "quantize": "dynamic"},
+    {"name": "fp32_384", "resolution": 384},
+    {"name": "cascade_224", "cascade": True},
+    {"name": "fp32_draft", "draft": True},
+]
+
+
+def load_image(path, draft=False):
+    import ingest
+
+    with open(path, "rb") as f:
+        return ingest.decode(f, draft).convert("RGB")
+
+
+def build_detector(variant):
+    import torch
+    import torch.nn as nn
+    import torchvision.transforms as transforms
+
+    from model.predictor import OctagonDetector
+
+    detector = OctagonDetector(variant.get("model", "Resnet18_podado.pth"), cascade=variant.get("cascade", False))
+    if not detector.is_loaded():
+        raise RuntimeError(f"No se pudo cargar {variant.get('model')}")
+    if variant.get("quantize") == "dynamic":
+        detector.model = torch.ao.quantization.quantize_dynamic(detector.model, {nn.Linear}, dtype=torch.qint8)
+    resolution = variant.get("resolution", 500)
+    if resolution != 500:
+        detector.transform = transforms.Compose([
+            transforms.Resize((resolution, resolution)),
+            transforms.ToTensor(),
+            detector.normalize,
+        ])
+    return detector
+
+
+def evaluate_accuracy(detector, samples, batch_size=16, draft=False):
+    import torch
+
+    labels, preds = [], []
+    for i in range(0, len(samples), batch_size):
+        chunk = samples[i:i + batch_size]
+        batch = torch.stack([detector.preprocess(load_image(path, draft)) for path, _ in chunk])
+        preds.extend(int(has_octagon) for has_octagon, _ in detector.predict_tensors(batch))
+        labels.extend(label for _, label in chunk)
+    metrics = clasificador_module("utils").classification_metrics(labels, preds)
+    return {key: round(value, 4) if isinstance(value, float) else value for key, value in metrics.items()}
+
+
+def measure_throughput(detector, tensors, batch_sizes, rounds):
+    import torch
+
+    results = {}
+    for batch_size in batch_sizes:
+        batch = torch.stack([tensors[i % len(tensors)] for i in range(batch_size)])
+        detector.warmup((batch_size,), iterations=2)
+        latencies = []
+        start = time.perf_counter()
+        for _ in range(rounds):
+            t0 = time.perf_counter()
+            detector.predict_tensors(batch)
+            latencies.append(time.perf_counter() - t0)
+        elapsed = time.perf_counter() - start
+        results[batch_size] = {
+            "images_per_sec": round(batch_size * rounds / elapsed, 2),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        }
+    return results
+
+
+def run_variant(variant, labels_csv, images_root, limit, batch_sizes, rounds):
+    """Corre dentro del proceso hijo; devuelve el resultado de la variante"""
+    import torch
+
+    if variant.get("threads"):
+        torch.set_num_threads(variant["threads"])
+    samples, skipped = read_labeled_images(labels_csv, images_root, limit)
+    if not samples:
+        raise RuntimeError(f"No se encontraron imágenes etiquetadas bajo {images_root}")
+    load_start = time.perf_counter()
+    detector = build_detector(variant)
+    load_seconds = time.perf_counter() - load_start
+
+    draft = variant.get("draft", False)
+    accuracy = evaluate_accuracy(detector, samples, draft=draft)
+    tensors = [detector.preprocess(load_image(path, draft)) for path, _ in samples[:max(batch_sizes)]]
+    throughput = measure_throughput(detector, tensors, batch_sizes, rounds)
+    # ru_maxrss está en KB en Linux y en bytes en macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_mb = peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    return {
+        "variant": variant,
+        "images": len(samples),
+        "skipped": skipped,
+        "threads": torch.get_num_threads(),
+        "load_seconds": round(load_seconds, 3),
+        "metrics": accuracy,
+        "throughput": throughput,
+        "peak_rss_mb": round(peak_mb, 1),
+    }
+
+
+def spawn_variant(variant, args):
+    command = [
+        sys.executable, "-m", "benchmarks.serving_variants", "--child", json.dumps(variant),
+        "--labels", args.labels, "--images-root", args.images_root, "--rounds", str(args.rounds),
+        "--batch-sizes", *map(str, args.batch_sizes),
+    ]
+    if args.limit:
+        command += ["--limit", str(args.limit)]
+    env = dict(os.environ)
+    if variant.get("threads"):
+        env["OMP_NUM_THREADS"] = env["MKL_NUM_THREADS"] = str(variant["threads"])
+    completed = subprocess.run(command, cwd=API_DIR, env=env, capture_output=True, text=True)
+    for line in reversed(completed.stdout.splitlines()):
+        if line.startswith(RESULT_PREFIX):
+            return json.loads(line[len(RESULT_PREFIX):])
+    error = (completed.stderr.strip().splitlines() or ["sin salida"])[-1]
+    return {"variant": variant, "error": error}
+
+
+def print_table(results, batch_sizes):
+    header = ["variante", "acc", "f1"] + [f"img/s@{b}" for b in batch_sizes] + [f"p99ms@{batch_sizes[0]}", "RSS MB"]
+    rows = []
+    for r in results:
+        name = r["variant"]["name"]
+        if "error" in r:
+            rows.append([name, "error: " + r["error"]])
+            continue
+        throughput = r["throughput"]
+        rows.append(
+            [name, f"{r['metrics']['accuracy']:.4f}", f"{r['metrics']['f1']:.4f}"]
+            + [f"{throughput[str(b)]['images_per_sec']:.1f}" for b in batch_sizes]
+            + [f"{throughput[str(batch_sizes[0])]['p99_ms']:.1f}", f"{r['peak_rss_mb']:.0f}"]
+        )
+    widths = [max(len(str(row[i])) for row in [header] + rows if i < len(row)) for i in range(len(header))]
+    for row in [header] + rows:
+        print("  ".join(str(cell).ljust(widths[i]) if i < len(widths) else str(cell) for i, cell in enumerate(row)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Matriz de variantes de serving: accuracy x latencia x memoria")
+    parser.add_argument("--labels", type=str, default=str(LABELS_CSV))
+    parser.add_argument("--images-root", type=str, default=str(REPO_DIR), help="Directorio donde están data/scraped_data/images/")
+    parser.add_argument("--variants", type=str, default=None, help="JSON con la lista de variantes (por defecto DEFAULT_VARIANTS)")
+    parser.add_argument("--only", nargs="+", default=None, help="Correr sólo estas variantes (por nombre)")
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[1, 8, 16, 32])
+    parser.add_argument("--rounds", type=int, default=20, help="Lotes medidos por tamaño de lote")
+    parser.add_argument("--limit", type=int, default=None, help="Máximo de imágenes etiquetadas a evaluar")
+    parser.add_argument("--output", type=str, default=None)
+    parser.add_argument("--child", type=str, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        result = run_variant(json.loads(args.child), args.labels, args.images_root, args.limit, args.batch_sizes, args.rounds)
+        print(RESULT_PREFIX + json.dumps(result))
+        return
+
+    variants = DEFAULT_VARIANTS
+    if args.variants:
+        with open(args.variants) as f:
+            variants = json.load(f)
+    if args.only:
+        variants = [v for v in variants if v["name"] in args.only]
+
+    results = []
+    for variant in variants:
+        print(f"▶ {variant['name']}")
+        results.append(spawn_variant(variant, args))
+    print()
+    print_table(results, args.batch_sizes)
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "batch_sizes": args.batch_sizes,
+        "rounds": args.rounds,
+        "results": results,
+    }
+    output = Path(args.output) if args.output else DEFAULT_OUTPUT_DIR / f"serving_variants_{report['timestamp'].replace(':', '')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+    print(f"Resultados guardados en {output}")
+
+
+if __name__ == "__main__":
+    main()
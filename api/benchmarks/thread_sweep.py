@@ -0,0 +1,111 @@
+"""
+Barrido de configuraciones de serving (workers x threads) en este host.
+
+Para cada combinación levanta serve.py en un puerto libre, corre un
+escenario de carga con benchmarks.load_test y se queda con la que da más
+imágenes/seg manteniendo la latencia p95 por debajo del objetivo.
+
+Uso (desde el directorio api/):
+    python -m benchmarks.thread_sweep --target-p95-ms 500 --endpoint batch --batch-size 10
+    python -m benchmarks.thread_sweep --workers 1 2 4 --threads 1 2 4 --pin
+"""
+import argparse
+import json
+import subprocess
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from benchmarks.load_test import (
+    API_DIR, DEFAULT_OUTPUT_DIR, _free_port, _git_commit, find_sample_images,
+    load_samples, run_scenario, wait_until_ready,
+)
+from serve import effective_cpu_count
+
+
+def candidate_topologies(cores, workers=None, threads=None):
+    """Combinaciones workers x threads que no sobresuscriben los cores"""
+    workers = workers or [w for w in (1, 2, 3, 4, 6, 8, 12, 16) if w <= cores]
+    threads = threads or [t for t in (1, 2, 4, 8, 16) if t <= cores]
+    return [(w, t) for w in workers for t in threads if w * t <= cores]
+
+
+def run_configuration(workers, threads, pin, samples, endpoint, batch_size, concurrency, requests_per_worker):
+    port = _free_port()
+    command = [
+        sys.executable, "serve.py", "--host", "127.0.0.1", "--port", str(port),
+        "--workers", str(workers), "--threads", str(threads), "--log-level", "warning",
+    ]
+    if pin:
+        command.append("--pin")
+    server = subprocess.Popen(command, cwd=API_DIR)
+    url = f"http://127.0.0.1:{port}"
+    try:
+        wait_until_ready(url)
+        # Todos los workers deben haber cargado el modelo antes de medir
+        run_scenario(url, endpoint, samples, concurrency, batch_size, requests_per_worker=2, warmup=0)
+        return run_scenario(url, endpoint, samples, concurrency, batch_size, requests_per_worker)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Barrido de workers x threads para la API de octógonos")
+    parser.add_argument("--workers", nargs="+", type=int, default=None)
+    parser.add_argument("--threads", nargs="+", type=int, default=None)
+    parser.add_argument("--pin", action="store_true", help="Fijar cada worker a sus cores")
+    parser.add_argument("--endpoint", choices=["single", "batch"], default="batch")
+    parser.add_argument("--batch-size", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=None, help="Clientes concurrentes (por defecto 2 x workers)")
+    parser.add_argument("--requests", type=int, default=20, help="Requests medidos por cliente")
+    parser.add_argument("--target-p95-ms", type=float, default=1000.0, help="Latencia p95 máxima aceptable")
+    parser.add_argument("--output", type=str, default=None)
+    args = parser.parse_args()
+
+    cores = effective_cpu_count()
+    samples = load_samples(find_sample_images())
+    results = []
+    for workers, threads in candidate_topologies(cores, args.workers, args.threads):
+        concurrency = args.concurrency or 2 * workers
+        print(f"▶ workers={workers} threads={threads} concurrency={concurrency}")
+        result = run_configuration(
+            workers, threads, args.pin, samples, args.endpoint, args.batch_size, concurrency, args.requests
+        )
+        result.update({"workers": workers, "threads": threads, "pin": args.pin})
+        print(
+            f"  {result['images_per_sec']} img/s | p95={result['latency_ms']['p95']}ms | errors={result['errors']}"
+        )
+        results.append(result)
+
+    eligible = [
+        r for r in results
+        if r["errors"] == 0 and r["latency_ms"]["p95"] is not None and r["latency_ms"]["p95"] <= args.target_p95_ms
+    ]
+    best = max(eligible, key=lambda r: r["images_per_sec"]) if eligible else None
+    if best:
+        print(
+            f"🏆 Mejor configuración: workers={best['workers']} threads={best['threads']} "
+            f"({best['images_per_sec']} img/s, p95={best['latency_ms']['p95']}ms)"
+        )
+    else:
+        print(f"❌ Ninguna configuración cumple p95 <= {args.target_p95_ms}ms")
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "effective_cpus": cores,
+        "target_p95_ms": args.target_p95_ms,
+        "endpoint": args.endpoint,
+        "batch_size": args.batch_size,
+        "best": best,
+        "results": results,
+    }
+    output = Path(args.output) if args.output else DEFAULT_OUTPUT_DIR / f"thread_sweep_{report['timestamp'].replace(':', '')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+    print(f"Resultados guardados en {output}")
+
+
+if __name__ == "__main__":
+    main()
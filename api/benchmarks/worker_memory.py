@@ -0,0 +1,167 @@
+"""
+Memoria por worker de serve.py con y sin pesos compartidos (MODEL_MMAP).
+
+Para cada cantidad de workers levanta serve.py en un puerto libre, espera a
+que todos los workers activen el modelo, manda algunos requests para que
+cada uno reserve sus buffers de inferencia y lee /proc/<pid>/smaps_rollup
+de cada worker. El PSS reparte las páginas compartidas entre los procesos
+que las mapean, así que es la medida que baja cuando los pesos se
+comparten; el RSS cuenta las páginas compartidas completas en cada uno.
+
+Sólo Linux (usa /proc).
+
+Uso (desde el directorio api/):
+    python -m benchmarks.worker_memory --workers 1 2 4 8
+    python -m benchmarks.worker_memory --workers 1 2 4 8 --modes mmap
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from benchmarks.load_test import (
+    API_DIR, DEFAULT_OUTPUT_DIR, _free_port, _git_commit, find_sample_images,
+    load_samples, run_scenario,
+)
+
+MODES = {"copy": "0", "mmap": "1"}
+
+
+def read_kb(path: Path, fields) -> dict:
+    values = {}
+    for line in path.read_text().splitlines():
+        key, _, rest = line.partition(":")
+        if key in fields:
+            values[key] = int(rest.split()[0])
+    return values
+
+
+def weights_pss_kb(pid: int, suffix: str = ".pth") -> int:
+    """PSS de los mapeos del archivo de pesos (sólo existen en modo mmap)"""
+    total = 0
+    in_weights = False
+    for line in Path(f"/proc/{pid}/smaps").read_text().splitlines():
+        head = line.split()
+        if head and "-" in head[0] and ":" not in head[0]:
+            # Línea de encabezado de un mapeo: "inicio-fin perms offset dev inode [ruta]"
+            in_weights = len(head) >= 6 and head[5].endswith(suffix)
+        elif in_weights and line.startswith("Pss:"):
+            total += int(line.split()[1])
+    return total
+
+
+def worker_pids(parent: int) -> list[int]:
+    """Procesos worker (multiprocessing spawn) hijos de serve.py"""
+    pids = []
+    for entry in Path("/proc").iterdir():
+        if not entry.name.isdigit():
+            continue
+        try:
+            ppid = int((entry / "stat").read_text().rsplit(")", 1)[1].split()[1])
+            cmdline = (entry / "cmdline").read_bytes().decode(errors="replace")
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == parent and "spawn_main" in cmdline:
+            pids.append(int(entry.name))
+    return sorted(pids)
+
+
+def measure_workers(pids) -> list[dict]:
+    fields = {"Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty"}
+    workers = []
+    for pid in pids:
+        rollup = read_kb(Path(f"/proc/{pid}/smaps_rollup"), fields)
+        workers.append({
+            "pid": pid,
+            "rss_mb": round(rollup["Rss"] / 1024, 1),
+            "pss_mb": round(rollup["Pss"] / 1024, 1),
+            "shared_mb": round((rollup["Shared_Clean"] + rollup["Shared_Dirty"]) / 1024, 1),
+            "private_mb": round((rollup["Private_Clean"] + rollup["Private_Dirty"]) / 1024, 1),
+            "weights_pss_mb": round(weights_pss_kb(pid) / 1024, 1),
+        })
+    return workers
+
+
+def run_configuration(workers, mode, samples, requests_per_worker, timeout=300.0):
+    port = _free_port()
+    command = [
+        sys.executable, "serve.py", "--host", "127.0.0.1", "--port", str(port),
+        "--workers", str(workers), "--log-level", "warning",
+    ]
+    env = {**os.environ, "MODEL_MMAP": MODES[mode], "PYTHONUNBUFFERED": "1"}
+    server = subprocess.Popen(command, cwd=API_DIR, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    active = threading.Semaphore(0)
+
+    def follow_output():
+        # Cada worker imprime "is now active" al terminar la carga y el warmup;
+        # los workers comparten el pipe, así que dos avisos pueden caer en una línea
+        for line in server.stdout:
+            for _ in range(line.count("is now active")):
+                active.release()
+
+    threading.Thread(target=follow_output, daemon=True).start()
+    url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + timeout
+        for _ in range(workers):
+            if not active.acquire(timeout=max(0.0, deadline - time.monotonic())):
+                raise TimeoutError(f"Los {workers} workers no activaron el modelo en {timeout:.0f}s")
+        if requests_per_worker:
+            run_scenario(url, "batch", samples, 2 * workers, 10, requests_per_worker, warmup=0)
+        pids = worker_pids(server.pid)
+        per_worker = measure_workers(pids)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    total_pss = sum(w["pss_mb"] for w in per_worker)
+    return {
+        "workers": workers,
+        "mode": mode,
+        "total_pss_mb": round(total_pss, 1),
+        "pss_per_worker_mb": round(total_pss / len(per_worker), 1) if per_worker else None,
+        "rss_per_worker_mb": round(sum(w["rss_mb"] for w in per_worker) / len(per_worker), 1) if per_worker else None,
+        "per_worker": per_worker,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PSS por worker de serve.py con y sin pesos mapeados")
+    parser.add_argument("--workers", nargs="+", type=int, default=[1, 2, 4, 8])
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+    parser.add_argument("--requests", type=int, default=5, help="Requests de /predict/batch por cliente antes de medir")
+    parser.add_argument("--output", type=str, default=None)
+    args = parser.parse_args()
+
+    if not Path("/proc/self/smaps_rollup").exists():
+        raise SystemExit("Este benchmark necesita /proc/<pid>/smaps_rollup (Linux >= 4.14)")
+    samples = load_samples(find_sample_images())
+    results = []
+    for mode in args.modes:
+        for workers in args.workers:
+            result = run_configuration(workers, mode, samples, args.requests)
+            print(
+                f"{mode:<5} workers={workers} | PSS/worker {result['pss_per_worker_mb']} MB | "
+                f"RSS/worker {result['rss_per_worker_mb']} MB | PSS total {result['total_pss_mb']} MB"
+            )
+            results.append(result)
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "requests_per_client": args.requests,
+        "results": results,
+    }
+    output = Path(args.output) if args.output else DEFAULT_OUTPUT_DIR / f"worker_memory_{report['timestamp'].replace(':', '')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+    print(f"Resultados guardados en {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""
+Scoring masivo offline con OctagonDetector.
+
+Lee imágenes de un directorio local o de un prefijo de S3 (a través de
+S3Client), las decodifica y preprocesa en paralelo en procesos worker de un
+DataLoader, corre lotes grandes de inferencia y va escribiendo los
+resultados de forma incremental en CSV o Parquet. Si el archivo de salida ya
+existe, las imágenes que ya figuran en él con una predicción se saltean,
+así una corrida interrumpida se retoma donde quedó; las que fallaron
+(descarga o decodificación) se vuelven a intentar. La salida sólo se
+agrega: una imagen reintentada queda con su fila de error y la del
+reintento, y vale la última fila de cada imagen.
+
+Uso (desde el directorio api/):
+    python bulk_score.py --source ../data/scraped_data/images --output scores.csv
+    python bulk_score.py --source s3://1000-imagenes-scrapper-obligatorio-ml/data/scraped_data/images/ \
+        --output scores.parquet --format parquet --workers 8 --batch-size 64
+"""
+import argparse
+import csv
+import io
+import os
+import sys
+import time
+from pathlib import Path
+
+import torch
+from PIL import Image
+from torch.utils.data import Dataset, DataLoader
+
+from model.predictor import OctagonDetector
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp"}
+SCRAPER_SRC = Path(__file__).resolve().parent.parent / "scrapper_y_tag" / "src"
+FIELDS = ["image", "has_octagon", "confidence", "error"]
+
+
+def parse_s3_uri(uri):
+    bucket, _, prefix = uri[len("s3://"):].partition("/")
+    return bucket, prefix
+
+
+def _s3_client(bucket, region):
+    if str(SCRAPER_SRC) not in sys.path:
+        sys.path.append(str(SCRAPER_SRC))
+    from connectors.s3_client import S3Client
+
+    return S3Client(bucket_name=bucket, region_name=region)
+
+
+def list_source(source, region):
+    """Keys de las imágenes a procesar (rutas locales o keys de S3)"""
+    if source.startswith("s3://"):
+        bucket, prefix = parse_s3_uri(source)
+        keys = _s3_client(bucket, region).list_files(prefix=prefix)
+    else:
+        keys = [str(p) for p in sorted(Path(source).rglob("*")) if p.is_file()]
+    return [k for k in keys if os.path.splitext(k)[1].lower() in IMAGE_EXTENSIONS]
+
+
+class ImageSourceDataset(Dataset):
+    """
+    Lee y preprocesa una imagen por índice. Cada proceso worker crea su
+    propio cliente de S3 la primera vez que lo necesita.
+    """
+
+    def __init__(self, keys, transform, bucket=None, region="us-east-1"):
+        self.keys = keys
+        self.transform = transform
+        self.bucket = bucket
+        self.region = region
+        self._s3 = None
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _read(self, key):
+        if self.bucket is None:
+            with open(key, "rb") as f:
+                return f.read()
+        if self._s3 is None:
+            self._s3 = _s3_client(self.bucket, self.region)
+        body = self._s3.download_image(key)
+        if body is None:
+            raise IOError(f"Could not download {key}")
+        return body.read()
+
+    def __getitem__(self, idx):
+        key = self.keys[idx]
+        try:
+            with Image.open(io.BytesIO(self._read(key))) as image:
+                tensor = self.transform(image.convert("RGB"))
+            return key, tensor, None
+        except Exception as e:
+            return key, None, str(e)
+
+
+def collate(items):
+    ok = [(key, tensor) for key, tensor, error in items if error is None]
+    failed = [(key, error) for key, _, error in items if error is not None]
+    keys = [key for key, _ in ok]
+    batch = torch.stack([tensor for _, tensor in ok]) if ok else None
+    return keys, batch, failed
+
+
+class CsvResultWriter:
+    def __init__(self, path):
+        self.path = Path(path)
+        exists = self.path.exists() and self.path.stat().st_size > 0
+        self._file = open(self.path, "a", newline="")
+        self._writer = csv.DictWriter(self._file, fieldnames=FIELDS)
+        if not exists:
+            self._writer.writeheader()
+
+    @staticmethod
+    def done_keys(path):
+        path = Path(path)
+        if not path.exists():
+            return set()
+        # Las filas con error no cuentan: esas imágenes se reintentan
+        with open(path, newline="") as f:
+            return {row["image"] for row in csv.DictReader(f) if not row["error"]}
+
+    def write(self, rows):
+        self._writer.writerows(rows)
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetResultWriter:
+    """Escribe un archivo part-NNNNN.parquet por lote dentro del directorio de salida"""
+
+    def __init__(self, path):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._pa, self._pq = pa, pq
+        # Esquema fijo: inferido de cada lote, un lote sin errores tendría
+        # "error" de tipo null y las partes no se podrían leer como un dataset
+        self.schema = pa.schema([
+            ("image", pa.string()),
+            ("has_octagon", pa.bool_()),
+            ("confidence", pa.float64()),
+            ("error", pa.string()),
+        ])
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._next_part = len(list(self.path.glob("part-*.parquet")))
+
+    @staticmethod
+    def done_keys(path):
+        path = Path(path)
+        if not path.exists():
+            return set()
+        import pyarrow.parquet as pq
+
+        keys = set()
+        for part in path.glob("part-*.parquet"):
+            rows = pq.read_table(part, columns=["image", "error"]).to_pylist()
+            keys.update(row["image"] for row in rows if not row["error"])
+        return keys
+
+    def write(self, rows):
+        if not rows:
+            return
+        table = self._pa.Table.from_pylist(rows, schema=self.schema)
+        part = self.path / f"part-{self._next_part:05d}.parquet"
+        tmp = part.with_suffix(".tmp")
+        self._pq.write_table(table, tmp)
+        os.replace(tmp, part)
+        self._next_part += 1
+
+    def close(self):
+        pass
+
+
+def score(detector, loader, writer, total, log_every=10):
+    start = time.perf_counter()
+    processed = 0
+    for i, (keys, batch, failed) in enumerate(loader):
+        rows = [{"image": key, "has_octagon": None, "confidence": None, "error": error} for key, error in failed]
+        if batch is not None:
+            predictions = detector.predict_tensors(batch)
+            rows.extend(
+                {"image": key, "has_octagon": has_octagon, "confidence": round(confidence, 6), "error": None}
+                for key, (has_octagon, confidence) in zip(keys, predictions)
+            )
+        writer.write(rows)
+        processed += len(rows)
+        if (i + 1) % log_every == 0:
+            elapsed = time.perf_counter() - start
+            print(f"{processed}/{total} imágenes | {processed / elapsed:.1f} img/s")
+    elapsed = time.perf_counter() - start
+    return processed, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scoring masivo de imágenes con OctagonDetector")
+    parser.add_argument("--source", type=str, required=True, help="Directorio local o s3://bucket/prefijo")
+    parser.add_argument("--output", type=str, required=True, help="Archivo CSV o directorio Parquet de salida")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("--model", type=str, default="Resnet18_podado.pth")
+    parser.add_argument("--region", type=str, default="us-east-1")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) - 1), help="Procesos de decodificación")
+    args = parser.parse_args()
+
+    writer_cls = ParquetResultWriter if args.format == "parquet" else CsvResultWriter
+    keys = list_source(args.source, args.region)
+    done = writer_cls.done_keys(args.output)
+    pending = [k for k in keys if k not in done]
+    print(f"Imágenes encontradas: {len(keys)} | ya procesadas: {len(keys) - len(pending)} | pendientes: {len(pending)}")
+    if not pending:
+        return
+
+    detector = OctagonDetector(args.model)
+    if not detector.is_loaded():
+        raise SystemExit("No se pudo cargar el modelo")
+    bucket = parse_s3_uri(args.source)[0] if args.source.startswith("s3://") else None
+    dataset = ImageSourceDataset(pending, detector.transform, bucket, args.region)
+    loader = DataLoader(
+        dataset, batch_size=args.batch_size, num_workers=args.workers, collate_fn=collate,
+        prefetch_factor=2 if args.workers else None, persistent_workers=False,
+    )
+
+    writer = writer_cls(args.output)
+    try:
+        processed, elapsed = score(detector, loader, writer, len(pending))
+    finally:
+        writer.close()
+    print(f"✅ {processed} imágenes en {elapsed:.1f}s ({processed / elapsed:.1f} img/s). Resultados en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,39 +1,35 @@
 import gradio as gr
 import requests
-import json
-from PIL import Image
-import io
-import base64
 import os
+from api_client import OctagonAPIClient
 
 # Configuración de la API
 API_BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8000")
 
-def call_single_prediction_api(image):
-    """Llama al endpoint de predicción individual"""
+# Cliente con pool de conexiones keep-alive compartido por toda la app
+client = OctagonAPIClient(API_BASE_URL)
+
+def call_single_prediction_api(image_file):
+    """Llama al endpoint de predicción individual con los bytes originales del archivo"""
     try:
-        img_byte_arr = io.BytesIO()
-        image.save(img_byte_arr, format='JPEG')
-        img_byte_arr = img_byte_arr.getvalue()
-        files = {'file': ('imagen.jpg', img_byte_arr, 'image/jpeg')}
-        response = requests.post(f"{API_BASE_URL}/predict/single", files=files)
-        if response.status_code == 200:
-            result = response.json()
-            return {
-                "Estado": "✅ Éxito",
-                "¿Tiene octógono?": "⚠️ Sí" if result['has_octagon'] else "✅ No",
-                "Confianza": f"{result['confidence']:.2%}",
-                "Estado de salud": "🚨 No saludable" if result['has_octagon'] else "✅ Saludable",
-                "Mensaje": result['message'].replace('Warning octagon detected', '⚠️ Octógono de advertencia detectado').replace('No warning octagon found', '✅ Sin octógono de advertencia')
-            }
-        else:
-            return {
-                "Estado": "❌ Error",
-                "¿Tiene octógono?": "N/A",
-                "Confianza": "N/A",
-                "Estado de salud": "N/A",
-                "Mensaje": f"Error de la API: {response.status_code}"
-            }
+        if image_file is None:
+            raise ValueError("No se proporcionó ninguna imagen")
+        result = client.predict_single(image_file)
+        return {
+            "Estado": "✅ Éxito",
+            "¿Tiene octógono?": "⚠️ Sí" if result['has_octagon'] else "✅ No",
+            "Confianza": f"{result['confidence']:.2%}",
+            "Estado de salud": "🚨 No saludable" if result['has_octagon'] else "✅ Saludable",
+            "Mensaje": result['message'].replace('Warning octagon detected', '⚠️ Octógono de advertencia detectado').replace('No warning octagon found', '✅ Sin octógono de advertencia')
+        }
+    except requests.HTTPError as e:
+        return {
+            "Estado": "❌ Error",
+            "¿Tiene octógono?": "N/A",
+            "Confianza": "N/A",
+            "Estado de salud": "N/A",
+            "Mensaje": f"Error de la API: {e.response.status_code}"
+        }
     except Exception as e:
         return {
             "Estado": "❌ Error",
@@ -43,53 +39,42 @@ def call_single_prediction_api(image):
             "Mensaje": f"Error: {str(e)}"
         }
 
-def call_batch_prediction_api(images):
-    """Llama al endpoint de predicción por lote"""
+def call_batch_prediction_api(image_files):
+    """Llama al endpoint de predicción por lote, partiendo la selección en lotes concurrentes"""
     try:
-        if not images:
+        image_files = [f for f in (image_files or []) if f is not None]
+        if not image_files:
             return "❌ No se proporcionaron imágenes", []
-        files = []
-        for i, image in enumerate(images):
-            if image is not None:
-                img_byte_arr = io.BytesIO()
-                image.save(img_byte_arr, format='JPEG')
-                img_byte_arr = img_byte_arr.getvalue()
-                files.append(('files', (f'imagen_{i}.jpg', img_byte_arr, 'image/jpeg')))
-        if not files:
-            return "❌ No se proporcionaron imágenes válidas", []
-        response = requests.post(f"{API_BASE_URL}/predict/batch", files=files)
-        if response.status_code == 200:
-            result = response.json()
-            tabla = []
-            for item in result['results']:
-                tabla.append([
-                    item['filename'],
-                    "⚠️ Sí" if item['has_octagon'] else "✅ No",
-                    f"{item['confidence']:.2%}",
-                    "🚨 No saludable" if item['has_octagon'] else "✅ Saludable"
-                ])
-            resumen = f"""
+        result = client.predict_batch(image_files)
+        tabla = []
+        for item in result['results']:
+            if 'error' in item:
+                tabla.append([item['filename'], "❌ Error", "N/A", item['error']])
+                continue
+            tabla.append([
+                item['filename'],
+                "⚠️ Sí" if item['has_octagon'] else "✅ No",
+                f"{item['confidence']:.2%}",
+                "🚨 No saludable" if item['has_octagon'] else "✅ Saludable"
+            ])
+        resumen = f"""
             📊 **Resultados de la predicción por lote**
             
             **Total procesadas**: {result['total_processed']} imágenes
             **Saludables**: {result['no_octagon_count']} ✅
             **No saludables**: {result['octagon_count']} 🚨
             """
-            return resumen, tabla
-        else:
-            return f"❌ Error de la API: {response.status_code}", []
+        return resumen, tabla
     except Exception as e:
         return f"❌ Error: {str(e)}", []
 
 def check_api_health():
     """Verifica si la API está corriendo"""
     try:
-        response = requests.get(f"{API_BASE_URL}/health", timeout=5)
-        if response.status_code == 200:
-            health_data = response.json()
-            return f"✅ Estado de la API: {health_data['status']}\n📝 {health_data['message']}"
-        else:
-            return f"❌ Error de la API: {response.status_code}"
+        health_data = client.health()
+        return f"✅ Estado de la API: {health_data['status']}\n📝 {health_data['message']}"
+    except requests.HTTPError as e:
+        return f"❌ Error de la API: {e.response.status_code}"
     except Exception as e:
         return f"❌ No se puede conectar a la API: {str(e)}"
 
@@ -105,10 +90,17 @@ with gr.Blocks(title="Sistema de Detección de Octógonos en Alimentos", theme=g
     with gr.Tab("📸 Predicción individual"):
         with gr.Row():
             with gr.Column():
-                single_image_input = gr.Image(label="Subir imagen de alimento", type="pil")
+                # gr.File entrega el archivo original; gr.Image lo re-codificaría
+                single_image_input = gr.File(label="Subir imagen de alimento", file_types=["image"])
+                single_image_preview = gr.Image(label="Vista previa", type="filepath", interactive=False)
                 single_predict_btn = gr.Button("🔍 Analizar imagen", variant="primary")
             with gr.Column():
                 single_results = gr.JSON(label="Resultados de la predicción")
+        single_image_input.change(
+            lambda f: getattr(f, "name", f),
+            inputs=single_image_input,
+            outputs=single_image_preview
+        )
         single_predict_btn.click(
             call_single_prediction_api,
             inputs=single_image_input,
@@ -131,16 +123,8 @@ with gr.Blocks(title="Sistema de Detección de Octógonos en Alimentos", theme=g
                     label="Tabla de resultados"
                 )
         def process_batch_files(files):
-            images = []
-            for file in files:
-                try:
-                    with open(file.name, 'rb') as f:
-                        img_data = f.read()
-                    image = Image.open(io.BytesIO(img_data))
-                    images.append(image)
-                except Exception as e:
-                    print(f"Error cargando la imagen {file.name}: {e}")
-            return call_batch_prediction_api(images)
+            # Se mandan los archivos tal cual, sin decodificarlos en el frontend
+            return call_batch_prediction_api(files)
         batch_predict_btn.click(
             process_batch_files,
             inputs=batch_images_input,
@@ -0,0 +1,184 @@
+"""
+Ingesta de imágenes subidas con memoria acotada.
+
+- Starlette ya vuelca cada archivo del multipart a un SpooledTemporaryFile
+  (en memoria hasta 1MB, después a disco); acá se mide su tamaño sin leerlo
+  a memoria y se rechaza con 413 si supera UPLOAD_MAX_BYTES.
+- Antes de decodificar se leen sólo los headers de la imagen para validar
+  las dimensiones contra UPLOAD_MAX_PIXELS / UPLOAD_MAX_SIDE (413), de modo
+  que una decompression bomb nunca llega a expandirse en memoria.
+- Con UPLOAD_DRAFT_DECODE=1 los JPEG se decodifican en modo draft a la
+  resolución más chica que sigue cubriendo 500x500 (apagado por defecto: el
+  escalado DCT no es idéntico al Resize del entrenamiento). Cada imagen se
+  cierra apenas se arma su tensor.
+- BodySizeLimit corta los POST a /predict que superan el máximo de un lote
+  mientras llegan, declaren o no Content-Length (uploads chunked).
+"""
+import io
+import os
+
+from fastapi import UploadFile
+from fastapi.responses import JSONResponse
+from PIL import Image
+
+from metrics import observe_stage
+
+MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(10 * 1024 * 1024)))
+MAX_PIXELS = int(os.getenv("UPLOAD_MAX_PIXELS", str(40_000_000)))
+MAX_SIDE = int(os.getenv("UPLOAD_MAX_SIDE", "12000"))
+# Archivos por request en /predict/batch, para el límite del cuerpo completo
+MAX_FILES = 10
+MODEL_INPUT = (500, 500)
+DRAFT_DECODE = os.getenv("UPLOAD_DRAFT_DECODE", "0") == "1"
+
+# PIL avisa a partir de MAX_IMAGE_PIXELS y falla al doble; con el límite
+# propio validado antes, se deja como red de seguridad
+Image.MAX_IMAGE_PIXELS = MAX_PIXELS
+
+
+class UploadError(Exception):
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def upload_size(fileobj) -> int:
+    position = fileobj.tell()
+    fileobj.seek(0, os.SEEK_END)
+    size = fileobj.tell()
+    fileobj.seek(position)
+    return size
+
+
+def spooled_upload(file: UploadFile, max_bytes: int = MAX_BYTES):
+    """Archivo subido, ya volcado por Starlette, validado por tamaño y rebobinado"""
+    if not file.content_type or not file.content_type.startswith("image/"):
+        raise UploadError(400, "File must be an image")
+    size = upload_size(file.file)
+    if size == 0:
+        raise UploadError(400, "Empty file")
+    if size > max_bytes:
+        raise UploadError(413, f"File exceeds {max_bytes} bytes")
+    file.file.seek(0)
+    return file.file
+
+
+def open_image(fileobj, max_pixels: int = MAX_PIXELS, max_side: int = MAX_SIDE) -> Image.Image:
+    """
+    Abre la imagen leyendo sólo el header y valida sus dimensiones; los
+    píxeles se decodifican recién en load()/convert().
+    """
+    try:
+        image = Image.open(fileobj)
+    except Image.DecompressionBombError as e:
+        raise UploadError(413, str(e))
+    except Exception:
+        raise UploadError(400, "Could not read image")
+    width, height = image.size
+    if width > max_side or height > max_side or width * height > max_pixels:
+        image.close()
+        raise UploadError(413, f"Image dimensions {width}x{height} exceed the limit ({max_pixels} pixels, {max_side} per side)")
+    return image
+
+
+def decode(fileobj, draft: bool = None) -> Image.Image:
+    """
+    Decodifica una imagen validada. Con draft=True los JPEG se decodifican
+    directamente a una escala reducida (1/2, 1/4, 1/8) que sigue siendo
+    mayor o igual a la entrada del modelo. Por defecto, según
+    UPLOAD_DRAFT_DECODE.
+    """
+    if draft is None:
+        draft = DRAFT_DECODE
+    image = open_image(fileobj)
+    try:
+        if draft:
+            image.draft("RGB", MODEL_INPUT)
+        image.load()
+    except Exception:
+        image.close()
+        raise UploadError(400, "Could not decode image")
+    return image
+
+
+def to_tensor(detector, fileobj):
+    """Decodifica, preprocesa y libera la imagen; devuelve sólo el tensor 3x500x500"""
+    try:
+        with observe_stage("decode"):
+            image = decode(fileobj)
+    finally:
+        fileobj.close()
+    try:
+        with observe_stage("preprocess"):
+            return detector.preprocess(image)
+    finally:
+        image.close()
+
+
+def bytes_to_tensor(detector, data: bytes):
+    if len(data) > MAX_BYTES:
+        raise UploadError(413, f"File exceeds {MAX_BYTES} bytes")
+    return to_tensor(detector, io.BytesIO(data))
+
+
+class BodyTooLarge(Exception):
+    pass
+
+
+class BodySizeLimit:
+    """
+    Middleware ASGI que limita el cuerpo de los POST a /predict.
+
+    Si Content-Length ya excede el límite se responde 413 sin leer nada. Si
+    no lo declara (transfer-encoding chunked) o miente, los bytes se cuentan
+    a medida que llegan y al pasar el límite se deja de leer y se responde
+    413, descartando lo que la app haya empezado a responder.
+    """
+
+    def __init__(self, app, limit: int = None):
+        self.app = app
+        self.limit = limit if limit is not None else MAX_BYTES * MAX_FILES + 64 * 1024
+
+    def _too_large(self):
+        return JSONResponse(status_code=413, content={"detail": f"Request body exceeds {self.limit} bytes"})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or not scope["path"].startswith("/predict"):
+            return await self.app(scope, receive, send)
+        # Rechazo temprano, antes de que Starlette parsee y vuelque el multipart
+        declared = dict(scope["headers"]).get(b"content-length")
+        if declared is not None and declared.isdigit() and int(declared) > self.limit:
+            return await self._too_large()(scope, receive, send)
+
+        received = 0
+        exceeded = False
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.limit:
+                    exceeded = True
+                    raise BodyTooLarge()
+            return message
+
+        async def guarded_send(message):
+            nonlocal response_started
+            # La respuesta que arme la app después de cortar el cuerpo (p. ej.
+            # un 400 por el multipart incompleto) se reemplaza por el 413
+            if exceeded and not response_started:
+                return
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except BodyTooLarge:
+            if response_started:
+                raise
+        if exceeded and not response_started:
+            await self._too_large()(scope, receive, send)
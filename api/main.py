@@ -1,8 +1,15 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from routes import prediction
-from model.predictor import OctagonDetector
+from routes import prediction, admin
+from model.registry import registry
 from schemas import HealthCheckResponse
+from metrics import render_metrics
+from profiling import profiler
+from url_fetcher import fetcher
+from admission import admission
+from ingest import BodySizeLimit
+import os
 import torch
 import torch.nn as nn
 
@@ -128,47 +135,101 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Captura de perfiles bajo demanda (ver /admin/profile)
+app.middleware("http")(profiler.middleware)
+
+# Control de admisión: acota los requests de predicción en curso y rechaza
+# con 503 + Retry-After cuando la cola está llena. Se registra después que el
+# profiler para quedar por fuera de él (los rechazados no se perfilan)
+app.middleware("http")(admission.middleware)
+
+# Rechazo (413) de cuerpos que superan el máximo permitido, antes de ocupar
+# un lugar en la admisión; se aplica también a uploads sin Content-Length
+app.add_middleware(BodySizeLimit)
+
 # Incluir routers
 app.include_router(prediction.router)
+app.include_router(admin.router)
 
-# Inicializar detector con ResNet18_4
-# (el modelo siempre es ResNet18_4 ahora)
-detector = OctagonDetector("Resnet18_podado.pth")
+# El registro de modelos carga la versión por defecto (ResNet18_4 podado)
+# al arrancar; main y las rutas comparten la misma instancia. Por defecto la
+# carga y el warmup corren en segundo plano: el proceso ya atiende /health y
+# /health/ready, que informan "no listo" hasta que el warmup termina
+@app.on_event("startup")
+def load_model():
+    registry.load_default(background=os.getenv("MODEL_LOAD_BACKGROUND", "1") == "1")
+
+@app.on_event("shutdown")
+async def close_url_fetcher():
+    await fetcher.close()
 
 @app.get("/", summary="Root endpoint")
 async def root():
     """Mensaje de bienvenida para la API"""
     return {
         "message": "Food Octagon Detection API is running!",
-        "model_info": detector.get_model_info(),
+        "model_info": registry.info(),
         "docs": "/docs",
         "endpoints": {
             "single_prediction": "/predict/single",
             "batch_prediction": "/predict/batch",
+            "url_prediction": "/predict/urls",
+            "tiled_prediction": "/predict/tiled",
             "health_check": "/health",
-            "model_info": "/model/info"
+            "model_info": "/model/info",
+            "metrics": "/metrics"
         }
     }
 
 @app.get("/health", response_model=HealthCheckResponse, summary="Health check")
 async def health_check():
-    """Verificar si la API y el modelo están funcionando correctamente"""
-    model_loaded = detector.is_loaded()
-    status = "healthy" if model_loaded else "unhealthy"
-    
-    if model_loaded:
-        model_info = detector.get_model_info()
-        message = f"{model_info['model_type']} model loaded successfully on {model_info['device']}"
+    """Verificar si la API y el modelo están funcionando y si ya terminó el warmup"""
+    active = registry.active()
+    ready = registry.is_ready()
+    reload_status = registry.reload_status()
+
+    if ready:
+        status = "healthy"
+        model_info = active.detector.get_model_info()
+        message = f"{model_info['model_type']} model {active.name}:{active.version} loaded successfully on {model_info['device']}"
+    elif reload_status["state"] == "loading":
+        status = "warming_up"
+        message = f"Loading and warming up model {reload_status['target']}"
     else:
-        message = "Model failed to load"
-    
+        status = "unhealthy"
+        message = reload_status.get("error", "Model failed to load")
+
     return HealthCheckResponse(
         status=status,
-        model_loaded=model_loaded,
-        message=message
+        model_loaded=active is not None,
+        ready=ready,
+        message=message,
+        warmup=active.warmup if active else None
     )
 
+@app.get("/health/live", summary="Liveness probe")
+async def liveness():
+    """El proceso responde; no depende del modelo ni de la carga"""
+    return {"status": "alive"}
+
+@app.get("/health/ready", summary="Readiness probe")
+async def readiness():
+    """Listo para recibir tráfico: modelo cargado y precalentado, y cola de admisión no saturada"""
+    model_ready = registry.is_ready()
+    saturated = admission.saturated()
+    ready = model_ready and not saturated
+    content = {"ready": ready, "model_loaded": model_ready, "reload": registry.reload_status(), "admission": admission.info()}
+    if not ready:
+        return JSONResponse(status_code=503, content=content, headers={"Retry-After": str(admission.retry_after())})
+    return content
+
 @app.get("/model/info", summary="Get model information")
 async def get_model_info():
-    """Obtener información detallada sobre el modelo cargado"""
-    return detector.get_model_info()
\ No newline at end of file
+    """Obtener información detallada sobre el modelo cargado y su versión activa"""
+    return registry.info()
+
+@app.get("/metrics", summary="Prometheus metrics", include_in_schema=False)
+async def metrics():
+    """Métricas de latencia por etapa, requests y carga del modelo en formato Prometheus"""
+    content, content_type = render_metrics()
+    return Response(content=content, media_type=content_type)
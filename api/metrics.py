@@ -0,0 +1,87 @@
+import os
+import time
+from contextlib import contextmanager
+from prometheus_client import Counter, Gauge, Histogram, CollectorRegistry, CONTENT_TYPE_LATEST, generate_latest, multiprocess
+
+# Etapas del camino de inferencia que se miden por separado
+STAGES = ("upload_read", "decode", "preprocess", "screening", "inference", "postprocess", "response")
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BATCH_BUCKETS = (1, 2, 4, 8, 10, 16, 32, 64)
+
+STAGE_LATENCY = Histogram(
+    "octagon_stage_latency_seconds",
+    "Latencia de cada etapa del camino de inferencia",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUEST_LATENCY = Histogram(
+    "octagon_request_latency_seconds",
+    "Latencia total de los endpoints de predicción",
+    ["endpoint"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUESTS = Counter(
+    "octagon_requests_total",
+    "Requests a los endpoints de predicción por resultado",
+    ["endpoint", "outcome"],
+)
+BATCH_SIZE = Histogram(
+    "octagon_batch_size",
+    "Cantidad de imágenes por forward pass del modelo",
+    buckets=BATCH_BUCKETS,
+)
+CASCADE_IMAGES = Counter(
+    "octagon_cascade_images_total",
+    "Imágenes decididas por el pase de baja resolución o escaladas al modelo completo",
+    ["decision"],
+)
+MODEL_LOAD_SECONDS = Gauge(
+    "octagon_model_load_seconds",
+    "Tiempo que llevó la última carga del modelo",
+    multiprocess_mode="liveall",
+)
+MODEL_WARMUP_SECONDS = Gauge(
+    "octagon_model_warmup_seconds",
+    "Tiempo que llevó el warmup de la última carga del modelo",
+    multiprocess_mode="liveall",
+)
+ADMISSION_DECISIONS = Counter(
+    "octagon_admission_decisions_total",
+    "Decisiones del control de admisión (admitido, encolado o rechazado y por qué)",
+    ["decision"],
+)
+IN_FLIGHT = Gauge(
+    "octagon_requests_in_flight",
+    "Requests de predicción en curso",
+    multiprocess_mode="livesum",
+)
+
+# Hijos pre-resueltos para no pagar el lookup de labels en cada observación
+_STAGE_CHILDREN = {stage: STAGE_LATENCY.labels(stage=stage) for stage in STAGES}
+
+
+@contextmanager
+def observe_stage(stage: str):
+    """Mide la duración del bloque y la registra en el histograma de la etapa"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _STAGE_CHILDREN[stage].observe(time.perf_counter() - start)
+
+
+def record_request(endpoint: str, outcome: str, seconds: float):
+    """Registra el resultado y la latencia total de un request"""
+    REQUESTS.labels(endpoint=endpoint, outcome=outcome).inc()
+    REQUEST_LATENCY.labels(endpoint=endpoint).observe(seconds)
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """Devuelve las métricas en formato de texto de Prometheus"""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        # Varios workers (serve.py): se agregan los archivos de todos los procesos
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
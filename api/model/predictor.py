@@ -4,64 +4,87 @@ import torch.nn.functional as F
 import torchvision.transforms as transforms
 from PIL import Image
 from pathlib import Path
+import os
+import threading
+import time
+import zipfile
+from contextlib import nullcontext
+from metrics import observe_stage, BATCH_SIZE, MODEL_LOAD_SECONDS, MODEL_WARMUP_SECONDS, CASCADE_IMAGES
+
+# Cantidad de canales de cada grupo de ResNet18_4. Los "stage" son los
+# canales del camino residual de cada etapa (compartidos por las convs cuya
+# salida se suma al atajo y por concat_adjust_*); los "block" son los
+# canales internos de cada bloque residual. Un modelo podado guarda sus
+# anchos en el checkpoint junto con los pesos.
+DEFAULT_WIDTHS = {
+    "stage2": 64, "block2_1": 64, "block2_2": 64,
+    "stage3": 128, "block3_1": 128, "block3_2": 128,
+    "stage4": 256, "block4_1": 256, "block4_2": 256,
+    "stage5": 512, "block5_1": 512, "block5_2": 512,
+    "fc": 1000,
+}
 
 class ResNet18_4(nn.Module):
-    def __init__(self, in_channels, n_classes):
+    def __init__(self, in_channels, n_classes, widths=None):
         super(ResNet18_4, self).__init__()
+        w = {**DEFAULT_WIDTHS, **(widths or {})}
+        self.in_channels = in_channels
+        self.n_classes = n_classes
+        self.widths = w
         self.dropout_percentage_1_2 = 0.1
         self.dropout_percentage_3_4 = 0.2
         self.dropout_percentage_5 = 0.3
         self.relu = nn.ReLU()
-        self.conv1 = nn.Conv2d(in_channels, out_channels=64, kernel_size=(7,7), stride=(2,2), padding=(3,3))
-        self.batchnorm1 = nn.BatchNorm2d(64)
+        self.conv1 = nn.Conv2d(in_channels, out_channels=w['stage2'], kernel_size=(7,7), stride=(2,2), padding=(3,3))
+        self.batchnorm1 = nn.BatchNorm2d(w['stage2'])
         self.maxpool1 = nn.MaxPool2d(kernel_size=(3,3), stride=(2,2), padding=(1,1))
-        self.conv2_1_1 = nn.Conv2d(in_channels=64, out_channels=64, kernel_size=(3,3), stride=(1,1), padding=(1,1))
-        self.batchnorm2_1_1 = nn.BatchNorm2d(64)
-        self.conv2_1_2 = nn.Conv2d(in_channels=64, out_channels=64, kernel_size=(3,3), stride=(1,1), padding=(1,1))
-        self.batchnorm2_1_2 = nn.BatchNorm2d(64)
+        self.conv2_1_1 = nn.Conv2d(in_channels=w['stage2'], out_channels=w['block2_1'], kernel_size=(3,3), stride=(1,1), padding=(1,1))
+        self.batchnorm2_1_1 = nn.BatchNorm2d(w['block2_1'])
+        self.conv2_1_2 = nn.Conv2d(in_channels=w['block2_1'], out_channels=w['stage2'], kernel_size=(3,3), stride=(1,1), padding=(1,1))
+        self.batchnorm2_1_2 = nn.BatchNorm2d(w['stage2'])
         self.dropout2_1 = nn.Dropout(p=self.dropout_percentage_1_2)
-        self.conv2_2_1 = nn.Conv2d(in_channels=64, out_channels=64, kernel_size=(3,3), stride=(1,1), padding=(1,1))
-        self.batchnorm2_2_1 = nn.BatchNorm2d(64)
-        self.conv2_2_2 = nn.Conv2d(in_channels=64, out_channels=64, kernel_size=(3,3), stride=(1,1), padding=(1,1))
-        self.batchnorm2_2_2 = nn.BatchNorm2d(64)
+        self.conv2_2_1 = nn.Conv2d(in_channels=w['stage2'], out_channels=w['block2_2'], kernel_size=(3,3), stride=(1,1), padding=(1,1))
+        self.batchnorm2_2_1 = nn.BatchNorm2d(w['block2_2'])
+        self.conv2_2_2 = nn.Conv2d(in_channels=w['block2_2'], out_channels=w['stage2'], kernel_size=(3,3), stride=(1,1), padding=(1,1))
+        self.batchnorm2_2_2 = nn.BatchNorm2d(w['stage2'])
         self.dropout2_2 = nn.Dropout(p=self.dropout_percentage_1_2)
-        self.conv3_1_1 = nn.Conv2d(in_channels=64, out_channels=128, kernel_size=(3,3), stride=(2,2), padding=(1,1))
-        self.batchnorm3_1_1 = nn.BatchNorm2d(128)
-        self.conv3_1_2 = nn.Conv2d(in_channels=128, out_channels=128, kernel_size=(3,3), stride=(1,1), padding=(1,1))
-        self.batchnorm3_1_2 = nn.BatchNorm2d(128)
-        self.concat_adjust_3 = nn.Conv2d(in_channels=64, out_channels=128, kernel_size=(1,1), stride=(2,2), padding=(0,0))
+        self.conv3_1_1 = nn.Conv2d(in_channels=w['stage2'], out_channels=w['block3_1'], kernel_size=(3,3), stride=(2,2), padding=(1,1))
+        self.batchnorm3_1_1 = nn.BatchNorm2d(w['block3_1'])
+        self.conv3_1_2 = nn.Conv2d(in_channels=w['block3_1'], out_channels=w['stage3'], kernel_size=(3,3), stride=(1,1), padding=(1,1))
+        self.batchnorm3_1_2 = nn.BatchNorm2d(w['stage3'])
+        self.concat_adjust_3 = nn.Conv2d(in_channels=w['stage2'], out_channels=w['stage3'], kernel_size=(1,1), stride=(2,2), padding=(0,0))
         self.dropout3_1 = nn.Dropout(p=self.dropout_percentage_3_4)
-        self.conv3_2_1 = nn.Conv2d(in_channels=128, out_channels=128, kernel_size=(3,3), stride=(1,1), padding=(1,1))
-        self.batchnorm3_2_1 = nn.BatchNorm2d(128)
-        self.conv3_2_2 = nn.Conv2d(in_channels=128, out_channels=128, kernel_size=(3,3), stride=(1,1), padding=(1,1))
-        self.batchnorm3_2_2 = nn.BatchNorm2d(128)
+        self.conv3_2_1 = nn.Conv2d(in_channels=w['stage3'], out_channels=w['block3_2'], kernel_size=(3,3), stride=(1,1), padding=(1,1))
+        self.batchnorm3_2_1 = nn.BatchNorm2d(w['block3_2'])
+        self.conv3_2_2 = nn.Conv2d(in_channels=w['block3_2'], out_channels=w['stage3'], kernel_size=(3,3), stride=(1,1), padding=(1,1))
+        self.batchnorm3_2_2 = nn.BatchNorm2d(w['stage3'])
         self.dropout3_2 = nn.Dropout(p=self.dropout_percentage_3_4)
-        self.conv4_1_1 = nn.Conv2d(in_channels=128, out_channels=256, kernel_size=(3,3), stride=(2,2), padding=(1,1))
-        self.batchnorm4_1_1 = nn.BatchNorm2d(256)
-        self.conv4_1_2 = nn.Conv2d(in_channels=256, out_channels=256, kernel_size=(3,3), stride=(1,1), padding=(1,1))
-        self.batchnorm4_1_2 = nn.BatchNorm2d(256)
-        self.concat_adjust_4 = nn.Conv2d(in_channels=128, out_channels=256, kernel_size=(1,1), stride=(2,2), padding=(0,0))
+        self.conv4_1_1 = nn.Conv2d(in_channels=w['stage3'], out_channels=w['block4_1'], kernel_size=(3,3), stride=(2,2), padding=(1,1))
+        self.batchnorm4_1_1 = nn.BatchNorm2d(w['block4_1'])
+        self.conv4_1_2 = nn.Conv2d(in_channels=w['block4_1'], out_channels=w['stage4'], kernel_size=(3,3), stride=(1,1), padding=(1,1))
+        self.batchnorm4_1_2 = nn.BatchNorm2d(w['stage4'])
+        self.concat_adjust_4 = nn.Conv2d(in_channels=w['stage3'], out_channels=w['stage4'], kernel_size=(1,1), stride=(2,2), padding=(0,0))
         self.dropout4_1 = nn.Dropout(p=self.dropout_percentage_3_4)
-        self.conv4_2_1 = nn.Conv2d(in_channels=256, out_channels=256, kernel_size=(3,3), stride=(1,1), padding=(1,1))
-        self.batchnorm4_2_1 = nn.BatchNorm2d(256)
-        self.conv4_2_2 = nn.Conv2d(in_channels=256, out_channels=256, kernel_size=(3,3), stride=(1,1), padding=(1,1))
-        self.batchnorm4_2_2 = nn.BatchNorm2d(256)
+        self.conv4_2_1 = nn.Conv2d(in_channels=w['stage4'], out_channels=w['block4_2'], kernel_size=(3,3), stride=(1,1), padding=(1,1))
+        self.batchnorm4_2_1 = nn.BatchNorm2d(w['block4_2'])
+        self.conv4_2_2 = nn.Conv2d(in_channels=w['block4_2'], out_channels=w['stage4'], kernel_size=(3,3), stride=(1,1), padding=(1,1))
+        self.batchnorm4_2_2 = nn.BatchNorm2d(w['stage4'])
         self.dropout4_2 = nn.Dropout(p=self.dropout_percentage_3_4)
-        self.conv5_1_1 = nn.Conv2d(in_channels=256, out_channels=512, kernel_size=(3,3), stride=(2,2), padding=(1,1))
-        self.batchnorm5_1_1 = nn.BatchNorm2d(512)
-        self.conv5_1_2 = nn.Conv2d(in_channels=512, out_channels=512, kernel_size=(3,3), stride=(1,1), padding=(1,1))
-        self.batchnorm5_1_2 = nn.BatchNorm2d(512)
-        self.concat_adjust_5 = nn.Conv2d(in_channels=256, out_channels=512, kernel_size=(1,1), stride=(2,2), padding=(0,0))
+        self.conv5_1_1 = nn.Conv2d(in_channels=w['stage4'], out_channels=w['block5_1'], kernel_size=(3,3), stride=(2,2), padding=(1,1))
+        self.batchnorm5_1_1 = nn.BatchNorm2d(w['block5_1'])
+        self.conv5_1_2 = nn.Conv2d(in_channels=w['block5_1'], out_channels=w['stage5'], kernel_size=(3,3), stride=(1,1), padding=(1,1))
+        self.batchnorm5_1_2 = nn.BatchNorm2d(w['stage5'])
+        self.concat_adjust_5 = nn.Conv2d(in_channels=w['stage4'], out_channels=w['stage5'], kernel_size=(1,1), stride=(2,2), padding=(0,0))
         self.dropout5_1 = nn.Dropout(p=self.dropout_percentage_5)
-        self.conv5_2_1 = nn.Conv2d(in_channels=512, out_channels=512, kernel_size=(3,3), stride=(1,1), padding=(1,1))
-        self.batchnorm5_2_1 = nn.BatchNorm2d(512)
-        self.conv5_2_2 = nn.Conv2d(in_channels=512, out_channels=512, kernel_size=(3,3), stride=(1,1), padding=(1,1))
-        self.batchnorm5_2_2 = nn.BatchNorm2d(512)
+        self.conv5_2_1 = nn.Conv2d(in_channels=w['stage5'], out_channels=w['block5_2'], kernel_size=(3,3), stride=(1,1), padding=(1,1))
+        self.batchnorm5_2_1 = nn.BatchNorm2d(w['block5_2'])
+        self.conv5_2_2 = nn.Conv2d(in_channels=w['block5_2'], out_channels=w['stage5'], kernel_size=(3,3), stride=(1,1), padding=(1,1))
+        self.batchnorm5_2_2 = nn.BatchNorm2d(w['stage5'])
         self.dropout5_2 = nn.Dropout(p=self.dropout_percentage_5)
         self.avgpool = nn.AdaptiveAvgPool2d((1,1))
-        self.fc = nn.Linear(in_features=1*1*512, out_features=1000)
+        self.fc = nn.Linear(in_features=1*1*w['stage5'], out_features=w['fc'])
         self.dropout_fc = nn.Dropout(p=0.5)
-        self.out = nn.Linear(in_features=1000, out_features=n_classes)
+        self.out = nn.Linear(in_features=w['fc'], out_features=n_classes)
     def forward(self, x):
         x = self.relu(self.batchnorm1(self.conv1(x)))
         op1 = self.maxpool1(x)
@@ -107,39 +130,112 @@ class ResNet18_4(nn.Module):
         x = self.out(x)
         return x
 
+def model_architecture(model: ResNet18_4) -> dict:
+    return {
+        "name": "ResNet18_4",
+        "in_channels": model.in_channels,
+        "n_classes": model.n_classes,
+        "widths": dict(model.widths),
+    }
+
+def build_model(arch: dict) -> ResNet18_4:
+    if arch.get("name", "ResNet18_4") != "ResNet18_4":
+        raise ValueError(f"Unknown architecture: {arch['name']}")
+    return ResNet18_4(in_channels=arch.get("in_channels", 3), n_classes=arch.get("n_classes", 2), widths=arch.get("widths"))
+
+def tile_positions(length: int, tile: int, overlap: float) -> list[int]:
+    # Inicios de las ventanas sobre un eje: paso tile*(1-overlap) y la
+    # última ventana pegada al borde para cubrir la imagen completa
+    if length <= tile:
+        return [0]
+    stride = max(1, int(tile * (1 - overlap)))
+    n = -(-(length - tile) // stride) + 1
+    return [round(i * (length - tile) / (n - 1)) for i in range(n)]
+
 class OctagonDetector:
-    def __init__(self, model_path="Resnet18_podado.pth"):
+    def __init__(self, model_path="Resnet18_podado.pth", cascade=None, cascade_size=None,
+                 cascade_threshold=None, cascade_octagon_threshold=None, mmap_weights=None):
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
         self.model = None
+        # Modo cascada: un primer pase a baja resolución decide las imágenes
+        # obvias y sólo las dudosas se escalan al modelo a 500x500. Cada clase
+        # tiene su umbral de confianza mínima para aceptar la decisión barata.
+        self.cascade = cascade if cascade is not None else os.getenv("CASCADE_ENABLED", "0") == "1"
+        self.cascade_size = cascade_size if cascade_size is not None else int(os.getenv("CASCADE_SIZE", "224"))
+        self.cascade_threshold = (
+            cascade_threshold if cascade_threshold is not None else float(os.getenv("CASCADE_THRESHOLD", "0.95"))
+        )
+        self.cascade_octagon_threshold = (
+            cascade_octagon_threshold if cascade_octagon_threshold is not None
+            else float(os.getenv("CASCADE_OCTAGON_THRESHOLD", str(self.cascade_threshold)))
+        )
+        self.cascade_stats = {"screened": 0, "escalated": 0}
+        self._stats_lock = threading.Lock()
+        # Modo por tiles para fotos de góndola: la imagen se recorre con
+        # ventanas de 500x500 solapadas en lugar de reducirla entera
+        self.tile_size = 500
+        self.tile_overlap = float(os.getenv("TILED_OVERLAP", "0.25"))
+        self.tile_max = int(os.getenv("TILED_MAX_TILES", "48"))
+        self.tile_batch = int(os.getenv("TILED_BATCH", "16"))
+        if self.tile_max < 1 or self.tile_batch < 1:
+            raise ValueError(f"TILED_MAX_TILES and TILED_BATCH must be >= 1, got {self.tile_max} and {self.tile_batch}")
+        # Warmup: lotes sintéticos de cada tamaño configurado antes de servir,
+        # para que la selección de kernels de oneDNN y el crecimiento del
+        # allocator no caigan sobre el tráfico real
+        self.warmup_batch_sizes = [int(n) for n in os.getenv("WARMUP_BATCH_SIZES", "1,10,16").split(",") if n.strip()]
+        self.warmup_iterations = int(os.getenv("WARMUP_ITERATIONS", "3"))
+        self.warmup_budget = float(os.getenv("WARMUP_BUDGET_SECONDS", "60"))
+        self.warmup_report = None
+        # Pesos mapeados desde el archivo (sólo en CPU), compartidos entre workers
+        if mmap_weights is None:
+            mmap_weights = os.getenv("MODEL_MMAP", "1") == "1"
+        self.mmap_weights = mmap_weights and self.device.type == "cpu"
+        self.weights_mmap = False
+        self.normalize = transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
         self.transform = transforms.Compose([
             transforms.Resize((500, 500)),
             transforms.ToTensor(),
-            transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
+            self.normalize
         ])
         self.load_model(model_path)
     def load_model(self, model_path):
+        start = time.perf_counter()
         try:
             model_full_path = Path(__file__).parent / model_path
             print(f"Attempting to load model from: {model_full_path}")
             
-            # Crear una nueva instancia del modelo primero
-            self.model = ResNet18_4(in_channels=3, n_classes=2)
+            # Con mmap los tensores del checkpoint quedan respaldados por el
+            # page cache del archivo en lugar de copiarse a memoria anónima:
+            # todos los workers que cargan el mismo .pth comparten esas
+            # páginas físicas. Requiere el formato zip de torch.save
+            use_mmap = self.mmap_weights and zipfile.is_zipfile(model_full_path)
             
             # Intentar cargar el checkpoint con mapeo de clase apropiado
-            checkpoint = torch.load(model_full_path, map_location=self.device, weights_only=True)
+            checkpoint = torch.load(model_full_path, map_location=self.device, weights_only=True, mmap=use_mmap)
+            
+            # Los modelos podados guardan su arquitectura (anchos de cada
+            # grupo de canales) junto con los pesos; el resto usa la original.
+            # En modo mmap el modelo se arma en el device "meta" (sin reservar
+            # pesos aleatorios) y load_state_dict(assign=True) adopta los
+            # tensores mapeados en lugar de copiarlos
+            arch = checkpoint.get('arch') if isinstance(checkpoint, dict) else None
+            with torch.device("meta") if use_mmap else nullcontext():
+                self.model = build_model(arch) if arch else ResNet18_4(in_channels=3, n_classes=2)
             
             # Manejar diferentes formatos de checkpoint
             if isinstance(checkpoint, dict):
                 if 'state_dict' in checkpoint:
-                    self.model.load_state_dict(checkpoint['state_dict'])
+                    state_dict = checkpoint['state_dict']
                 elif 'model_state_dict' in checkpoint:
-                    self.model.load_state_dict(checkpoint['model_state_dict'])
+                    state_dict = checkpoint['model_state_dict']
                 else:
                     # Asumir que es un state dict directamente
-                    self.model.load_state_dict(checkpoint)
+                    state_dict = checkpoint
             else:
                 # Asumir que es un state dict directamente
-                self.model.load_state_dict(checkpoint)
+                state_dict = checkpoint
+            self.model.load_state_dict(state_dict, assign=use_mmap)
+            self.weights_mmap = use_mmap
             
             self.model.to(self.device)
             self.model.eval()
@@ -174,48 +270,198 @@ class OctagonDetector:
                 except Exception as e3:
                     print(f"❌ All loading methods failed: {e3}")
                     self.model = None
+        MODEL_LOAD_SECONDS.set(time.perf_counter() - start)
     def predict(self, image: Image.Image) -> tuple[bool, float]:
+        return self.predict_batch([image])[0]
+    def predict_batch(self, images: list[Image.Image]) -> list[tuple[bool, float]]:
         if self.model is None:
             raise Exception("Model not loaded")
+        with observe_stage("preprocess"):
+            batch = torch.stack([self.preprocess(image) for image in images])
+        return self.predict_tensors(batch)
+    def preprocess(self, image: Image.Image) -> torch.Tensor:
         if image.mode != 'RGB':
             image = image.convert('RGB')
-        input_tensor = self.transform(image).unsqueeze(0).to(self.device)
+        return self.transform(image)
+    def predict_tensors(self, batch: torch.Tensor) -> list[tuple[bool, float]]:
+        # batch: tensores ya normalizados a 500x500, forma (N, 3, 500, 500)
+        if self.model is None:
+            raise Exception("Model not loaded")
+        batch = batch.to(self.device)
+        BATCH_SIZE.observe(len(batch))
         with torch.no_grad():
-            output = self.model(input_tensor)
-            probabilities = F.softmax(output, dim=1)
-            predicted_class = torch.argmax(output, dim=1).item()
-            confidence = probabilities[0, predicted_class].item()
-            has_octagon = predicted_class == 1
-        return has_octagon, confidence
-    def predict_batch(self, images: list[Image.Image]) -> list[tuple[bool, float]]:
+            if self.cascade:
+                probabilities = self._cascade_probabilities(batch)
+            else:
+                probabilities = self._probabilities(batch)
+            with observe_stage("postprocess"):
+                confidences, predicted_classes = probabilities.max(dim=1)
+                return [
+                    (predicted_class == 1, confidence)
+                    for predicted_class, confidence in zip(predicted_classes.tolist(), confidences.tolist())
+                ]
+    def _probabilities(self, batch: torch.Tensor) -> torch.Tensor:
+        with observe_stage("inference"):
+            return F.softmax(self.model(batch), dim=1)
+    def screening_probabilities(self, batch: torch.Tensor) -> torch.Tensor:
+        # Pase barato: el mismo modelo sobre la imagen reducida (el avgpool
+        # adaptativo admite cualquier resolución de entrada)
+        with observe_stage("screening"):
+            small = F.interpolate(
+                batch, size=(self.cascade_size, self.cascade_size),
+                mode="bilinear", antialias=True, align_corners=False
+            )
+            return F.softmax(self.model(small), dim=1)
+    def escalation_mask(self, probabilities: torch.Tensor) -> torch.Tensor:
+        confidences, predicted_classes = probabilities.max(dim=1)
+        thresholds = torch.where(
+            predicted_classes == 1,
+            torch.full_like(confidences, self.cascade_octagon_threshold),
+            torch.full_like(confidences, self.cascade_threshold),
+        )
+        return confidences < thresholds
+    def _cascade_probabilities(self, batch: torch.Tensor) -> torch.Tensor:
+        probabilities = self.screening_probabilities(batch)
+        escalate = self.escalation_mask(probabilities)
+        n_escalated = int(escalate.sum())
+        if n_escalated:
+            probabilities[escalate] = self._probabilities(batch[escalate])
+        with self._stats_lock:
+            self.cascade_stats["screened"] += len(batch)
+            self.cascade_stats["escalated"] += n_escalated
+        CASCADE_IMAGES.labels(decision="screened").inc(len(batch) - n_escalated)
+        CASCADE_IMAGES.labels(decision="escalated").inc(n_escalated)
+        return probabilities
+    def tile_grid(self, width: int, height: int, overlap: float) -> tuple[float, list[int], list[int]]:
+        # Escala (<= 1) para que la grilla no pase de tile_max ventanas;
+        # acota memoria y tiempo en fotos muy grandes
+        scale = 1.0
+        while True:
+            w, h = max(1, round(width * scale)), max(1, round(height * scale))
+            xs = tile_positions(w, self.tile_size, overlap)
+            ys = tile_positions(h, self.tile_size, overlap)
+            # Con la imagen en 1x1 queda una sola ventana: el loop siempre termina
+            if len(xs) * len(ys) <= self.tile_max or (w == 1 and h == 1):
+                return scale, xs, ys
+            scale *= 0.9
+
+    def predict_tiled(self, image: Image.Image, overlap: float | None = None) -> dict:
         if self.model is None:
             raise Exception("Model not loaded")
-        results = []
-        batch_tensors = []
-        for image in images:
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
-            tensor = self.transform(image)
-            batch_tensors.append(tensor)
-        batch = torch.stack(batch_tensors).to(self.device)
+        overlap = self.tile_overlap if overlap is None else overlap
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        width, height = image.size
+        scale, xs, ys = self.tile_grid(width, height, overlap)
+        if scale < 1.0:
+            image = image.resize((max(1, round(width * scale)), max(1, round(height * scale))), Image.BILINEAR)
+        tile = self.tile_size
+        boxes = [(x, y, min(tile, image.width - x), min(tile, image.height - y)) for y in ys for x in xs]
+        BATCH_SIZE.observe(len(boxes))
+        octagon_probabilities = []
+        # Los tiles se arman por tandas de tile_batch: en memoria hay a lo
+        # sumo una tanda de tensores además de la imagen en uint8
+        for start in range(0, len(boxes), self.tile_batch):
+            with observe_stage("preprocess"):
+                crops = []
+                for x, y, w, h in boxes[start:start + self.tile_batch]:
+                    crop = image.crop((x, y, x + w, y + h))
+                    if (w, h) != (tile, tile):
+                        # Imágenes más chicas que un tile se llevan a 500x500 como en predict
+                        crop = crop.resize((tile, tile), Image.BILINEAR)
+                    crops.append(self.normalize(transforms.functional.to_tensor(crop)))
+                chunk = torch.stack(crops).to(self.device)
+            with torch.no_grad():
+                octagon_probabilities.extend(self._probabilities(chunk)[:, 1].tolist())
+            del chunk, crops
+        with observe_stage("postprocess"):
+            best = max(octagon_probabilities)
+            has_octagon = best >= 0.5
+            return {
+                "has_octagon": has_octagon,
+                "confidence": best if has_octagon else 1 - best,
+                "scale": scale,
+                "grid": (len(ys), len(xs)),
+                "tiles": [
+                    {
+                        "x": round(x / scale), "y": round(y / scale),
+                        "width": round(w / scale), "height": round(h / scale),
+                        "octagon_probability": probability,
+                    }
+                    for (x, y, w, h), probability in zip(boxes, octagon_probabilities)
+                ],
+            }
+    def warmup(self, batch_sizes=None, budget_seconds=None, iterations=None) -> dict:
+        # Forwards de prueba para que los primeros requests reales no paguen la
+        # inicialización. Corta al agotar el presupuesto de tiempo, aunque
+        # queden tamaños sin calentar
+        if self.model is None:
+            return {}
+        batch_sizes = batch_sizes or self.warmup_batch_sizes
+        budget_seconds = budget_seconds if budget_seconds is not None else self.warmup_budget
+        iterations = iterations or self.warmup_iterations
+        start = time.perf_counter()
+        deadline = start + budget_seconds
+        timings = {}
+        complete = True
         with torch.no_grad():
-            outputs = self.model(batch)
-            probabilities = F.softmax(outputs, dim=1)
-            predicted_classes = torch.argmax(outputs, dim=1)
-            for i in range(len(images)):
-                predicted_class = predicted_classes[i].item()
-                confidence = probabilities[i, predicted_class].item()
-                has_octagon = predicted_class == 1
-                results.append((has_octagon, confidence))
-        return results
+            for batch_size in batch_sizes:
+                if time.perf_counter() >= deadline:
+                    complete = False
+                    break
+                batch = torch.zeros(batch_size, 3, 500, 500, device=self.device)
+                seconds = []
+                for _ in range(iterations):
+                    t0 = time.perf_counter()
+                    if self.cascade:
+                        # Mismo pase que screening_probabilities, sin contarlo en las métricas
+                        self.model(F.interpolate(
+                            batch, size=(self.cascade_size, self.cascade_size),
+                            mode="bilinear", antialias=True, align_corners=False
+                        ))
+                    self.model(batch)
+                    seconds.append(time.perf_counter() - t0)
+                    if time.perf_counter() >= deadline:
+                        break
+                timings[batch_size] = {
+                    "iterations": len(seconds),
+                    "first_ms": round(seconds[0] * 1000, 1),
+                    "last_ms": round(seconds[-1] * 1000, 1),
+                }
+                del batch
+        elapsed = time.perf_counter() - start
+        MODEL_WARMUP_SECONDS.set(elapsed)
+        self.warmup_report = {
+            "seconds": round(elapsed, 3),
+            "budget_seconds": budget_seconds,
+            "complete": complete,
+            "batch_sizes": timings,
+        }
+        return self.warmup_report
     def is_loaded(self) -> bool:
         return self.model is not None
     def get_model_info(self) -> dict:
         return {
             "model_type": "ResNet18_4",
+            "architecture": model_architecture(self.model) if hasattr(self.model, "widths") else None,
             "input_size": (500, 500),
             "classes": ["sin_octogono", "con_octogono"],
             "device": str(self.device),
-            "loaded": self.is_loaded()
+            "loaded": self.is_loaded(),
+            "weights_mmap": self.weights_mmap,
+            "cascade": self.get_cascade_info(),
+            "tiled": {"tile_size": self.tile_size, "overlap": self.tile_overlap, "max_tiles": self.tile_max},
+            "warmup": self.warmup_report
+        }
+    def get_cascade_info(self) -> dict:
+        screened = self.cascade_stats["screened"]
+        return {
+            "enabled": self.cascade,
+            "screening_size": (self.cascade_size, self.cascade_size),
+            "threshold": self.cascade_threshold,
+            "octagon_threshold": self.cascade_octagon_threshold,
+            "images": screened,
+            "escalated": self.cascade_stats["escalated"],
+            "escalated_fraction": self.cascade_stats["escalated"] / screened if screened else None
         }
     
\ No newline at end of file
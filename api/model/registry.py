@@ -0,0 +1,229 @@
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+from model.predictor import OctagonDetector
+
+MODEL_DIR = Path(__file__).parent
+REGISTRY_PATH = Path(os.getenv("MODEL_REGISTRY", MODEL_DIR / "registry.json"))
+
+# Registro por defecto cuando no existe registry.json: el modelo podado de siempre
+DEFAULT_MANIFEST = {
+    "default": {"name": "resnet18_4", "version": "podado"},
+    "models": {"resnet18_4": {"podado": "Resnet18_podado.pth"}},
+}
+
+
+class ModelNotReadyError(RuntimeError):
+    """No hay ninguna versión del modelo activa para servir"""
+
+
+def weights_file_id(path: str) -> Optional[tuple]:
+    """
+    (dispositivo, inodo, mtime, tamaño) del .pth. Un reemplazo con os.replace
+    cambia el inodo; una sobrescritura en el lugar lo conserva y cambia el resto.
+    """
+    try:
+        st = (MODEL_DIR / path).stat()
+    except OSError:
+        return None
+    return (st.st_dev, st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+@dataclass
+class ModelVersion:
+    name: str
+    version: str
+    path: str
+    detector: OctagonDetector
+    loaded_at: float = field(default_factory=time.time)
+    load_seconds: float = 0.0
+    warmup: dict = field(default_factory=dict)
+    file_id: Optional[tuple] = None
+
+    def describe(self) -> dict:
+        return {
+            "name": self.name,
+            "version": self.version,
+            "path": self.path,
+            "loaded_at": self.loaded_at,
+            "load_seconds": round(self.load_seconds, 3),
+            "warmup": self.warmup,
+        }
+
+
+class ModelRegistry:
+    """
+    Registro de artefactos del modelo con nombre y versión.
+
+    Las versiones se declaran en registry.json (nombre -> versión -> ruta del
+    .pth, relativa a model/ o absoluta). Una recarga construye y precalienta
+    el nuevo OctagonDetector en un hilo de fondo mientras la versión activa
+    sigue sirviendo, y recién entonces reemplaza la referencia activa. Los
+    requests toman el detector con get() al empezar, así que los lotes en
+    curso terminan con la versión con la que arrancaron. La versión anterior
+    queda en memoria para poder volver atrás al instante con rollback().
+
+    Como mucho hay dos versiones residentes: al empezar una recarga se
+    libera la anterior, así que durante la carga conviven la activa y la
+    candidata, y rollback() sólo está disponible hasta la próxima recarga.
+
+    En CPU los pesos quedan mapeados desde el .pth (ver MODEL_MMAP en
+    OctagonDetector), así que un .pth en uso no se puede sobrescribir: los
+    pesos nuevos van en otra ruta o se instalan con os.replace. Una recarga
+    de la misma ruta carga una copia privada, sin mmap.
+    """
+
+    def __init__(self, manifest_path: Path = REGISTRY_PATH):
+        self.manifest_path = Path(manifest_path)
+        self._lock = threading.Lock()
+        self._active: Optional[ModelVersion] = None
+        self._previous: Optional[ModelVersion] = None
+        self._reload_status = {"state": "idle"}
+        self._manifest = self._read_manifest()
+
+    def _read_manifest(self) -> dict:
+        if self.manifest_path.exists():
+            with open(self.manifest_path, "r") as f:
+                return json.load(f)
+        manifest = json.loads(json.dumps(DEFAULT_MANIFEST))
+        if os.getenv("MODEL_PATH"):
+            manifest["models"]["resnet18_4"]["podado"] = os.getenv("MODEL_PATH")
+        return manifest
+
+    def _write_manifest(self):
+        tmp_path = self.manifest_path.with_suffix(".json.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self._manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def versions(self) -> dict:
+        return self._manifest["models"]
+
+    def register(self, name: str, version: str, path: str):
+        """Agrega (o actualiza) una versión en el registro y lo persiste"""
+        with self._lock:
+            self._manifest["models"].setdefault(name, {})[version] = path
+            self._write_manifest()
+
+    def resolve(self, name: str, version: str) -> str:
+        try:
+            return self._manifest["models"][name][version]
+        except KeyError:
+            raise KeyError(f"Unknown model version {name}:{version}")
+
+    def get(self) -> OctagonDetector:
+        """Detector de la versión activa; los requests lo toman una vez al empezar"""
+        active = self._active
+        if active is None:
+            raise ModelNotReadyError("Model not loaded")
+        return active.detector
+
+    def active(self) -> Optional[ModelVersion]:
+        return self._active
+
+    def is_ready(self) -> bool:
+        """Hay una versión activa; sólo se activa una versión después de su warmup"""
+        active = self._active
+        return active is not None and active.detector.is_loaded()
+
+    def load_default(self, background: bool = False):
+        """
+        Carga la versión por defecto (arranque del servicio). En segundo plano
+        el proceso ya responde /health mientras carga y hace el warmup, y
+        figura como no listo hasta que termina.
+        """
+        default = self._manifest["default"]
+        if background:
+            return self.reload(default["name"], default["version"])
+        self._load_and_swap(default["name"], default["version"])
+
+    def reload(self, name: Optional[str] = None, version: Optional[str] = None) -> dict:
+        """
+        Carga una versión en segundo plano y la activa cuando está lista.
+        Sin argumentos vuelve a leer del disco los pesos de la versión activa;
+        se rechaza si su .pth mapeado fue sobrescrito en el lugar.
+        """
+        active = self._active
+        if name is None:
+            name = active.name if active else self._manifest["default"]["name"]
+        if version is None:
+            version = active.version if active and active.name == name else self._manifest["default"]["version"]
+        path = self.resolve(name, version)
+        if active is not None and active.path == path and active.detector.weights_mmap:
+            current = weights_file_id(path)
+            if current is not None and active.file_id is not None \
+                    and current[:2] == active.file_id[:2] and current != active.file_id:
+                raise RuntimeError(
+                    f"{path} was overwritten in place while its weights are mapped; "
+                    "publish new weights under a new path or with os.replace, and restart the workers"
+                )
+
+        with self._lock:
+            if self._reload_status["state"] == "loading":
+                raise RuntimeError(f"Already loading {self._reload_status['target']}")
+            self._reload_status = {"state": "loading", "target": f"{name}:{version}", "started_at": time.time()}
+        thread = threading.Thread(target=self._load_and_swap, args=(name, version), daemon=True)
+        thread.start()
+        return dict(self._reload_status)
+
+    def rollback(self) -> dict:
+        """Vuelve a la versión anterior, que sigue cargada en memoria"""
+        with self._lock:
+            if self._previous is None:
+                raise RuntimeError("No previous version to roll back to")
+            self._active, self._previous = self._previous, self._active
+            print(f"↩️ Rolled back to model {self._active.name}:{self._active.version}")
+            return self._active.describe()
+
+    def reload_status(self) -> dict:
+        return dict(self._reload_status)
+
+    def _load_and_swap(self, name: str, version: str):
+        path = self.resolve(name, version)
+        with self._lock:
+            # Se suelta la versión anterior antes de cargar la candidata: así
+            # nunca hay tres modelos en memoria (anterior, activa y candidata)
+            self._previous = None
+            active = self._active
+        # Recargar la ruta activa no la vuelve a mapear: la candidata queda
+        # como copia privada y no depende del archivo que mapea la activa
+        same_file = active is not None and active.path == path
+        file_id = weights_file_id(path)
+        start = time.perf_counter()
+        try:
+            detector = OctagonDetector(path, mmap_weights=False if same_file else None)
+            if not detector.is_loaded():
+                raise RuntimeError(f"Could not load model weights from {path}")
+            warmup = detector.warmup()
+        except Exception as e:
+            with self._lock:
+                self._reload_status = {"state": "failed", "target": f"{name}:{version}", "error": str(e)}
+            print(f"❌ Model {name}:{version} was not activated: {e}")
+            return
+
+        candidate = ModelVersion(name, version, path, detector, load_seconds=time.perf_counter() - start,
+                                 warmup=warmup, file_id=file_id)
+        with self._lock:
+            self._previous = self._active
+            self._active = candidate
+            self._reload_status = {"state": "idle", "last": candidate.describe()}
+        print(f"✅ Model {name}:{version} is now active (warmup {warmup.get('seconds')}s)")
+
+    def info(self) -> dict:
+        active = self._active
+        info = active.detector.get_model_info() if active else {"loaded": False}
+        info.update({
+            "active_version": active.describe() if active else None,
+            "previous_version": self._previous.describe() if self._previous else None,
+            "reload": self.reload_status(),
+            "available_versions": self.versions(),
+        })
+        return info
+
+
+registry = ModelRegistry()
@@ -0,0 +1,219 @@
+import asyncio
+import contextvars
+import cProfile
+import functools
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path
+
+import torch
+from fastapi.concurrency import run_in_threadpool as _run_in_threadpool
+
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", "profiles"))
+PROFILED_PREFIXES = ("/predict",)
+MODES = ("cprofile", "torch")
+# Desde Python 3.12 cProfile usa sys.monitoring: hay un solo profiler activo
+# por intérprete, ve todos los threads, y un segundo enable() da ValueError
+PER_THREAD_CPROFILE = sys.version_info < (3, 12)
+
+# Captura del request que se está perfilando, visible para el código que ese
+# request manda al threadpool
+_current_capture = contextvars.ContextVar("profile_capture", default=None)
+
+
+class ProfileCapture:
+    """
+    Captura bajo demanda de los próximos N requests de predicción.
+
+    - Modo "cprofile": perfil a nivel Python de las rutas y del predictor,
+      guardado como archivo pstats (.prof) más un resumen en texto.
+    - Modo "torch": torch.profiler con el desglose por operador del forward
+      de ResNet18_4, guardado como Chrome trace (.json) más la tabla de
+      key_averages en texto.
+
+    Mientras hay una captura activa los requests de predicción se atienden
+    de a uno: cada uno se perfila con el proceso sin otra predicción en
+    curso (el primero espera a que terminen los que ya estaban corriendo),
+    así el perfil no mezcla trabajo de requests concurrentes. Los demás
+    esperan su turno, lo que sube la latencia mientras dura la captura. Las
+    rutas que no son /predict (health, métricas) no se retienen y pueden
+    aparecer en el perfil.
+
+    La decodificación y la inferencia corren en el threadpool (ver
+    run_in_threadpool más abajo). En modo cprofile, hasta Python 3.11 cada
+    llamada enviada al threadpool se perfila con su propio cProfile.Profile
+    en ese thread y al terminar se suman al perfil del event loop; desde
+    3.12 el perfil del event loop ya ve todos los threads. En modo torch el
+    profiler sólo ve el thread del event loop, así que el request perfilado
+    corre ese trabajo en el event loop en lugar del threadpool.
+    """
+
+    def __init__(self, output_dir: Path = PROFILE_DIR):
+        self.output_dir = Path(output_dir)
+        self._lock = threading.Lock()
+        self._active = None
+        self._captures = {}
+        # Turno de los requests de predicción durante una captura, y cuántos
+        # corren por fuera de ella (arrancaron sin captura activa)
+        self._turn = asyncio.Lock()
+        self._running = 0
+        self._drained = asyncio.Event()
+
+    def start(self, n_requests: int, mode: str = "cprofile") -> dict:
+        if mode not in MODES:
+            raise ValueError(f"Unknown profiling mode: {mode}")
+        with self._lock:
+            if self._active is not None:
+                raise RuntimeError(f"Capture {self._active['id']} is still running")
+            capture = {
+                "id": uuid.uuid4().hex[:12],
+                "mode": mode,
+                "requested": n_requests,
+                "profiled": 0,
+                "status": "waiting",
+                "started_at": time.time(),
+                "finished_at": None,
+                "files": {},
+                "_thread_profiles": [],
+            }
+            capture["_profiler"] = cProfile.Profile() if mode == "cprofile" else self._new_torch_profiler()
+            self._captures[capture["id"]] = capture
+            self._active = capture
+        return self._public(capture)
+
+    def status(self, capture_id: str):
+        capture = self._captures.get(capture_id)
+        return None if capture is None else self._public(capture)
+
+    def file_path(self, capture_id: str, kind: str):
+        capture = self._captures.get(capture_id)
+        if capture is None or kind not in capture["files"]:
+            return None
+        return Path(capture["files"][kind])
+
+    async def middleware(self, request, call_next):
+        """Middleware HTTP: sin captura activa el costo es un contador"""
+        if not request.url.path.startswith(PROFILED_PREFIXES):
+            return await call_next(request)
+        if self._active is not None:
+            async with self._turn:
+                capture = self._active
+                if capture is not None:
+                    while self._running:
+                        self._drained.clear()
+                        await self._drained.wait()
+                    return await self._profile(capture, request, call_next)
+        self._running += 1
+        try:
+            return await call_next(request)
+        finally:
+            self._running -= 1
+            if not self._running:
+                self._drained.set()
+
+    async def _profile(self, capture, request, call_next):
+        profiler = capture["_profiler"]
+        label = f"{request.method} {request.url.path}"
+        token = _current_capture.set(capture)
+        try:
+            if capture["mode"] == "cprofile":
+                profiler.enable()
+                try:
+                    response = await call_next(request)
+                finally:
+                    profiler.disable()
+            else:
+                if capture["status"] == "waiting":
+                    profiler.__enter__()
+                with torch.profiler.record_function(label):
+                    response = await call_next(request)
+        finally:
+            _current_capture.reset(token)
+            capture["status"] = "running"
+            capture["profiled"] += 1
+            if capture["profiled"] >= capture["requested"]:
+                self._finish(capture)
+        return response
+
+    def _finish(self, capture):
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        base = self.output_dir / f"profile_{capture['id']}_{capture['mode']}"
+        profiler = capture.pop("_profiler")
+        try:
+            if capture["mode"] == "cprofile":
+                summary = io.StringIO()
+                stats = pstats.Stats(profiler, stream=summary)
+                for thread_profile in capture.pop("_thread_profiles"):
+                    stats.add(thread_profile)
+                stats.dump_stats(f"{base}.prof")
+                stats.sort_stats("cumulative").print_stats(50)
+                Path(f"{base}.txt").write_text(summary.getvalue())
+                capture["files"] = {"pstats": f"{base}.prof", "summary": f"{base}.txt"}
+            else:
+                profiler.__exit__(None, None, None)
+                profiler.export_chrome_trace(f"{base}.json")
+                table = profiler.key_averages().table(sort_by="self_cpu_time_total", row_limit=50)
+                Path(f"{base}.txt").write_text(table)
+                capture["files"] = {"chrome_trace": f"{base}.json", "summary": f"{base}.txt"}
+            capture["status"] = "done"
+            print(f"✅ Profile capture {capture['id']} saved to {base}.*")
+        except Exception as e:
+            capture["status"] = "failed"
+            capture["error"] = str(e)
+            print(f"❌ Error saving profile capture {capture['id']}: {e}")
+        capture["finished_at"] = time.time()
+        with self._lock:
+            self._active = None
+
+    @staticmethod
+    def _new_torch_profiler():
+        activities = [torch.profiler.ProfilerActivity.CPU]
+        if torch.cuda.is_available():
+            activities.append(torch.profiler.ProfilerActivity.CUDA)
+        return torch.profiler.profile(activities=activities, record_shapes=True, profile_memory=True)
+
+    @staticmethod
+    def _public(capture) -> dict:
+        return {k: v for k, v in capture.items() if not k.startswith("_")}
+
+
+def profiled(fn):
+    """
+    En modo cprofile envuelve fn para que la perfile un cProfile.Profile
+    propio del thread donde corra. Sin captura activa, en modo torch o desde
+    Python 3.12 devuelve fn tal cual.
+    """
+    capture = _current_capture.get()
+    if capture is None or capture["mode"] != "cprofile" or not PER_THREAD_CPROFILE:
+        return fn
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        # Un Profile por thread: uno compartido entre threads mezcla las pilas de llamadas
+        thread_profile = cProfile.Profile()
+        thread_profile.enable()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            thread_profile.disable()
+            capture.get("_thread_profiles", []).append(thread_profile)
+
+    return wrapper
+
+
+async def run_in_threadpool(fn, *args, **kwargs):
+    """run_in_threadpool de FastAPI, pero visible para la captura de perfiles en curso"""
+    capture = _current_capture.get()
+    if capture is not None and capture["mode"] == "torch":
+        # torch.profiler sólo registra el thread que lo activó, el del event
+        # loop: ahí corre el trabajo del request perfilado
+        return fn(*args, **kwargs)
+    return await _run_in_threadpool(profiled(fn), *args, **kwargs)
+
+
+profiler = ProfileCapture()
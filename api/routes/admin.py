@@ -0,0 +1,93 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import FileResponse
+from typing import Optional
+import os
+import secrets
+from profiling import profiler
+from model.registry import registry
+from schemas import ModelReloadRequest
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+def require_admin(x_admin_token: Optional[str] = Header(default=None)):
+    """
+    Protege los endpoints de administración con el header X-Admin-Token.
+    Si ADMIN_TOKEN no está definido, la administración queda deshabilitada,
+    y también cuando serve.py corre más de un worker.
+    """
+    expected = os.getenv("ADMIN_TOKEN")
+    if not expected:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (ADMIN_TOKEN not set)")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, expected):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+    # Con serve.py --workers N cada worker tiene su propio registro y su propio
+    # profiler: una recarga, un rollback o una captura sólo afectaría al worker
+    # que recibió el request
+    workers = int(os.getenv("SERVE_WORKER_COUNT", "1"))
+    if workers > 1:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Admin endpoints are disabled with {workers} workers; run a single worker to reload models or profile",
+        )
+
+@router.post("/profile", dependencies=[Depends(require_admin)])
+async def start_profile(
+    requests: int = Query(10, ge=1, le=1000, description="Cantidad de requests de predicción a capturar"),
+    mode: str = Query("cprofile", pattern="^(cprofile|torch)$", description="cprofile (Python) o torch (operadores)"),
+):
+    """Inicia la captura de un perfil de los próximos N requests a /predict"""
+    try:
+        return profiler.start(requests, mode)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@router.get("/profile/{capture_id}", dependencies=[Depends(require_admin)])
+async def get_profile_status(capture_id: str):
+    """Estado de una captura y archivos generados"""
+    status = profiler.status(capture_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Capture not found")
+    return status
+
+@router.get("/profile/{capture_id}/download", dependencies=[Depends(require_admin)])
+async def download_profile(
+    capture_id: str,
+    kind: str = Query("summary", description="pstats, chrome_trace o summary"),
+):
+    """Descarga el archivo pstats / Chrome trace o el resumen en texto de una captura"""
+    path = profiler.file_path(capture_id, kind)
+    if path is None or not path.exists():
+        raise HTTPException(status_code=404, detail="Profile file not available")
+    return FileResponse(path, filename=path.name)
+
+@router.post("/model/reload", status_code=202, dependencies=[Depends(require_admin)])
+async def reload_model(request: Optional[ModelReloadRequest] = None):
+    """
+    Carga una versión del modelo en segundo plano y la activa cuando termina el warmup.
+    Si se pasa path, se registra primero como name:version. Sin cuerpo, recarga
+    desde disco la versión activa.
+    """
+    request = request or ModelReloadRequest()
+    if request.path is not None:
+        if not request.name or not request.version:
+            raise HTTPException(status_code=400, detail="name and version are required when registering a path")
+        registry.register(request.name, request.version, request.path)
+    try:
+        return registry.reload(request.name, request.version)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@router.get("/model/reload", dependencies=[Depends(require_admin)])
+async def get_reload_status():
+    """Estado de la última recarga del modelo"""
+    return registry.reload_status()
+
+@router.post("/model/rollback", dependencies=[Depends(require_admin)])
+async def rollback_model():
+    """Vuelve a activar la versión anterior del modelo (sigue cargada en memoria)"""
+    try:
+        return registry.rollback()
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
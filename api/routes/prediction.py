@@ -1,14 +1,75 @@
-from fastapi import APIRouter, File, UploadFile, HTTPException
+from fastapi import APIRouter, File, UploadFile, HTTPException, Query
 from typing import List
-import io
-from PIL import Image
-from model.predictor import OctagonDetector
-from schemas import PredictionResponse, BatchPredictionResponse, ErrorResponse
+import asyncio
+import os
+import time
+import torch
+from model.registry import registry, ModelNotReadyError
+from schemas import PredictionResponse, BatchPredictionResponse, ErrorResponse, UrlPredictionRequest, UrlBatchPredictionResponse, TiledPredictionResponse, TileScore
+from metrics import observe_stage, record_request
+from url_fetcher import fetcher
+from admission import admission
+from profiling import run_in_threadpool
+import ingest
+
+MAX_URLS = int(os.getenv("URL_MAX_COUNT", "50"))
+# Tandas en que /predict/urls parte las descargas: la siguiente se decodifica
+# mientras la actual está en el modelo
+URL_PIPELINE_CHUNK = int(os.getenv("URL_PIPELINE_CHUNK", "16"))
+if URL_PIPELINE_CHUNK < 1:
+    raise ValueError(f"URL_PIPELINE_CHUNK must be >= 1, got {URL_PIPELINE_CHUNK}")
 
 router = APIRouter(prefix="/predict", tags=["prediction"])
 
-# Inicializar detector del modelo
-detector = OctagonDetector()
+async def run_inference(fn, *args, images: int = 1):
+    # La inferencia corre en el threadpool para no bloquear el event loop
+    # (el control de admisión tiene que poder responder mientras tanto) y
+    # reserva su parte del presupuesto de imágenes en vuelo
+    reserved = await admission.acquire_images(images)
+    try:
+        return await run_in_threadpool(fn, *args)
+    finally:
+        admission.release_images(reserved)
+
+async def decode_downloads(detector, downloaded):
+    # Decodifica en el threadpool; los errores quedan en la lista en lugar de cortar el gather
+    return await asyncio.gather(
+        *(run_in_threadpool(ingest.bytes_to_tensor, detector, result.content) for result in downloaded),
+        return_exceptions=True
+    )
+
+async def predict_downloads(detector, downloaded, errors, chunk_size=URL_PIPELINE_CHUNK):
+    """
+    Decodifica y clasifica las descargas en tandas de chunk_size, con doble
+    buffer: mientras una tanda está en el modelo la siguiente ya se está
+    decodificando en el threadpool. Devuelve [(resultado, (has_octagon,
+    confidence))] y anota en errors las imágenes que no se pudieron decodificar.
+    """
+    chunks = [downloaded[i:i + chunk_size] for i in range(0, len(downloaded), chunk_size)]
+    predicted = []
+    next_decode = asyncio.ensure_future(decode_downloads(detector, chunks[0])) if chunks else None
+    try:
+        for i, chunk in enumerate(chunks):
+            loaded = await next_decode
+            next_decode = asyncio.ensure_future(decode_downloads(detector, chunks[i + 1])) if i + 1 < len(chunks) else None
+            tensors = []
+            pending = []
+            for result, tensor in zip(chunk, loaded):
+                # Los bytes descargados ya no hacen falta
+                result.content = None
+                if isinstance(tensor, Exception):
+                    errors[result.url] = tensor.detail if isinstance(tensor, ingest.UploadError) else str(tensor)
+                else:
+                    tensors.append(tensor)
+                    pending.append(result)
+            del loaded
+            if tensors:
+                batch_predictions = await run_inference(detector.predict_tensors, torch.stack(tensors), images=len(tensors))
+                predicted.extend(zip(pending, batch_predictions))
+    finally:
+        if next_decode is not None:
+            next_decode.cancel()
+    return predicted
 
 @router.post("/single", response_model=PredictionResponse)
 async def predict_single_image(file: UploadFile = File(...)):
@@ -16,100 +77,270 @@ async def predict_single_image(file: UploadFile = File(...)):
     Analiza una imagen individual de alimento para detectar octógonos de advertencia.
     Retorna: True si se detecta octógono, False si no hay octógono
     """
+    start = time.perf_counter()
+    outcome = "server_error"
     try:
-        # Validar archivo
-        if not file.content_type.startswith("image/"):
-            raise HTTPException(status_code=400, detail="File must be an image")
-        
-        # Cargar imagen
-        image_data = await file.read()
-        image = Image.open(io.BytesIO(image_data))
-        
+        # Validar tamaño y tipo del archivo, sin leerlo a memoria
+        with observe_stage("upload_read"):
+            upload = ingest.spooled_upload(file)
+
+        # Decodificar y preprocesar; la imagen se libera apenas está el tensor
+        detector = registry.get()
+        tensor = await run_in_threadpool(ingest.to_tensor, detector, upload)
+
         # Realizar predicción - solo retorna booleano y confianza
-        has_octagon, confidence = detector.predict(image)
-        
-        # Mensaje simple basado en la detección de octógono
-        if has_octagon:
-            message = f"⚠️ Octagon detected (confidence: {confidence:.2%})"
-        else:
-            message = f"✅ No octagon found (confidence: {confidence:.2%})"
-        
-        return PredictionResponse(
-            filename=file.filename,
-            has_octagon=has_octagon,
-            confidence=confidence,
-            message=message
-        )
-    
+        has_octagon, confidence = (await run_inference(detector.predict_tensors, tensor.unsqueeze(0)))[0]
+
+        with observe_stage("response"):
+            # Mensaje simple basado en la detección de octógono
+            if has_octagon:
+                message = f"⚠️ Octagon detected (confidence: {confidence:.2%})"
+            else:
+                message = f"✅ No octagon found (confidence: {confidence:.2%})"
+
+            response = PredictionResponse(
+                filename=file.filename,
+                has_octagon=has_octagon,
+                confidence=confidence,
+                message=message
+            )
+        outcome = "success"
+        return response
+
+    except HTTPException:
+        raise
+    except ingest.UploadError as e:
+        outcome = "client_error"
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except ModelNotReadyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing image: {str(e)}")
+    finally:
+        record_request("single", outcome, time.perf_counter() - start)
+
+@router.post("/tiled", response_model=TiledPredictionResponse)
+async def predict_tiled_image(file: UploadFile = File(...), overlap: float = Query(0.25, ge=0.0, lt=0.9)):
+    """
+    Analiza una foto de góndola o estante con varios productos recorriéndola con
+    ventanas de 500x500 solapadas. Retorna el veredicto de la imagen y la
+    probabilidad de octógono de cada ventana (coordenadas en la imagen original).
+    """
+    start = time.perf_counter()
+    outcome = "server_error"
+    try:
+        with observe_stage("upload_read"):
+            upload = ingest.spooled_upload(file)
+        try:
+            # Sin draft: los tiles necesitan la resolución completa
+            with observe_stage("decode"):
+                image = await run_in_threadpool(ingest.decode, upload, False)
+        finally:
+            upload.close()
+
+        detector = registry.get()
+        try:
+            result = await run_inference(detector.predict_tiled, image, overlap, images=detector.tile_batch)
+        finally:
+            image.close()
+
+        with observe_stage("response"):
+            has_octagon, confidence = result["has_octagon"], result["confidence"]
+            if has_octagon:
+                message = f"⚠️ Octagon detected (confidence: {confidence:.2%})"
+            else:
+                message = f"✅ No octagon found (confidence: {confidence:.2%})"
+            rows, cols = result["grid"]
+            response = TiledPredictionResponse(
+                filename=file.filename,
+                has_octagon=has_octagon,
+                confidence=confidence,
+                message=message,
+                grid_rows=rows,
+                grid_cols=cols,
+                scale=result["scale"],
+                tiles=[TileScore(**tile) for tile in result["tiles"]]
+            )
+        outcome = "success"
+        return response
+
+    except HTTPException:
+        raise
+    except ingest.UploadError as e:
+        outcome = "client_error"
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except ModelNotReadyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing image: {str(e)}")
+    finally:
+        record_request("tiled", outcome, time.perf_counter() - start)
 
 @router.post("/batch", response_model=BatchPredictionResponse)
 async def predict_batch_images(files: List[UploadFile] = File(...)):
     """
     Analiza múltiples imágenes de alimentos para detectar octógonos de advertencia en lote (máximo 10 archivos).
     """
+    start = time.perf_counter()
     if len(files) > 10:
+        record_request("batch", "client_error", time.perf_counter() - start)
         raise HTTPException(status_code=400, detail="Maximum 10 files allowed")
-    
+
+    # Se toma la versión activa una sola vez para todo el lote
+    try:
+        detector = registry.get()
+    except ModelNotReadyError as e:
+        record_request("batch", "server_error", time.perf_counter() - start)
+        raise HTTPException(status_code=503, detail=str(e))
+
     results = []
     octagon_count = 0
     no_octagon_count = 0
-    
-    # Procesar imágenes
-    images = []
+
+    # Procesar imágenes: de cada archivo sólo queda su tensor, la imagen
+    # decodificada se libera antes de pasar al siguiente
+    tensors = []
     filenames = []
-    
+
+    accepted = []
     for file in files:
         try:
-            if not file.content_type.startswith("image/"):
-                results.append(ErrorResponse(
-                    filename=file.filename,
-                    error="File must be an image"
-                ))
-                continue
-            
-            image_data = await file.read()
-            image = Image.open(io.BytesIO(image_data))
-            images.append(image)
-            filenames.append(file.filename)
-            
-        except Exception as e:
+            with observe_stage("upload_read"):
+                accepted.append((file.filename, ingest.spooled_upload(file)))
+        except ingest.UploadError as e:
             results.append(ErrorResponse(
                 filename=file.filename,
-                error=str(e)
+                error=e.detail
+            ))
+
+    # Los archivos se decodifican en paralelo en el threadpool
+    loaded = await asyncio.gather(
+        *(run_in_threadpool(ingest.to_tensor, detector, upload) for _, upload in accepted),
+        return_exceptions=True
+    )
+    for (filename, _), tensor in zip(accepted, loaded):
+        if isinstance(tensor, Exception):
+            results.append(ErrorResponse(
+                filename=filename,
+                error=tensor.detail if isinstance(tensor, ingest.UploadError) else str(tensor)
             ))
-    
+        else:
+            tensors.append(tensor)
+            filenames.append(filename)
+    del loaded
+
     # Predicción por lote
     try:
-        predictions = detector.predict_batch(images)
-        
-        for filename, (has_octagon, confidence) in zip(filenames, predictions):
-            # Contar resultados
+        predictions = await run_inference(detector.predict_tensors, torch.stack(tensors), images=len(tensors)) if tensors else []
+        del tensors
+
+        with observe_stage("response"):
+            for filename, (has_octagon, confidence) in zip(filenames, predictions):
+                # Contar resultados
+                if has_octagon:
+                    octagon_count += 1
+                else:
+                    no_octagon_count += 1
+
+                # Mensaje simple basado en la detección de octógono
+                if has_octagon:
+                    message = f"⚠️ Octagon detected (confidence: {confidence:.2%})"
+                else:
+                    message = f"✅ No octagon found (confidence: {confidence:.2%})"
+
+                results.append(PredictionResponse(
+                    filename=filename,
+                    has_octagon=has_octagon,
+                    confidence=confidence,
+                    message=message
+                ))
+
+    except Exception as e:
+        record_request("batch", "server_error", time.perf_counter() - start)
+        raise HTTPException(status_code=500, detail=f"Batch prediction error: {str(e)}")
+
+    outcome = "success" if len(filenames) == len(files) else "partial"
+    record_request("batch", outcome, time.perf_counter() - start)
+    return BatchPredictionResponse(
+        results=results,
+        total_processed=len(files),
+        octagon_count=octagon_count,
+        no_octagon_count=no_octagon_count
+    )
+
+@router.post("/urls", response_model=UrlBatchPredictionResponse)
+async def predict_image_urls(request: UrlPredictionRequest):
+    """
+    Analiza imágenes a partir de sus URLs (por ejemplo las de Product.images del scraper).
+    Las descargas se hacen en paralelo y los resultados se cachean por URL + ETag.
+    """
+    start = time.perf_counter()
+    # Se conserva el orden de llegada sin repetir descargas
+    urls = list(dict.fromkeys(request.urls))
+    if not urls or len(urls) > MAX_URLS:
+        record_request("urls", "client_error", time.perf_counter() - start)
+        raise HTTPException(status_code=400, detail=f"Between 1 and {MAX_URLS} URLs allowed")
+
+    try:
+        detector = registry.get()
+    except ModelNotReadyError as e:
+        record_request("urls", "server_error", time.perf_counter() - start)
+        raise HTTPException(status_code=503, detail=str(e))
+    active = registry.active()
+    model_id = f"{active.name}:{active.version}:{active.loaded_at}"
+
+    with observe_stage("upload_read"):
+        fetched = await fetcher.fetch_many(urls, model_id)
+
+    predictions = {}
+    errors = {}
+    downloaded = []
+    for result in fetched:
+        if result.error is not None:
+            errors[result.url] = result.error
+        elif result.cached is not None:
+            predictions[result.url] = (result.cached.has_octagon, result.cached.confidence)
+        else:
+            downloaded.append(result)
+    cache_hits = len(predictions)
+
+    try:
+        batch_predictions = await predict_downloads(detector, downloaded, errors)
+    except Exception as e:
+        record_request("urls", "server_error", time.perf_counter() - start)
+        raise HTTPException(status_code=500, detail=f"Batch prediction error: {str(e)}")
+    for result, (has_octagon, confidence) in batch_predictions:
+        fetcher.cache.put(result.url, result.etag, model_id, has_octagon, confidence)
+        predictions[result.url] = (has_octagon, confidence)
+
+    with observe_stage("response"):
+        results = []
+        octagon_count = 0
+        no_octagon_count = 0
+        for url in urls:
+            if url in errors:
+                results.append(ErrorResponse(filename=url, error=errors[url]))
+                continue
+            has_octagon, confidence = predictions[url]
             if has_octagon:
                 octagon_count += 1
-            else:
-                no_octagon_count += 1
-            
-            # Mensaje simple basado en la detección de octógono
-            if has_octagon:
                 message = f"⚠️ Octagon detected (confidence: {confidence:.2%})"
             else:
+                no_octagon_count += 1
                 message = f"✅ No octagon found (confidence: {confidence:.2%})"
-            
             results.append(PredictionResponse(
-                filename=filename,
+                filename=url,
                 has_octagon=has_octagon,
                 confidence=confidence,
                 message=message
             ))
-    
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Batch prediction error: {str(e)}")
-    
-    return BatchPredictionResponse(
+
+    outcome = "success" if not errors else "partial"
+    record_request("urls", outcome, time.perf_counter() - start)
+    return UrlBatchPredictionResponse(
         results=results,
-        total_processed=len(files),
+        total_processed=len(urls),
         octagon_count=octagon_count,
-        no_octagon_count=no_octagon_count
-    )
\ No newline at end of file
+        no_octagon_count=no_octagon_count,
+        cache_hits=cache_hits
+    )
@@ -20,4 +20,34 @@ class BatchPredictionResponse(BaseModel):
 class HealthCheckResponse(BaseModel):
     status: str
     model_loaded: bool
-    message: str
\ No newline at end of file
+    ready: bool
+    message: str
+    warmup: Optional[dict] = None
+
+class ModelReloadRequest(BaseModel):
+    name: Optional[str] = None
+    version: Optional[str] = None
+    path: Optional[str] = None
+
+class UrlPredictionRequest(BaseModel):
+    urls: List[str]
+
+class UrlBatchPredictionResponse(BatchPredictionResponse):
+    cache_hits: int
+
+class TileScore(BaseModel):
+    x: int
+    y: int
+    width: int
+    height: int
+    octagon_probability: float
+
+class TiledPredictionResponse(BaseModel):
+    filename: str
+    has_octagon: bool
+    confidence: float
+    message: str
+    grid_rows: int
+    grid_cols: int
+    scale: float
+    tiles: List[TileScore]
@@ -0,0 +1,233 @@
+"""
+Lanzador multi-worker de la API con topología de threads explícita.
+
+Cada worker es un proceso uvicorn independiente que comparte el socket de
+escucha y arranca con una cantidad fija de threads intra-op/inter-op de
+torch, de forma que workers x threads no supere los cores disponibles
+(afinidad del proceso y límite de CPU del contenedor). Opcionalmente fija
+cada worker a su propio grupo de cores.
+
+Uso (desde el directorio api/):
+    python serve.py                              # 1 worker, threads = cores
+    python serve.py --workers 4                  # threads = cores // 4
+    python serve.py --workers 2 --threads 2 --pin
+Variables de entorno equivalentes: SERVE_WORKERS, SERVE_THREADS,
+SERVE_INTEROP_THREADS, SERVE_PIN.
+
+Un worker que muere se reinicia con backoff exponencial (de
+RESTART_BACKOFF_MIN a RESTART_BACKOFF_MAX segundos), que vuelve al mínimo
+si el worker llegó a correr RESTART_STABLE_SECONDS; así un worker que falla
+al arrancar no queda en un loop de reinicios cada medio segundo.
+
+Con más de un worker los endpoints /admin/* responden 409: el registro de
+modelos y las capturas de perfiles son estado de cada proceso, y un request
+de administración sólo llega a uno de los workers.
+"""
+import argparse
+import math
+import multiprocessing
+import os
+import shutil
+import signal
+import socket
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+RESTART_BACKOFF_MIN = 0.5
+RESTART_BACKOFF_MAX = 30.0
+RESTART_STABLE_SECONDS = 60.0
+
+
+@dataclass
+class WorkerPlan:
+    index: int
+    intra_op_threads: int
+    inter_op_threads: int
+    cpus: Optional[list[int]] = None
+
+
+def available_cpus() -> list[int]:
+    """Cores en los que este proceso tiene permitido correr"""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def cgroup_cpu_limit() -> Optional[float]:
+    """Límite de CPU del contenedor (cgroup v2 o v1), en cores; None si no hay límite"""
+    cpu_max = Path("/sys/fs/cgroup/cpu.max")
+    if cpu_max.exists():
+        quota, period = cpu_max.read_text().split()[:2]
+        if quota != "max":
+            return int(quota) / int(period)
+        return None
+    quota_file = Path("/sys/fs/cgroup/cpu/cpu.cfs_quota_us")
+    period_file = Path("/sys/fs/cgroup/cpu/cpu.cfs_period_us")
+    if quota_file.exists() and period_file.exists():
+        quota = int(quota_file.read_text())
+        if quota > 0:
+            return quota / int(period_file.read_text())
+    return None
+
+
+def effective_cpu_count() -> int:
+    cpus = len(available_cpus())
+    limit = cgroup_cpu_limit()
+    if limit is not None:
+        cpus = min(cpus, max(1, math.floor(limit)))
+    return cpus
+
+
+def plan_topology(workers: int = 1, threads: Optional[int] = None,
+                  interop_threads: int = 1, pin: bool = False) -> list[WorkerPlan]:
+    """
+    Reparte los cores disponibles entre los workers.
+
+    Por defecto cada worker usa cores // workers threads intra-op y un solo
+    thread inter-op (el forward de ResNet18_4 es una cadena secuencial de
+    capas, así que el paralelismo inter-op no aporta y sólo compite por
+    cores). Con pin=True cada worker queda fijado a un grupo disjunto de
+    cores de la afinidad actual.
+    """
+    cores = effective_cpu_count()
+    threads = threads or max(1, cores // workers)
+    if workers * threads > cores:
+        print(f"⚠️ {workers} workers x {threads} threads oversubscribe {cores} available cores")
+    cpu_ids = available_cpus()
+    plans = []
+    for i in range(workers):
+        cpus = None
+        if pin:
+            start = (i * threads) % len(cpu_ids)
+            cpus = [cpu_ids[(start + j) % len(cpu_ids)] for j in range(threads)]
+        plans.append(WorkerPlan(i, threads, interop_threads, cpus))
+    return plans
+
+
+def apply_thread_settings(plan: WorkerPlan):
+    """Configura afinidad y threads de torch; debe correr antes de importar la app"""
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[var] = str(plan.intra_op_threads)
+    if plan.cpus is not None and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, plan.cpus)
+    import torch
+
+    torch.set_num_threads(plan.intra_op_threads)
+    torch.set_num_interop_threads(plan.inter_op_threads)
+
+
+def run_worker(sock: socket.socket, plan: WorkerPlan, app: str, log_level: str):
+    apply_thread_settings(plan)
+    import uvicorn
+
+    print(
+        f"🚀 Worker {plan.index} (pid {os.getpid()}): intra-op={plan.intra_op_threads} "
+        f"inter-op={plan.inter_op_threads} cpus={plan.cpus or 'all'}"
+    )
+    config = uvicorn.Config(app, log_level=log_level)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def serve(plans: list[WorkerPlan], host: str, port: int, app: str = "main:app", log_level: str = "info"):
+    """Levanta un proceso por plan compartiendo el socket y los supervisa"""
+    # Los workers lo heredan; con más de uno, routes/admin.py rechaza la administración
+    os.environ["SERVE_WORKER_COUNT"] = str(len(plans))
+    if len(plans) > 1 and not os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        # Con varios workers, /metrics agrega los valores de todos los procesos
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="octagon-metrics-")
+    sock = bind_socket(host, port)
+    # spawn: cada worker arranca con un estado de torch/OpenMP limpio
+    ctx = multiprocessing.get_context("spawn")
+    processes = {}
+    # Reinicios seguidos de cada worker y cuándo toca el próximo
+    failures = {}
+    restart_at = {}
+
+    def start(plan):
+        process = ctx.Process(target=run_worker, args=(sock, plan, app, log_level), daemon=False)
+        process.start()
+        processes[plan.index] = (process, plan, time.monotonic())
+
+    def reap(process):
+        # Sin esto los gauges "live*" del worker muerto quedan en el directorio
+        # de métricas y /metrics los sigue sumando
+        if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+            from prometheus_client import multiprocess
+
+            multiprocess.mark_process_dead(process.pid)
+
+    for plan in plans:
+        start(plan)
+    print(f"✅ Serving {app} on http://{host}:{port} with {len(plans)} worker(s)")
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        while not stopping:
+            now = time.monotonic()
+            for index, (process, plan, started_at) in list(processes.items()):
+                if index in restart_at:
+                    if now >= restart_at[index]:
+                        del restart_at[index]
+                        start(plan)
+                    continue
+                if process.is_alive():
+                    continue
+                reap(process)
+                if now - started_at >= RESTART_STABLE_SECONDS:
+                    failures[index] = 0
+                delay = min(RESTART_BACKOFF_MAX, RESTART_BACKOFF_MIN * 2 ** failures.get(index, 0))
+                failures[index] = failures.get(index, 0) + 1
+                restart_at[index] = now + delay
+                print(f"❌ Worker {index} exited with code {process.exitcode}, restarting in {delay:.1f}s")
+            time.sleep(0.5)
+    finally:
+        for process, _, _ in processes.values():
+            process.terminate()
+        for process, _, _ in processes.values():
+            process.join(timeout=10)
+            if process.pid is not None and not process.is_alive():
+                reap(process)
+        sock.close()
+        multiproc_dir = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+        if multiproc_dir and multiproc_dir.startswith(tempfile.gettempdir()):
+            shutil.rmtree(multiproc_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lanzador multi-worker de la API de octógonos")
+    parser.add_argument("--host", type=str, default=os.getenv("SERVE_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("SERVE_PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("SERVE_WORKERS", "1")))
+    parser.add_argument("--threads", type=int, default=int(os.getenv("SERVE_THREADS", "0")) or None,
+                        help="Threads intra-op por worker (por defecto cores // workers)")
+    parser.add_argument("--interop-threads", type=int, default=int(os.getenv("SERVE_INTEROP_THREADS", "1")))
+    parser.add_argument("--pin", action="store_true", default=os.getenv("SERVE_PIN", "0") == "1",
+                        help="Fijar cada worker a un grupo disjunto de cores")
+    parser.add_argument("--log-level", type=str, default="info")
+    args = parser.parse_args()
+
+    plans = plan_topology(args.workers, args.threads, args.interop_threads, args.pin)
+    serve(plans, args.host, args.port, log_level=args.log_level)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Los módulos de la API se importan como en main.py, desde el directorio api/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,175 @@
+"""Tests de UrlFetcher contra un http.server local en 127.0.0.1"""
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from url_fetcher import PredictionCache, UrlFetcher
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 256
+ETAG = '"v1"'
+
+
+class ImageHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/image.png":
+            self._send(200, PNG, "image/png", {"ETag": ETAG})
+        elif self.path == "/etag.png":
+            if self.headers.get("If-None-Match") == ETAG:
+                self.send_response(304)
+                self.send_header("ETag", ETAG)
+                self.end_headers()
+                self.server.revalidations += 1
+            else:
+                self._send(200, PNG, "image/png", {"ETag": ETAG})
+        elif self.path == "/slow.png":
+            time.sleep(1.0)
+            self._send(200, PNG, "image/png")
+        elif self.path == "/large.png":
+            # Sin Content-Length: el límite se tiene que aplicar mientras se lee
+            self.send_response(200)
+            self.send_header("Content-Type", "image/png")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            for _ in range(64):
+                self.wfile.write(b"\x00" * 1024)
+        elif self.path == "/page.html":
+            self._send(200, b"<html></html>", "text/html")
+        elif self.path == "/redirect":
+            self._redirect("/image.png")
+        elif self.path == "/redirect-localhost":
+            self._redirect(f"http://localhost:{self.server.server_port}/image.png")
+        elif self.path == "/loop":
+            self._redirect("/loop")
+        else:
+            self._send(404, b"", "text/plain")
+
+    def _send(self, status, body, content_type, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _redirect(self, location):
+        self.send_response(302)
+        self.send_header("Location", location)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), ImageHandler)
+    httpd.daemon_threads = True
+    httpd.revalidations = 0
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def url(server, path):
+    return f"http://127.0.0.1:{server.server_port}{path}"
+
+
+def fetch(fetcher, target, model_id="model-a"):
+    async def run():
+        try:
+            return await fetcher.fetch(target, model_id)
+        finally:
+            await fetcher.close()
+
+    return asyncio.run(run())
+
+
+def local_fetcher(**kwargs):
+    return UrlFetcher(**{"allow_private": True, "allowed_hosts": [], **kwargs})
+
+
+def test_fetch_image(server):
+    result = fetch(local_fetcher(), url(server, "/image.png"))
+    assert result.error is None
+    assert result.content == PNG
+    assert result.etag == ETAG
+
+
+def test_timeout(server):
+    result = fetch(local_fetcher(timeout=0.2), url(server, "/slow.png"))
+    assert result.content is None
+    assert result.error == "Timed out"
+
+
+def test_size_cap_aborts_download(server):
+    result = fetch(local_fetcher(max_bytes=16 * 1024), url(server, "/large.png"))
+    assert result.content is None
+    assert result.error == f"Image exceeds {16 * 1024} bytes"
+
+
+def test_etag_revalidation_uses_cache(server):
+    # TTL 0: la entrada vence enseguida y se revalida con If-None-Match
+    fetcher = local_fetcher(cache=PredictionCache(ttl=0))
+    target = url(server, "/etag.png")
+    first = fetch(fetcher, target)
+    assert first.content == PNG
+    fetcher.cache.put(target, first.etag, "model-a", True, 0.9)
+
+    before = server.revalidations
+    second = fetch(fetcher, target)
+    assert second.content is None
+    assert second.cached is not None and second.cached.has_octagon
+    assert server.revalidations == before + 1
+
+
+def test_non_image_body(server):
+    result = fetch(local_fetcher(), url(server, "/page.html"))
+    assert result.content is None
+    assert result.error.startswith("Not an image: text/html")
+
+
+def test_follows_redirect(server):
+    result = fetch(local_fetcher(), url(server, "/redirect"))
+    assert result.content == PNG
+
+
+def test_redirect_limit(server):
+    result = fetch(local_fetcher(max_redirects=3), url(server, "/loop"))
+    assert result.error == "Too many redirects (max 3)"
+
+
+def test_rejects_loopback_by_default(server):
+    result = fetch(UrlFetcher(allow_private=False, allowed_hosts=[]), url(server, "/image.png"))
+    assert result.content is None
+    assert result.error == "Host resolves to a non-public address: 127.0.0.1"
+
+
+@pytest.mark.parametrize("target", [
+    "http://169.254.169.254/latest/meta-data/",
+    "http://10.0.0.1/image.png",
+    "http://[::1]/image.png",
+    "http://[::ffff:127.0.0.1]/image.png",
+])
+def test_rejects_private_addresses(target):
+    result = fetch(UrlFetcher(allow_private=False, allowed_hosts=[]), target)
+    assert result.error.startswith("Host resolves to a non-public address")
+
+
+def test_every_redirect_hop_is_checked(server):
+    # El primer salto está permitido; el redirect a otro host no
+    fetcher = local_fetcher(allowed_hosts=["127.0.0.1"])
+    result = fetch(fetcher, url(server, "/redirect-localhost"))
+    assert result.content is None
+    assert result.error == "Host not allowed: localhost"
+
+
+def test_unsupported_scheme():
+    result = fetch(UrlFetcher(), "file:///etc/passwd")
+    assert result.error == "Unsupported URL scheme: file"
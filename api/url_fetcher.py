@@ -0,0 +1,250 @@
+"""
+Descarga de imágenes por URL para /predict/urls.
+
+Un único httpx.AsyncClient con pool de conexiones descarga las imágenes en
+paralelo con timeout y tamaño máximo por imagen. Los resultados de la
+predicción se cachean por URL junto con el ETag que devolvió el servidor:
+mientras la entrada está vigente se responde sin ir a la red, y cuando vence
+se revalida con If-None-Match, de modo que un 304 evita tanto la descarga
+como la inferencia.
+
+Las URLs vienen del cliente, así que antes de cada conexión (incluido cada
+salto de un redirect) se resuelve el host y se rechaza si alguna de sus
+direcciones no es pública: loopback, redes privadas, link-local (metadata
+de la nube), reservadas o multicast. La conexión se hace a la IP ya
+validada, para que una segunda resolución DNS no pueda apuntar a otro
+lado. Opcionalmente URL_ALLOWED_HOSTS limita los hosts aceptados (por
+ejemplo al CDN de Disco).
+"""
+import asyncio
+import ipaddress
+import os
+import socket
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+import httpx
+
+FETCH_TIMEOUT = float(os.getenv("URL_FETCH_TIMEOUT", "10"))
+MAX_IMAGE_BYTES = int(os.getenv("URL_MAX_IMAGE_BYTES", str(10 * 1024 * 1024)))
+MAX_CONNECTIONS = int(os.getenv("URL_MAX_CONNECTIONS", "20"))
+CACHE_SIZE = int(os.getenv("URL_CACHE_SIZE", "2048"))
+CACHE_TTL = float(os.getenv("URL_CACHE_TTL", "3600"))
+MAX_REDIRECTS = int(os.getenv("URL_MAX_REDIRECTS", "5"))
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+# Hosts aceptados, separados por coma; ".example.com" acepta también los subdominios
+ALLOWED_HOSTS = [host.strip().lower() for host in os.getenv("URL_ALLOWED_HOSTS", "").split(",") if host.strip()]
+# Sólo para desarrollo y tests: permite descargar de direcciones no públicas
+ALLOW_PRIVATE = os.getenv("URL_ALLOW_PRIVATE", "0") == "1"
+
+
+class FetchError(Exception):
+    """La URL no se pudo descargar o no cumple los límites"""
+
+
+@dataclass
+class CachedPrediction:
+    etag: Optional[str]
+    model_id: str
+    has_octagon: bool
+    confidence: float
+    stored_at: float
+
+
+@dataclass
+class FetchResult:
+    url: str
+    content: Optional[bytes] = None
+    etag: Optional[str] = None
+    cached: Optional[CachedPrediction] = None
+    error: Optional[str] = None
+
+
+class PredictionCache:
+    """LRU de predicciones por URL; cada entrada recuerda el ETag y la versión del modelo"""
+
+    def __init__(self, max_entries: int = CACHE_SIZE, ttl: float = CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, url: str, model_id: str) -> Optional[CachedPrediction]:
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is None or entry.model_id != model_id:
+                return None
+            self._entries.move_to_end(url)
+            return entry
+
+    def is_fresh(self, entry: CachedPrediction) -> bool:
+        return time.monotonic() - entry.stored_at < self.ttl
+
+    def put(self, url: str, etag: Optional[str], model_id: str, has_octagon: bool, confidence: float):
+        with self._lock:
+            self._entries[url] = CachedPrediction(etag, model_id, has_octagon, confidence, time.monotonic())
+            self._entries.move_to_end(url)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def touch(self, url: str):
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None:
+                entry.stored_at = time.monotonic()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def is_public_address(address: str) -> bool:
+    ip = ipaddress.ip_address(address.split("%", 1)[0])
+    if ip.version == 6 and ip.ipv4_mapped is not None:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+def host_allowed(host: str, allowed_hosts) -> bool:
+    host = host.lower().rstrip(".")
+    for allowed in allowed_hosts:
+        if allowed.startswith("."):
+            if host == allowed[1:] or host.endswith(allowed):
+                return True
+        elif host == allowed:
+            return True
+    return False
+
+
+class UrlFetcher:
+    def __init__(self, timeout: float = FETCH_TIMEOUT, max_bytes: int = MAX_IMAGE_BYTES,
+                 max_connections: int = MAX_CONNECTIONS, cache: Optional[PredictionCache] = None,
+                 allowed_hosts=None, allow_private: bool = ALLOW_PRIVATE, max_redirects: int = MAX_REDIRECTS):
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.max_connections = max_connections
+        self.cache = cache if cache is not None else PredictionCache()
+        self.allowed_hosts = list(allowed_hosts) if allowed_hosts is not None else ALLOWED_HOSTS
+        self.allow_private = allow_private
+        self.max_redirects = max_redirects
+        self._client = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Se crea dentro del event loop del servidor, en el primer request
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout),
+                limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections),
+                # Los redirects se siguen a mano para validar cada salto
+                follow_redirects=False,
+                headers={"User-Agent": "octagon-api/1.0"},
+            )
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def fetch_many(self, urls, model_id: str) -> list:
+        return await asyncio.gather(*(self.fetch(url, model_id) for url in urls))
+
+    async def fetch(self, url: str, model_id: str) -> FetchResult:
+        try:
+            scheme = httpx.URL(url).scheme
+        except httpx.InvalidURL:
+            return FetchResult(url, error="Invalid URL")
+        if scheme not in ("http", "https"):
+            return FetchResult(url, error=f"Unsupported URL scheme: {scheme or 'none'}")
+
+        cached = self.cache.get(url, model_id)
+        if cached is not None and self.cache.is_fresh(cached):
+            return FetchResult(url, cached=cached)
+
+        headers = {}
+        if cached is not None and cached.etag:
+            headers["If-None-Match"] = cached.etag
+        try:
+            response = await self._open(url, headers)
+            try:
+                if response.status_code == 304 and cached is not None:
+                    self.cache.touch(url)
+                    return FetchResult(url, cached=cached)
+                if response.status_code != 200:
+                    return FetchResult(url, error=f"HTTP {response.status_code}")
+                content_type = response.headers.get("content-type", "")
+                if content_type and not content_type.startswith("image/"):
+                    return FetchResult(url, error=f"Not an image: {content_type}")
+                declared = response.headers.get("content-length")
+                if declared is not None and declared.isdigit() and int(declared) > self.max_bytes:
+                    return FetchResult(url, error=f"Image exceeds {self.max_bytes} bytes")
+                content = await self._read_limited(response)
+                return FetchResult(url, content=content, etag=response.headers.get("etag"))
+            finally:
+                await response.aclose()
+        except FetchError as e:
+            return FetchResult(url, error=str(e))
+        except httpx.InvalidURL:
+            return FetchResult(url, error="Invalid URL")
+        except httpx.TimeoutException:
+            return FetchResult(url, error="Timed out")
+        except httpx.HTTPError as e:
+            return FetchResult(url, error=f"Fetch failed: {e.__class__.__name__}")
+
+    async def _open(self, url: str, headers: dict) -> httpx.Response:
+        """GET en streaming siguiendo redirects; cada salto pasa por _pinned_request"""
+        for _ in range(self.max_redirects + 1):
+            request = await self._pinned_request(httpx.URL(url), headers)
+            response = await self.client.send(request, stream=True)
+            if response.status_code not in REDIRECT_CODES or "location" not in response.headers:
+                return response
+            await response.aclose()
+            url = str(httpx.URL(url).join(response.headers["location"]))
+        raise FetchError(f"Too many redirects (max {self.max_redirects})")
+
+    async def _pinned_request(self, url: httpx.URL, headers: dict) -> httpx.Request:
+        if url.scheme not in ("http", "https"):
+            raise FetchError(f"Unsupported URL scheme: {url.scheme or 'none'}")
+        host = url.host
+        if not host:
+            raise FetchError("Invalid URL")
+        if self.allowed_hosts and not host_allowed(host, self.allowed_hosts):
+            raise FetchError(f"Host not allowed: {host}")
+        port = url.port or (443 if url.scheme == "https" else 80)
+        try:
+            infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        except socket.gaierror:
+            raise FetchError(f"Could not resolve host: {host}")
+        addresses = [info[4][0] for info in infos]
+        if not addresses:
+            raise FetchError(f"Could not resolve host: {host}")
+        if not self.allow_private and not all(is_public_address(address) for address in addresses):
+            raise FetchError(f"Host resolves to a non-public address: {host}")
+        # Se conecta a la IP validada; Host y SNI siguen siendo los del nombre original
+        return self.client.build_request(
+            "GET", url.copy_with(host=addresses[0].split("%", 1)[0]),
+            headers={**headers, "Host": url.netloc.decode("ascii")},
+            extensions={"sni_hostname": host},
+        )
+
+    async def _read_limited(self, response: httpx.Response) -> bytes:
+        # Content-Length puede faltar o mentir: se corta al pasar el límite
+        chunks = []
+        size = 0
+        async for chunk in response.aiter_bytes():
+            size += len(chunk)
+            if size > self.max_bytes:
+                raise FetchError(f"Image exceeds {self.max_bytes} bytes")
+            chunks.append(chunk)
+        return b"".join(chunks)
+
+
+# Instancia compartida por las rutas; se cierra en el shutdown de la app
+fetcher = UrlFetcher()
@@ -3,7 +3,10 @@ import base64
 import os
 from io import BytesIO
 from PIL import Image
+from dotenv import load_dotenv
 
+# La clave puede venir del .env; no depender de que otro módulo lo haya cargado antes
+load_dotenv()
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
 def clasificar_octogono(image_bytes: BytesIO) -> str:
@@ -1,7 +1,9 @@
 import boto3
+from botocore.config import Config
 from botocore.exceptions import ClientError, NoCredentialsError
 import logging
-from typing import Optional, BinaryIO, List, Dict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Optional, BinaryIO, Iterable, Iterator, List, Dict
 import json
 import io
 import os
@@ -9,6 +11,11 @@ from dotenv import load_dotenv
 
 load_dotenv()  # Load environment variables from .env file
 
+# delete_objects acepta hasta 1000 keys por request
+DELETE_BATCH = 1000
+# copy_object no admite objetos de más de 5GB; esos van por copia multipart
+MAX_COPY_OBJECT_BYTES = 5 * 1024 ** 3
+
 
 class S3Client:
     def __init__(
@@ -17,6 +24,8 @@ class S3Client:
         aws_access_key_id: Optional[str] = None,
         aws_secret_access_key: Optional[str] = None,
         region_name: str = "us-east-1",
+        endpoint_url: Optional[str] = None,
+        max_pool_connections: int = 50,
     ):
         """
         Initialize S3 client.
@@ -26,6 +35,9 @@ class S3Client:
             aws_access_key_id (str, optional): AWS access key ID
             aws_secret_access_key (str, optional): AWS secret access key
             region_name (str): AWS region name
+            endpoint_url (str, optional): S3-compatible endpoint (MinIO, moto server, LocalStack);
+                defaults to the S3_ENDPOINT_URL environment variable, or AWS when unset
+            max_pool_connections (int): HTTP connections shared by the threads of the bulk operations
         """
         self.bucket_name = bucket_name
 
@@ -44,6 +56,9 @@ class S3Client:
         )
         logging.info(f"Using region: {region_name}")
         logging.info(f"Using bucket: {bucket_name}")
+        endpoint_url = endpoint_url or os.getenv("S3_ENDPOINT_URL")
+        if endpoint_url:
+            logging.info(f"Using endpoint: {endpoint_url}")
 
         if not aws_access_key_id or not aws_secret_access_key:
             logging.error(
@@ -52,7 +67,13 @@ class S3Client:
             raise NoCredentialsError()
 
         try:
-            self.s3_client = boto3.client("s3", region_name=region_name)
+            self.s3_client = boto3.client(
+                "s3",
+                region_name=region_name,
+                endpoint_url=endpoint_url,
+                # Reintentos adaptativos: con muchas requests en paralelo S3 responde SlowDown
+                config=Config(max_pool_connections=max_pool_connections, retries={"max_attempts": 10, "mode": "adaptive"}),
+            )
             # Test the connection
             logging.info("Testing S3 connection...")
             self.s3_client.list_objects_v2(Bucket=bucket_name, MaxKeys=1)
@@ -174,28 +195,181 @@ class S3Client:
             bool: True if all objects were deleted successfully, False otherwise
         """
         try:
-            # List all objects in the bucket
-            paginator = self.s3_client.get_paginator("list_objects_v2")
-            pages = paginator.paginate(Bucket=self.bucket_name)
-
-            # Delete all objects
-            for page in pages:
-                if "Contents" in page:
-                    objects_to_delete = [
-                        {"Key": obj["Key"]} for obj in page["Contents"]
-                    ]
-                    if objects_to_delete:
-                        self.s3_client.delete_objects(
-                            Bucket=self.bucket_name,
-                            Delete={"Objects": objects_to_delete},
-                        )
-
+            result = self._delete_all("")
+            if result["failed"]:
+                logging.error(f"Could not delete {result['failed']} objects from bucket {self.bucket_name}")
+                return False
             logging.info(f"Successfully emptied bucket {self.bucket_name}")
             return True
         except ClientError as e:
             logging.error(f"Error emptying bucket {self.bucket_name}: {e}")
             return False
 
+    # Operaciones masivas por prefijo
+
+    def iter_objects(self, prefix: str = "", page_size: int = DELETE_BATCH) -> Iterator[List[Dict]]:
+        """
+        Iterate over the objects under a prefix, one listing page at a time.
+
+        Args:
+            prefix (str): Key prefix to list
+            page_size (int): Objects per page (at most 1000)
+
+        Yields:
+            List[Dict]: Objects of the page ("Key" and "Size")
+        """
+        paginator = self.s3_client.get_paginator("list_objects_v2")
+        pages = paginator.paginate(Bucket=self.bucket_name, Prefix=prefix, PaginationConfig={"PageSize": page_size})
+        for page in pages:
+            objects = [{"Key": obj["Key"], "Size": obj["Size"]} for obj in page.get("Contents", [])]
+            if objects:
+                yield objects
+
+    def delete_prefix(
+        self,
+        prefix: str,
+        dry_run: bool = False,
+        workers: int = 8,
+        progress: Optional[Callable[[Dict], None]] = None,
+    ) -> Dict:
+        """
+        Delete every object under a prefix with parallel 1000-key delete_objects requests.
+
+        Args:
+            prefix (str): Key prefix to delete; must not be empty (use empty_bucket for that)
+            dry_run (bool): Only list and count what would be deleted
+            workers (int): Concurrent delete requests
+            progress (Callable, optional): Called with the running counters after each batch
+
+        Returns:
+            Dict: Counters (listed, done, failed, bytes) and up to 100 errors
+        """
+        if not prefix:
+            raise ValueError("delete_prefix needs a non-empty prefix; use empty_bucket to delete everything")
+        return self._delete_all(prefix, dry_run, workers, progress)
+
+    def copy_prefix(
+        self,
+        source_prefix: str,
+        dest_prefix: str,
+        dry_run: bool = False,
+        workers: int = 32,
+        progress: Optional[Callable[[Dict], None]] = None,
+        move: bool = False,
+        batch_size: int = 100,
+    ) -> Dict:
+        """
+        Server-side copy of every object under source_prefix to dest_prefix,
+        keeping the rest of the key. With move=True each batch of copied
+        objects is then deleted from the source with a single delete_objects.
+
+        Args:
+            source_prefix (str): Prefix to copy from
+            dest_prefix (str): Prefix that replaces source_prefix in the new keys
+            dry_run (bool): Only list and count what would be copied
+            workers (int): Concurrent copy tasks
+            progress (Callable, optional): Called with the running counters after each batch
+            move (bool): Delete the source objects once copied
+            batch_size (int): Objects per copy task
+
+        Returns:
+            Dict: Counters (listed, done, failed, bytes) and up to 100 errors
+        """
+        if not source_prefix:
+            raise ValueError("copy_prefix needs a non-empty source prefix")
+        if source_prefix == dest_prefix:
+            raise ValueError("Source and destination prefixes are the same")
+        if dest_prefix.startswith(source_prefix):
+            # Las copias nuevas aparecerían en el mismo listado que se está recorriendo
+            raise ValueError("The destination prefix cannot be inside the source prefix")
+
+        def copy_batch(objects):
+            copied, errors = [], []
+            for obj in objects:
+                dest_key = dest_prefix + obj["Key"][len(source_prefix):]
+                source = {"Bucket": self.bucket_name, "Key": obj["Key"]}
+                try:
+                    if obj["Size"] > MAX_COPY_OBJECT_BYTES:
+                        self.s3_client.copy(source, self.bucket_name, dest_key)
+                    else:
+                        self.s3_client.copy_object(CopySource=source, Bucket=self.bucket_name, Key=dest_key)
+                    copied.append(obj)
+                except ClientError as e:
+                    errors.append({"Key": obj["Key"], "Code": e.response["Error"]["Code"], "Message": str(e)})
+            if move and copied:
+                # Sólo se borran de origen los que se copiaron bien
+                deleted, delete_errors = self._delete_batch(copied)
+                errors.extend(delete_errors)
+                copied = deleted
+            return copied, errors
+
+        batches = self._split(self.iter_objects(source_prefix), batch_size)
+        return self._run_batches(batches, copy_batch, workers, progress, dry_run)
+
+    def move_prefix(self, source_prefix: str, dest_prefix: str, **kwargs) -> Dict:
+        """Server-side move (copy and delete) of every object under source_prefix; see copy_prefix"""
+        return self.copy_prefix(source_prefix, dest_prefix, move=True, **kwargs)
+
+    def _delete_all(self, prefix: str, dry_run: bool = False, workers: int = 8, progress=None) -> Dict:
+        return self._run_batches(self.iter_objects(prefix), self._delete_batch, workers, progress, dry_run)
+
+    def _delete_batch(self, objects: List[Dict]):
+        """Deletes up to 1000 objects in one request; returns (deleted objects, errors)"""
+        try:
+            response = self.s3_client.delete_objects(
+                Bucket=self.bucket_name,
+                Delete={"Objects": [{"Key": obj["Key"]} for obj in objects], "Quiet": True},
+            )
+        except ClientError as e:
+            code = e.response["Error"]["Code"]
+            return [], [{"Key": obj["Key"], "Code": code, "Message": str(e)} for obj in objects]
+        errors = response.get("Errors", [])
+        failed = {error["Key"] for error in errors}
+        return [obj for obj in objects if obj["Key"] not in failed], errors
+
+    @staticmethod
+    def _split(pages: Iterable[List[Dict]], size: int) -> Iterator[List[Dict]]:
+        for page in pages:
+            for i in range(0, len(page), size):
+                yield page[i:i + size]
+
+    @staticmethod
+    def _run_batches(batches, fn, workers, progress, dry_run) -> Dict:
+        """
+        Runs fn over each batch in a thread pool while the listing continues.
+        At most 2 * workers batches are pending, so memory stays bounded
+        regardless of the number of objects under the prefix.
+        """
+        stats = {"listed": 0, "done": 0, "failed": 0, "bytes": 0, "errors": []}
+
+        def collect(finished):
+            for future in finished:
+                done, errors = future.result()
+                stats["done"] += len(done)
+                stats["bytes"] += sum(obj["Size"] for obj in done)
+                stats["failed"] += len(errors)
+                stats["errors"].extend(errors[:100 - len(stats["errors"])])
+            if progress is not None:
+                progress(stats)
+
+        if dry_run:
+            for batch in batches:
+                stats["listed"] += len(batch)
+                stats["bytes"] += sum(obj["Size"] for obj in batch)
+                if progress is not None:
+                    progress(stats)
+            return stats
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            pending = set()
+            for batch in batches:
+                stats["listed"] += len(batch)
+                pending.add(pool.submit(fn, batch))
+                if len(pending) >= 2 * workers:
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(finished)
+            collect(wait(pending)[0])
+        return stats
 
     def list_files(self, prefix: str = "") -> List[str]:    
         """
@@ -208,17 +382,18 @@ class S3Client:
             List[str]: List of file keys in the bucket
         """
         try:
-            response = self.s3_client.list_objects_v2(Bucket=self.bucket_name, Prefix=prefix)
-            if "Contents" in response:
-                return [obj["Key"] for obj in response["Contents"]]
-            else:
-                return []
+            # list_objects_v2 returns at most 1000 keys per call
+            paginator = self.s3_client.get_paginator("list_objects_v2")
+            keys = []
+            for page in paginator.paginate(Bucket=self.bucket_name, Prefix=prefix):
+                keys.extend(obj["Key"] for obj in page.get("Contents", []))
+            return keys
         except ClientError as e:
             logging.error(f"Error listing files in bucket {self.bucket_name}: {e}")
             return [] 
         
     def list_folders(self, prefix):
-        response = self.s3.list_objects_v2(Bucket=self.bucket, Prefix=prefix, Delimiter='/')
+        response = self.s3_client.list_objects_v2(Bucket=self.bucket_name, Prefix=prefix, Delimiter='/')
         return [cp['Prefix'].split('/')[-2] for cp in response.get('CommonPrefixes', [])]
 
     def list_image_files(self, prefix):
@@ -1,25 +1,27 @@
-from connectors.s3_client import S3Client
-from connectors.openai_client import clasificar_octogono
 from settings.settings import load_settings
 from settings.logger import custom_logger
-from utils.io_utils import guardar_csv
-from scrapers import disco
 import argparse
-import os
-import boto3
 
-from scrapers.disco import ProductScraper
+# Las dependencias pesadas de cada etapa (playwright, openai, PIL, boto3)
+# se importan dentro de la función que las usa, para que p. ej. --upload
+# no pague el import del scraper ni del tagger
 
 
 
 logger = custom_logger("Pipeline")
 
 def run_scraper():
+    from scrapers.disco import ProductScraper
+
     # ProductScraper SIEMPRE toma el bucket y región del archivo de configuración
     scraper = ProductScraper()
     scraper.run()
 
-def run_tagger(bucket_name, region_name, prefix, output_file):
+def run_tagger(bucket_name, region_name, prefix, output_file, dataset_dir=None):
+    from connectors.s3_client import S3Client
+    from connectors.openai_client import clasificar_octogono
+    from utils.io_utils import guardar_csv
+
     # S3Client personalizado para listar y descargar imágenes desde S3
     s3 = S3Client(bucket_name=bucket_name, region_name=region_name)
     claves = s3.list_files(prefix=prefix)
@@ -35,10 +37,16 @@ def run_tagger(bucket_name, region_name, prefix, output_file):
             logger.error(f"❌ Error procesando {key}: {e}")
 
     guardar_csv(resultados, output_file)
+    if dataset_dir:
+        from utils.dataset_store import DatasetStore
+
+        DatasetStore(dataset_dir).append_labels(resultados)
     logger.info(f"\n✅ Proceso terminado. Resultados guardados en {output_file}")
     return output_file
 
 def subir_resultados_s3(bucket_name, region_name, output_file, s3_path):
+    import boto3
+
     # Usamos boto3 directo para subir cualquier archivo (CSV, JSON, etc)
     s3 = boto3.client('s3', region_name=region_name)
     s3.upload_file(output_file, bucket_name, s3_path)
@@ -53,6 +61,12 @@ def main():
     parser.add_argument('--region', type=str, default=None, help='Región de S3')
     parser.add_argument('--prefix', type=str, default="s3-obligatorio-mldata/scraped_data/images/", help='Prefijo de imágenes en S3')
     parser.add_argument('--output', type=str, default="etiquetas_octogonos.csv", help='Archivo local para guardar etiquetas')
+    parser.add_argument('--stream', action='store_true', help='Scraping, subida y tagging como etapas concurrentes (reemplaza --scrape y --tag)')
+    parser.add_argument('--queue_size', type=int, default=32, help='Capacidad de las colas entre etapas en modo --stream')
+    parser.add_argument('--download_workers', type=int, default=8, help='Threads de descarga de imágenes en modo --stream')
+    parser.add_argument('--store_workers', type=int, default=4, help='Threads de subida a almacenamiento en modo --stream')
+    parser.add_argument('--tag_workers', type=int, default=4, help='Threads de tagging en modo --stream')
+    parser.add_argument('--dataset_dir', type=str, default=None, help='Directorio del dataset Parquet donde agregar productos y etiquetas')
     parser.add_argument('--s3_output', type=str, default="scraped_data/results/etiquetas_octogonos.csv", help='Ruta destino en S3 para el CSV')
     args = parser.parse_args()
 
@@ -65,15 +79,29 @@ def main():
     # Mostramos config real utilizada
     logger.info(f"Usando bucket: {args.bucket} | Región: {args.region}")
 
-    if args.scrape:
-        logger.info("[INFO] Ejecutando scraping...")
-        run_scraper()
-
-    if args.tag:
-        logger.info("[INFO] Ejecutando tagging...")
-        output_file = run_tagger(args.bucket, args.region, args.prefix, args.output)
+    output_file = args.output
+
+    if args.stream:
+        from streaming import run_streaming
+
+        # Las imágenes pasan en memoria del scraper al tagger, sin releerlas de S3
+        logger.info("[INFO] Ejecutando scraping, subida y tagging por etapas...")
+        output_file, _ = run_streaming(
+            args.output,
+            download_workers=args.download_workers,
+            store_workers=args.store_workers,
+            tag_workers=args.tag_workers,
+            queue_size=args.queue_size,
+            dataset_dir=args.dataset_dir,
+        )
     else:
-        output_file = args.output
+        if args.scrape:
+            logger.info("[INFO] Ejecutando scraping...")
+            run_scraper()
+
+        if args.tag:
+            logger.info("[INFO] Ejecutando tagging...")
+            output_file = run_tagger(args.bucket, args.region, args.prefix, args.output, args.dataset_dir)
 
     if args.upload:
         logger.info("[INFO] Subiendo resultados a S3...")
@@ -38,6 +38,14 @@ class ProductScraper:
         self.max_products = config["MaxProducts"]
 
     def run(self) -> None:
+        for product in self.iter_products():
+            self._save_product(product)
+
+    def iter_products(self):
+        """
+        Yields the scraped products (up to MaxProducts) while the browser is
+        still open, so callers can process them as they are produced.
+        """
         self.logger.info("Starting product scraper")
         with sync_playwright() as p:
             browser = p.chromium.launch(headless=True)
@@ -51,9 +59,11 @@ class ProductScraper:
 
             products = self._get_products(page)
             self.logger.info(f"Found {len(products)} products")
-            for product in products[:self.max_products]:
-                self._save_product(product)
-            browser.close()
+            try:
+                for product in products[:self.max_products]:
+                    yield product
+            finally:
+                browser.close()
         self.logger.info("Finished scraping products")
 
     def _get_products(self, page):
@@ -100,36 +110,33 @@ class ProductScraper:
                 self.logger.error(f"Error parsing product: {e}")
         return products
 
-    def _save_product(self, product: Product) -> None:
-        product_img_dir = os.path.join("data", "scraped_data", "images", product.id)
-        os.makedirs(product_img_dir, exist_ok=True)
+    def image_key(self, product: Product, img_url: str):
+        """Storage key and extension for one of the product's images"""
+        img_filename = img_url.split("/")[-1].split("?")[0]
+        _, ext = os.path.splitext(img_filename)
+        if ext.lower() not in VALID_IMAGE_EXTENSIONS:
+            ext = ".jpg"
+            img_filename = f"{product.id}{ext}"
+        return os.path.join("data", "scraped_data", "images", product.id, img_filename), ext
 
-        for img_url in product.images:
-            if img_url:
-                img_filename = img_url.split("/")[-1].split("?")[0]
-                _, ext = os.path.splitext(img_filename)
-                if ext.lower() not in VALID_IMAGE_EXTENSIONS:
-                    ext = ".jpg"
-                    img_filename = f"{product.id}{ext}"
-                img_path = os.path.join("data", "scraped_data", "images", product.id, img_filename)
+    def download_image(self, img_url: str, session=None) -> bytes:
+        return (session or requests).get(img_url).content
 
-                try:
-                    img_data = requests.get(img_url).content
-                    if self.storage_type == StorageType.S3:
-                        img_file = io.BytesIO(img_data)
-                        self.logger.info(f"Subiendo imagen con key: {img_path}")
-                        self.s3_client.upload_image(
-                            file_obj=img_file,
-                            key=img_path,
-                            content_type="image/jpeg" if ext.lower() in [".jpg", ".jpeg"] else "image/png"
-                        )
-                    else:
-                        with open(img_path, "wb") as f:
-                            f.write(img_data)
-                        self.logger.info(f"Imagen guardada en {img_path}")
-                except Exception as e:
-                    self.logger.error(f"Failed to download image {img_url}: {str(e)}")
+    def store_image(self, img_path: str, img_data: bytes, ext: str) -> None:
+        if self.storage_type == StorageType.S3:
+            self.logger.info(f"Subiendo imagen con key: {img_path}")
+            self.s3_client.upload_image(
+                file_obj=io.BytesIO(img_data),
+                key=img_path,
+                content_type="image/jpeg" if ext.lower() in [".jpg", ".jpeg"] else "image/png"
+            )
+        else:
+            os.makedirs(os.path.dirname(img_path), exist_ok=True)
+            with open(img_path, "wb") as f:
+                f.write(img_data)
+            self.logger.info(f"Imagen guardada en {img_path}")
 
+    def store_product(self, product: Product) -> None:
         jsonl_path = os.path.join("data", "scraped_data", "products", f"{product.id}.jsonl")
 
         if self.storage_type == StorageType.S3:
@@ -141,4 +148,16 @@ class ProductScraper:
                     f.write(json.dumps(product.dict(), ensure_ascii=False) + "\n")
                 self.logger.info(f"Saved product {product.id}")
             except Exception as e:
-                self.logger.error(f"Failed to save product {product.id}: {str(e)}")
\ No newline at end of file
+                self.logger.error(f"Failed to save product {product.id}: {str(e)}")
+
+    def _save_product(self, product: Product) -> None:
+        for img_url in product.images:
+            if img_url:
+                img_path, ext = self.image_key(product, img_url)
+                try:
+                    img_data = self.download_image(img_url)
+                    self.store_image(img_path, img_data, ext)
+                except Exception as e:
+                    self.logger.error(f"Failed to download image {img_url}: {str(e)}")
+
+        self.store_product(product)
@@ -0,0 +1,93 @@
+"""
+Benchmark of the logger modes on a hot loop that logs once per item, like
+the scraper and the tagger do ("Procesando imagen", "Subiendo imagen con key").
+
+Each mode runs in its own process (logging configuration is global) inside
+a temporary directory, so data/logs does not get polluted. Reports the time
+spent in the loop, which is what the pipeline pays, and the time until the
+queue is drained and the file flushed.
+
+Usage (from scrapper_y_tag/):
+    python src/scripts/benchmark_logging.py --items 10000
+    python src/scripts/benchmark_logging.py --items 10000 --console   # console output to the terminal
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODES = {
+    "sync": {"LOG_MODE": "sync"},
+    "queue": {"LOG_MODE": "queue"},
+    "queue+json": {"LOG_MODE": "queue", "LOG_JSON": "1"},
+    "queue+ratelimit": {"LOG_MODE": "queue", "LOG_RATE_LIMIT": "50"},
+}
+
+
+def run_child(items: int, work_us: int) -> dict:
+    sys.path.insert(0, SRC_DIR)
+    from settings.logger import custom_logger, stop_logging
+
+    logger = custom_logger("Benchmark")
+    start = time.perf_counter()
+    for i in range(items):
+        logger.info(f"Procesando imagen: data/scraped_data/images/{i}/{i}.jpg")
+        # Trabajo simulado por item
+        deadline = time.perf_counter() + work_us / 1e6
+        while time.perf_counter() < deadline:
+            pass
+    loop_seconds = time.perf_counter() - start
+    stop_logging()
+    for handler in logger.handlers:
+        handler.flush()
+    total_seconds = time.perf_counter() - start
+    return {"loop_seconds": loop_seconds, "total_seconds": total_seconds}
+
+
+def run_mode(name: str, items: int, work_us: int, console: bool) -> dict:
+    env = {k: v for k, v in os.environ.items() if not k.startswith("LOG_")}
+    env.update(MODES[name])
+    with tempfile.TemporaryDirectory() as workdir:
+        result = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", "--items", str(items), "--work-us", str(work_us)],
+            cwd=workdir,
+            env=env,
+            stdout=subprocess.PIPE,
+            stderr=None if console else subprocess.DEVNULL,
+            check=True,
+            text=True,
+        )
+    stats = json.loads(result.stdout.strip().splitlines()[-1])
+    stats["mode"] = name
+    stats["us_per_item"] = stats["loop_seconds"] / items * 1e6 - work_us
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de los modos de logging")
+    parser.add_argument("--items", type=int, default=10000)
+    parser.add_argument("--work-us", type=int, default=0, help="Trabajo simulado por item en microsegundos")
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=list(MODES))
+    parser.add_argument("--console", action="store_true", help="No descartar la salida de consola")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child(args.items, args.work_us)))
+        return
+
+    results = [run_mode(mode, args.items, args.work_us, args.console) for mode in args.modes]
+    baseline = results[0]["loop_seconds"] if results[0]["mode"] == "sync" else None
+    print(f"{'mode':<18}{'loop s':>10}{'total s':>10}{'us/item':>10}{'speedup':>10}")
+    for r in results:
+        speedup = f"{baseline / r['loop_seconds']:.2f}x" if baseline else "-"
+        print(f"{r['mode']:<18}{r['loop_seconds']:>10.3f}{r['total_seconds']:>10.3f}{r['us_per_item']:>10.1f}{speedup:>10}")
+
+
+if __name__ == "__main__":
+    main()
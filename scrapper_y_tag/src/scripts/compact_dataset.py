@@ -0,0 +1,30 @@
+import argparse
+import os
+import sys
+
+sys.path.append(os.getcwd())
+sys.path.append(os.path.join(os.getcwd(), "src"))
+
+from settings import custom_logger
+from utils.dataset_store import DatasetStore
+
+
+def main():
+    logger = custom_logger("compact_dataset")
+
+    parser = argparse.ArgumentParser(description="Compacta productos y etiquetas en un dataset Parquet particionado")
+    parser.add_argument("--dataset_dir", type=str, default="data/dataset", help="Directorio del dataset Parquet")
+    parser.add_argument("--products_dir", type=str, default=None, help="Directorio con los <id>.jsonl de productos a importar")
+    parser.add_argument("--labels_csv", type=str, default=None, help="CSV de etiquetas (image,label) a importar")
+    args = parser.parse_args()
+
+    store = DatasetStore(args.dataset_dir)
+    if args.products_dir or args.labels_csv:
+        kept = store.import_legacy(args.products_dir, args.labels_csv)
+    else:
+        kept = store.compact()
+    logger.info(f"Dataset compactado en {args.dataset_dir}: {kept['products']} productos, {kept['labels']} etiquetas")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Startup import cost of pipeline.py per subcommand, measured with
+`python -X importtime` in a fresh interpreter for each case.
+
+Each subcommand imports pipeline plus the modules its stage loads lazily.
+The "eager" row reproduces the previous entry point, which imported every
+stage at module load.
+
+Usage (from scrapper_y_tag/):
+    python src/scripts/import_time_report.py
+    python src/scripts/import_time_report.py --top 10
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SUBCOMMANDS = {
+    "--upload": ["pipeline", "boto3"],
+    "--tag": ["pipeline", "connectors.s3_client", "connectors.openai_client", "utils.io_utils"],
+    "--scrape": ["pipeline", "scrapers.disco"],
+    "--stream": ["pipeline", "streaming"],
+    "eager (antes)": [
+        "connectors.s3_client", "connectors.openai_client", "settings.settings", "settings.logger",
+        "utils.io_utils", "scrapers.disco", "boto3", "pipeline",
+    ],
+}
+EAGER = "eager (antes)"
+
+# Dependencias de otras etapas que cada subcomando no debe importar.
+# --stream corre todas las etapas, así que carga todo
+SKIPPED_DEPENDENCIES = {
+    "--upload": ["playwright", "openai"],
+    "--tag": ["playwright"],
+    "--scrape": ["openai"],
+    "--stream": [],
+}
+
+
+def measure(modules, cwd=None):
+    """
+    Returns (total_us, [(cumulative_us, module)], packages) for the top-level
+    imports triggered by importing `modules`, where packages holds the
+    top-level package of every module imported at any depth. Raises
+    RuntimeError if an import fails. The interpreter runs in cwd (scrapper_y_tag/
+    by default), where the logger creates data/logs.
+    """
+    code = "; ".join(f"import {m}" for m in modules)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=cwd or os.path.dirname(SRC_DIR),
+        env={**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [SRC_DIR, os.getenv("PYTHONPATH")]))},
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    top_level = []
+    packages = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        packages.add(name.strip().split(".")[0])
+        # Los imports anidados vienen indentados; solo sumamos los de primer nivel
+        if not name.startswith("  "):
+            top_level.append((int(cumulative), name.strip()))
+    return sum(us for us, _ in top_level), sorted(top_level, reverse=True), packages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiempo de import de pipeline.py por subcomando")
+    parser.add_argument("--top", type=int, default=5, help="Módulos más pesados a listar por subcomando")
+    args = parser.parse_args()
+
+    totals = {}
+    for name, modules in SUBCOMMANDS.items():
+        try:
+            total, heaviest, _ = measure(modules)
+        except RuntimeError as e:
+            print(f"{name:<16} error: {e}")
+            continue
+        totals[name] = total
+        print(f"{name:<16} {total / 1000:>9.1f} ms")
+        for us, module in heaviest[:args.top]:
+            print(f"{'':<18}{us / 1000:>8.1f} ms  {module}")
+
+    eager = totals.get(EAGER)
+    if eager:
+        print()
+        for name, total in totals.items():
+            if name != EAGER:
+                print(f"{name:<16} {eager / total:.1f}x más rápido que el import eager ({(eager - total) / 1000:.0f} ms menos)")
+
+
+if __name__ == "__main__":
+    main()
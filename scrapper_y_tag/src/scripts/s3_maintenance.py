@@ -0,0 +1,100 @@
+"""
+Bulk maintenance of the bucket by prefix: delete, server-side copy and move.
+
+Objects are listed page by page and processed in parallel batches while
+the listing continues (delete_objects with 1000 keys per request, copy_object
+per key), with periodic progress in the log. --dry_run only lists and
+counts what would be touched.
+
+Usage (from scrapper_y_tag/):
+    python src/scripts/s3_maintenance.py delete --prefix data/tmp/ --dry_run
+    python src/scripts/s3_maintenance.py move --prefix images/ --dest data/scraped_data/images/ --workers 64
+    S3_ENDPOINT_URL=http://localhost:5000 python src/scripts/s3_maintenance.py copy --bucket test --prefix a/ --dest b/
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.getcwd())
+sys.path.append(os.path.join(os.getcwd(), "src"))
+
+from settings import load_settings, custom_logger
+from connectors.s3_client import S3Client
+
+
+class ProgressLog:
+    """Logs the running counters at most once every `every` seconds"""
+
+    def __init__(self, logger, action: str, every: float = 5.0):
+        self.logger = logger
+        self.action = action
+        self.every = every
+        self.start = time.monotonic()
+        self.last = 0.0
+
+    def __call__(self, stats, final: bool = False):
+        now = time.monotonic()
+        if not final and now - self.last < self.every:
+            return
+        self.last = now
+        elapsed = max(now - self.start, 1e-9)
+        self.logger.info(
+            f"{self.action}: listed {stats['listed']} | done {stats['done']} | failed {stats['failed']} "
+            f"| {stats['done'] / elapsed:.0f} obj/s | {elapsed:.0f}s"
+        )
+
+
+def main():
+    logger = custom_logger("s3_maintenance")
+
+    parser = argparse.ArgumentParser(description="Operaciones masivas por prefijo sobre el bucket de S3")
+    parser.add_argument("action", choices=["delete", "copy", "move"])
+    parser.add_argument("--prefix", type=str, required=True, help="Prefijo de origen (p. ej. images/)")
+    parser.add_argument("--dest", type=str, default=None, help="Prefijo de destino para copy y move")
+    parser.add_argument("--bucket", type=str, default=None, help="Bucket (por defecto el de config.yml)")
+    parser.add_argument("--endpoint_url", type=str, default=None, help="Endpoint S3 compatible (MinIO, moto server)")
+    parser.add_argument("--workers", type=int, default=None, help="Requests en paralelo (delete: 8, copy/move: 32)")
+    parser.add_argument("--dry_run", action="store_true", help="Solo listar y contar")
+    args = parser.parse_args()
+
+    if args.action != "delete" and args.dest is None:
+        parser.error(f"{args.action} requiere --dest")
+    if not args.prefix.endswith("/"):
+        logger.warning(f"El prefijo '{args.prefix}' no termina en '/': también incluye claves como '{args.prefix}x...'")
+
+    storage_config = load_settings("Storage")
+    bucket = args.bucket or storage_config["S3"]["Bucket"]
+    workers = args.workers or (8 if args.action == "delete" else 32)
+    s3_client = S3Client(
+        bucket_name=bucket,
+        region_name=storage_config["S3"]["Region"],
+        endpoint_url=args.endpoint_url,
+        max_pool_connections=max(50, workers),
+    )
+
+    target = f"s3://{bucket}/{args.prefix}" + (f" -> s3://{bucket}/{args.dest}" if args.dest is not None else "")
+    action = f"{args.action}{' (dry run)' if args.dry_run else ''}"
+    logger.info(f"{action} {target} con {workers} workers")
+    progress = ProgressLog(logger, action)
+
+    if args.action == "delete":
+        stats = s3_client.delete_prefix(args.prefix, dry_run=args.dry_run, workers=workers, progress=progress)
+    else:
+        stats = s3_client.copy_prefix(
+            args.prefix, args.dest, dry_run=args.dry_run, workers=workers, progress=progress,
+            move=args.action == "move",
+        )
+
+    progress(stats, final=True)
+    for error in stats["errors"][:10]:
+        logger.error(f"{error['Key']}: {error.get('Code')} {error.get('Message', '')}")
+    if args.dry_run:
+        logger.info(f"Dry run: {stats['listed']} objetos ({stats['bytes'] / 1024 ** 2:.1f} MB) bajo {args.prefix}")
+    elif stats["failed"]:
+        logger.error(f"{stats['failed']} objetos fallaron; volver a correr el comando retoma los pendientes")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,157 @@
-from datetime import datetime
-from logging import Logger, Formatter, StreamHandler, FileHandler, DEBUG
+from datetime import datetime, timezone
+from logging import Logger, Formatter, StreamHandler, FileHandler, Filter, LogRecord, DEBUG, ERROR, WARNING
 from logging import getLogger
+from logging.handlers import MemoryHandler, QueueHandler, QueueListener
+import atexit
+import json
 import os
+import queue
+import threading
+import time
 
+LOG_FORMAT = "%(asctime)s.%(msecs)03d - %(name)s%(levelname)s: %(message)s"
+LOG_DATEFMT = "%m/%d/%Y %I:%M:%S"
 
-def custom_logger(logger_name: str) -> Logger:
+# Shared by every logger in queue mode: a single background thread does all the I/O
+_listener = None
+_log_queue = None
+_listener_lock = threading.Lock()
+
+
+class JsonFormatter(Formatter):
+    """Formats each record as a single JSON line"""
+
+    def format(self, record: LogRecord) -> str:
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "logger": record.name.rstrip(" -"),
+            "level": record.levelname,
+            "message": record.getMessage(),
+            "thread": record.threadName,
+        }
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False)
+
+
+class RateLimitFilter(Filter):
+    """
+    Lets through at most `rate` records per second from each call site
+    (file and line), so per-item messages inside hot loops cannot flood the
+    handlers. Warnings and errors are never dropped. When a call site starts
+    logging again after being limited, the first record notes how many
+    were suppressed.
+
+    Args:
+        rate (float): Records per second allowed per call site.
+        burst (int): Records allowed at once before limiting kicks in.
+    """
+
+    def __init__(self, rate: float = 10.0, burst: int = 20):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: LogRecord) -> bool:
+        if record.levelno >= WARNING:
+            return True
+        site = (record.name, record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            tokens, last, suppressed = self._buckets.get(site, (self.burst, now, 0))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            if tokens < 1:
+                self._buckets[site] = (tokens, now, suppressed + 1)
+                return False
+            self._buckets[site] = (tokens - 1, now, 0)
+        if suppressed:
+            record.msg = f"{record.msg} ({suppressed} similar messages suppressed)"
+        return True
+
+
+class _EnqueueHandler(QueueHandler):
+    """
+    QueueHandler that only merges the message arguments in the calling
+    thread; the default prepare() also formats and copies every record.
+    """
+
+    def prepare(self, record: LogRecord) -> LogRecord:
+        if record.exc_info or record.stack_info:
+            return super().prepare(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def _formatter(json_output: bool) -> Formatter:
+    if json_output:
+        return JsonFormatter()
+    return Formatter(LOG_FORMAT, datefmt=LOG_DATEFMT)
+
+
+def _start_listener(json_output: bool, buffer_size: int) -> queue.Queue:
+    global _listener, _log_queue
+    with _listener_lock:
+        if _listener is None:
+            console_handler = StreamHandler()
+            console_handler.setLevel(DEBUG)
+            console_handler.setFormatter(_formatter(json_output))
+
+            # Writes are batched: flushed every buffer_size records, on ERROR, and at exit
+            log_file = f"data/logs/{datetime.now().strftime('%Y-%m-%d')}.log"
+            file_handler = FileHandler(log_file)
+            file_handler.setLevel(DEBUG)
+            file_handler.setFormatter(_formatter(json_output))
+            buffered_file_handler = MemoryHandler(buffer_size, flushLevel=ERROR, target=file_handler)
+
+            _log_queue = queue.SimpleQueue()
+            _listener = QueueListener(_log_queue, console_handler, buffered_file_handler, respect_handler_level=True)
+            _listener.start()
+            atexit.register(stop_logging)
+    return _log_queue
+
+
+def stop_logging() -> None:
+    """
+    Drains the log queue and flushes the buffered handlers of queue mode.
+    Registered at exit; call it explicitly before os._exit or in benchmarks.
+    """
+    global _listener, _log_queue
+    with _listener_lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.flush()
+            handler.close()
+        _listener = None
+        _log_queue = None
+
+
+def custom_logger(logger_name: str, mode: str | None = None, json_output: bool | None = None,
+                  rate_limit: float | None = None) -> Logger:
     """
     Function for returning a Logger object with specified settings
 
     Args:
         logger_name (str): The name of the logger
+        mode (str | None): "sync" writes to console and file from the calling
+            thread; "queue" only enqueues the record and a background listener
+            thread does the (buffered) I/O. Defaults to the LOG_MODE env var, or "sync".
+        json_output (bool | None): Emit one JSON object per line. Defaults to LOG_JSON=1.
+        rate_limit (float | None): Max records per second per call site below
+            WARNING. Defaults to LOG_RATE_LIMIT; unset or 0 disables it.
 
     Returns:
         Logger: A Logger object with specified settings
     """
+    mode = mode or os.getenv("LOG_MODE", "sync")
+    if json_output is None:
+        json_output = os.getenv("LOG_JSON", "0") == "1"
+    if rate_limit is None:
+        rate_limit = float(os.getenv("LOG_RATE_LIMIT", "0"))
 
     # Create logs directory if it doesn't exist
     os.makedirs("data/logs", exist_ok=True)
@@ -22,28 +160,29 @@ def custom_logger(logger_name: str) -> Logger:
     logger.setLevel(DEBUG)
 
     if not logger.hasHandlers():
-        # Console handler (existing)
-        console_handler = StreamHandler()
-        console_handler.setLevel(DEBUG)
-        console_formatter = Formatter(
-            "%(asctime)s.%(msecs)03d - %(name)s%(levelname)s: %(message)s",
-            datefmt="%m/%d/%Y %I:%M:%S",
-        )
-        console_handler.setFormatter(console_formatter)
-
-        # File handler (new)
-        log_file = f"data/logs/{datetime.now().strftime('%Y-%m-%d')}.log"
-        file_handler = FileHandler(log_file)
-        file_handler.setLevel(DEBUG)
-        file_formatter = Formatter(
-            "%(asctime)s.%(msecs)03d - %(name)s%(levelname)s: %(message)s",
-            datefmt="%m/%d/%Y %I:%M:%S",
-        )
-        file_handler.setFormatter(file_formatter)
-
-        # Add both handlers
-        logger.addHandler(console_handler)
-        logger.addHandler(file_handler)
+        if mode == "queue":
+            queue_handler = _EnqueueHandler(_start_listener(json_output, int(os.getenv("LOG_BUFFER_SIZE", "512"))))
+            queue_handler.setLevel(DEBUG)
+            logger.addHandler(queue_handler)
+        else:
+            # Console handler (existing)
+            console_handler = StreamHandler()
+            console_handler.setLevel(DEBUG)
+            console_handler.setFormatter(_formatter(json_output))
+
+            # File handler (new)
+            log_file = f"data/logs/{datetime.now().strftime('%Y-%m-%d')}.log"
+            file_handler = FileHandler(log_file)
+            file_handler.setLevel(DEBUG)
+            file_handler.setFormatter(_formatter(json_output))
+
+            # Add both handlers
+            logger.addHandler(console_handler)
+            logger.addHandler(file_handler)
+
+        if rate_limit:
+            # Logger-level filter: dropped records never reach a handler or the queue
+            logger.addFilter(RateLimitFilter(rate_limit))
 
     logger.propagate = False
     return logger
@@ -1,12 +1,24 @@
+from copy import deepcopy
+from functools import lru_cache
 from typing import Optional, Any, Dict
+import os
 
 from yaml import load
 from yaml.loader import SafeLoader
 
+CONFIG_PATH = "src/settings/config.yml"
+
+
+@lru_cache(maxsize=None)
+def _read_config(path: str) -> dict[str, Any]:
+    with open(path, "r") as f:
+        return load(f, Loader=SafeLoader)
+
 
 def load_settings(key: str | None = None) -> dict[str, Any]:
     """
-    Loads the settings from the config.yml file.
+    Loads the settings from the config.yml file. The file is parsed once per
+    process; each call returns its own copy, so callers can modify it freely.
 
     Args:
         key (str | None): Optional key to get a specific value.
@@ -15,11 +27,10 @@ def load_settings(key: str | None = None) -> dict[str, Any]:
         dict[str, Any]: The settings.
     """
 
-    with open("src/settings/config.yml", "r") as f:
-        config = load(f, Loader=SafeLoader)
+    config = _read_config(os.path.abspath(CONFIG_PATH))
 
     if key:
-        return config[key]
+        return deepcopy(config[key])
 
-    return config
+    return deepcopy(config)
 
@@ -0,0 +1,261 @@
+import io
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Tuple
+
+import requests
+
+from connectors.openai_client import clasificar_octogono
+from scrapers.disco import ProductScraper
+from settings.logger import custom_logger
+from structs.product import Product
+from utils.io_utils import guardar_csv
+
+logger = custom_logger("StreamingPipeline")
+
+# Marca de fin de flujo entre etapas
+_DONE = object()
+
+
+@dataclass
+class ProductImages:
+    product: Product
+    # (key, ext, bytes) de cada imagen descargada
+    images: List[Tuple[str, str, bytes]] = field(default_factory=list)
+
+
+@dataclass
+class StageStats:
+    name: str
+    workers: int
+    items_in: int = 0
+    items_out: int = 0
+    errors: int = 0
+    busy_seconds: float = 0.0
+    # Tiempo esperando trabajo de la etapa anterior (la etapa está subalimentada)
+    wait_input_seconds: float = 0.0
+    # Tiempo bloqueado porque la cola siguiente está llena (backpressure)
+    blocked_output_seconds: float = 0.0
+    max_queue_depth: int = 0
+
+    def summary(self, elapsed: float) -> dict:
+        capacity = max(elapsed * self.workers, 1e-9)
+        return {
+            "stage": self.name,
+            "workers": self.workers,
+            "items_in": self.items_in,
+            "items_out": self.items_out,
+            "errors": self.errors,
+            "items_per_sec": round(self.items_in / elapsed, 2) if elapsed else 0.0,
+            "utilization": round(self.busy_seconds / capacity, 3),
+            "wait_input_seconds": round(self.wait_input_seconds, 2),
+            "blocked_output_seconds": round(self.blocked_output_seconds, 2),
+            "max_input_queue_depth": self.max_queue_depth,
+        }
+
+
+class Stage:
+    """
+    Pool of worker threads reading from a bounded input queue and writing to
+    the next stage's queue.
+
+    Args:
+        name (str): Stage name used in the stats report.
+        fn (Callable): fn(item, emit) processes one item and calls emit(out)
+            for each output item.
+        workers (int): Number of worker threads.
+        inbox (queue.Queue): Bounded input queue.
+        outbox (queue.Queue, optional): Input queue of the next stage.
+        downstream_workers (int): Workers of the next stage, one end marker
+            is sent to each of them when this stage finishes.
+    """
+
+    def __init__(self, name: str, fn: Callable, workers: int, inbox: queue.Queue,
+                 outbox: Optional[queue.Queue] = None, downstream_workers: int = 0):
+        self.name = name
+        self.fn = fn
+        self.inbox = inbox
+        self.outbox = outbox
+        self.downstream_workers = downstream_workers
+        self.stats = StageStats(name, workers)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._alive = workers
+        self._threads = [
+            threading.Thread(target=self._work, name=f"{name}-{i}", daemon=True)
+            for i in range(workers)
+        ]
+
+    def start(self):
+        for thread in self._threads:
+            thread.start()
+
+    def join(self):
+        for thread in self._threads:
+            thread.join()
+
+    def _emit(self, item):
+        if self.outbox is None:
+            return
+        start = time.perf_counter()
+        self.outbox.put(item)
+        blocked = time.perf_counter() - start
+        self._local.blocked += blocked
+        with self._lock:
+            self.stats.blocked_output_seconds += blocked
+            self.stats.items_out += 1
+
+    def _work(self):
+        while True:
+            start = time.perf_counter()
+            depth = self.inbox.qsize()
+            item = self.inbox.get()
+            waited = time.perf_counter() - start
+            with self._lock:
+                self.stats.wait_input_seconds += waited
+                self.stats.max_queue_depth = max(self.stats.max_queue_depth, depth)
+            if item is _DONE:
+                break
+            self._local.blocked = 0.0
+            start = time.perf_counter()
+            try:
+                self.fn(item, self._emit)
+            except Exception as e:
+                with self._lock:
+                    self.stats.errors += 1
+                logger.error(f"❌ Error en etapa {self.name}: {e}")
+            busy = time.perf_counter() - start
+            with self._lock:
+                self.stats.items_in += 1
+                # El tiempo bloqueado en put no cuenta como trabajo útil
+                self.stats.busy_seconds += busy - self._local.blocked
+        with self._lock:
+            self._alive -= 1
+            last = self._alive == 0
+        if last and self.outbox is not None:
+            for _ in range(self.downstream_workers):
+                self.outbox.put(_DONE)
+
+
+def run_streaming(output_file: str, download_workers: int = 8, store_workers: int = 4,
+                  tag_workers: int = 4, queue_size: int = 32, max_products: Optional[int] = None,
+                  dataset_dir: Optional[str] = None):
+    """
+    Scrapes, stores and tags products as concurrent stages connected by
+    bounded queues. Image bytes travel in memory from the download stage to
+    the tagger, so nothing is re-downloaded from storage.
+
+    Args:
+        output_file (str): Local CSV where the labels are written.
+        download_workers (int): Threads downloading images from Disco.
+        store_workers (int): Threads uploading images and products to storage.
+        tag_workers (int): Threads calling the OpenAI tagger.
+        queue_size (int): Capacity of each queue between stages.
+        max_products (int, optional): Overrides WebPage.MaxProducts.
+        dataset_dir (str, optional): DatasetStore where products and labels
+            are also appended in batches as they flow through the pipeline.
+
+    Returns:
+        Tuple[str, List[dict]]: Output file and per-stage stats.
+    """
+    scraper = ProductScraper()
+    if max_products is not None:
+        scraper.max_products = max_products
+
+    product_appender = label_appender = None
+    if dataset_dir:
+        from utils.dataset_store import DatasetStore, BufferedAppender
+
+        dataset = DatasetStore(dataset_dir)
+        product_appender = BufferedAppender(dataset, "products")
+        label_appender = BufferedAppender(dataset, "labels")
+
+    to_download = queue.Queue(maxsize=queue_size)
+    to_store = queue.Queue(maxsize=queue_size)
+    to_tag = queue.Queue(maxsize=queue_size)
+    to_collect = queue.Queue(maxsize=queue_size)
+
+    # Una sesión HTTP por thread de descarga para reutilizar conexiones
+    sessions = threading.local()
+
+    def download(product, emit):
+        if not hasattr(sessions, "session"):
+            sessions.session = requests.Session()
+        item = ProductImages(product)
+        for img_url in product.images:
+            if not img_url:
+                continue
+            img_path, ext = scraper.image_key(product, img_url)
+            try:
+                item.images.append((img_path, ext, scraper.download_image(img_url, sessions.session)))
+            except Exception as e:
+                logger.error(f"Failed to download image {img_url}: {str(e)}")
+        emit(item)
+
+    def store(item, emit):
+        # Como en ProductScraper._save_product: una imagen que falla no
+        # impide guardar las demás ni el producto
+        for img_path, ext, img_data in item.images:
+            try:
+                scraper.store_image(img_path, img_data, ext)
+            except Exception as e:
+                logger.error(f"Failed to store image {img_path}: {str(e)}")
+                continue
+            emit((img_path, img_data))
+        scraper.store_product(item.product)
+        if product_appender is not None:
+            product_appender.add(item.product)
+
+    def tag(image, emit):
+        img_path, img_data = image
+        emit((img_path, clasificar_octogono(io.BytesIO(img_data))))
+
+    resultados = []
+
+    def collect(result, emit):
+        resultados.append(result)
+        if label_appender is not None:
+            label_appender.add(result)
+
+    stages = [
+        Stage("download", download, download_workers, to_download, to_store, store_workers),
+        Stage("store", store, store_workers, to_store, to_tag, tag_workers),
+        Stage("tag", tag, tag_workers, to_tag, to_collect, 1),
+        Stage("collect", collect, 1, to_collect),
+    ]
+    scrape_stats = StageStats("scrape", 1)
+
+    start = time.perf_counter()
+    for stage in stages:
+        stage.start()
+    try:
+        # El scraper corre en este thread: playwright sync no se comparte entre threads
+        for product in scraper.iter_products():
+            scrape_stats.items_in += 1
+            put_start = time.perf_counter()
+            to_download.put(product)
+            scrape_stats.blocked_output_seconds += time.perf_counter() - put_start
+            scrape_stats.items_out += 1
+    finally:
+        for _ in range(download_workers):
+            to_download.put(_DONE)
+        for stage in stages:
+            stage.join()
+    elapsed = time.perf_counter() - start
+    scrape_stats.busy_seconds = elapsed - scrape_stats.blocked_output_seconds
+
+    guardar_csv(resultados, output_file)
+    for appender in (product_appender, label_appender):
+        if appender is not None:
+            appender.flush()
+    stats = [scrape_stats.summary(elapsed)] + [stage.stats.summary(elapsed) for stage in stages]
+    logger.info(f"✅ Pipeline por etapas terminado en {elapsed:.1f}s. Resultados guardados en {output_file}")
+    for s in stats:
+        logger.info(
+            f"[{s['stage']}] {s['items_in']} items ({s['items_per_sec']}/s), errores: {s['errors']}, "
+            f"utilización: {s['utilization']:.0%}, espera de entrada: {s['wait_input_seconds']}s, "
+            f"bloqueado por backpressure: {s['blocked_output_seconds']}s, cola máx: {s['max_input_queue_depth']}"
+        )
+    return output_file, stats
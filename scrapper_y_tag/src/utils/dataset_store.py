@@ -0,0 +1,355 @@
+import csv
+import json
+import os
+import threading
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+from urllib.parse import quote
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+
+# Valor que usa pyarrow para las particiones hive con valor nulo
+NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("DatasetStore requires pyarrow: pip install pyarrow")
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def product_id_from_key(image_key: str) -> str:
+    """Product id from an image key like data/scraped_data/images/<id>/<file>"""
+    return Path(image_key).parent.name
+
+
+class DatasetStore:
+    """
+    Columnar store for scraped products and octagon labels.
+
+    Layout under `root`:
+        products/brand=<brand>/part-*.parquet   one row per product
+        labels/label=<label>/part-*.parquet     one row per image (image, product_id, label)
+        index/part-*.parquet                    product_id -> brand and file
+
+    Appends only add new part files, so the scraper and the tagger can write
+    incrementally; each product append also adds an index part with just its
+    own entries. Reads return the latest record per product id or image.
+    compact() rewrites each partition into a single deduplicated file and
+    the index into a single part.
+
+    Args:
+        root (str): Directory of the store.
+    """
+
+    def __init__(self, root: str):
+        _require_pyarrow()
+        self.root = Path(root)
+        self.products_dir = self.root / "products"
+        self.labels_dir = self.root / "labels"
+        self.index_dir = self.root / "index"
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def product_schema():
+        return pa.schema([
+            ("id", pa.string()),
+            ("name", pa.string()),
+            ("link", pa.string()),
+            ("price", pa.float64()),
+            ("brand", pa.string()),
+            ("images", pa.list_(pa.string())),
+            ("ingested_at", pa.timestamp("us", tz="UTC")),
+        ])
+
+    @staticmethod
+    def label_schema():
+        return pa.schema([
+            ("image", pa.string()),
+            ("product_id", pa.string()),
+            ("label", pa.string()),
+            ("ingested_at", pa.timestamp("us", tz="UTC")),
+        ])
+
+    # Escritura
+
+    def _write_partitions(self, table, base_dir: Path, column: str) -> List[tuple]:
+        """Writes one new part file per distinct value of `column`; returns (value, path) pairs"""
+        written = []
+        values = pc.unique(table.column(column)).to_pylist()
+        for value in values:
+            mask = pc.is_null(table.column(column)) if value is None else pc.equal(table.column(column), value)
+            part = table.filter(mask).select([name for name in table.column_names if name != column])
+            directory = base_dir / f"{column}={NULL_PARTITION if value is None else quote(value, safe='')}"
+            directory.mkdir(parents=True, exist_ok=True)
+            path = directory / f"part-{_now().strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}.parquet"
+            # Prefijo "." para que el dataset no tome el archivo a medio escribir
+            tmp = directory / f".{path.name}.tmp"
+            pq.write_table(part, tmp)
+            os.replace(tmp, path)
+            written.append((value, path))
+        return written
+
+    def append_products(self, products: Iterable) -> int:
+        """
+        Args:
+            products (Iterable[dict | Product]): Product records as scraped.
+
+        Returns:
+            int: Number of products written.
+        """
+        latest = {}
+        for product in products:
+            record = product.dict() if hasattr(product, "dict") else dict(product)
+            latest[record["id"]] = record
+        if not latest:
+            return 0
+        ingested_at = _now()
+        rows = [
+            {
+                "id": str(r["id"]),
+                "name": r.get("name"),
+                "link": r.get("link"),
+                "price": float(r["price"]) if r.get("price") is not None else None,
+                "brand": r.get("brand"),
+                "images": list(r.get("images") or []),
+                "ingested_at": ingested_at,
+            }
+            for r in latest.values()
+        ]
+        table = pa.Table.from_pylist(rows, schema=self.product_schema())
+        with self._lock:
+            written = self._write_partitions(table, self.products_dir, "brand")
+            self._update_index(table, written)
+        return len(rows)
+
+    def append_labels(self, labels: Iterable[Sequence[str]]) -> int:
+        """
+        Args:
+            labels (Iterable[Tuple[str, str]]): (image key, label) pairs, as in etiquetas_octogonos.csv.
+
+        Returns:
+            int: Number of labels written.
+        """
+        latest = {image: label for image, label in labels}
+        if not latest:
+            return 0
+        ingested_at = _now()
+        rows = [
+            {"image": image, "product_id": product_id_from_key(image), "label": label, "ingested_at": ingested_at}
+            for image, label in latest.items()
+        ]
+        table = pa.Table.from_pylist(rows, schema=self.label_schema())
+        with self._lock:
+            self._write_partitions(table, self.labels_dir, "label")
+        return len(rows)
+
+    def _update_index(self, table, written) -> Path:
+        """Writes the index entries of `table` as a new index part; returns its path"""
+        files = {value: str(path.relative_to(self.root)) for value, path in written}
+        entries = pa.table({
+            "product_id": table.column("id"),
+            "brand": table.column("brand"),
+            "file": pa.array([files[b] for b in table.column("brand").to_pylist()], pa.string()),
+            "ingested_at": table.column("ingested_at"),
+        })
+        # Sólo las entradas nuevas: el costo de un append no crece con el índice
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        path = self.index_dir / f"part-{_now().strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}.parquet"
+        tmp = self.index_dir / f".{path.name}.tmp"
+        pq.write_table(entries, tmp)
+        os.replace(tmp, path)
+        return path
+
+    # Lectura
+
+    @staticmethod
+    def _latest(table, key: str):
+        """Keeps the most recent row per key"""
+        if table.num_rows == 0:
+            return table
+        # Orden por clave y fecha descendente: la primera fila de cada clave es la más reciente
+        table = table.sort_by([(key, "ascending"), ("ingested_at", "descending")])
+        keys = table.column(key).combine_chunks()
+        first = pc.not_equal(keys[1:], keys[:-1])
+        mask = pa.concat_arrays([pa.array([True]), first])
+        return table.filter(mask)
+
+    def _dataset(self, directory: Path, column: str):
+        # Esquema explícito: sin él pyarrow infiere int para particiones con valores numéricos
+        partitioning = ds.partitioning(pa.schema([(column, pa.string())]), flavor="hive")
+        return ds.dataset(str(directory), format="parquet", partitioning=partitioning)
+
+    def products(self, brand: Optional[str] = None, ids: Optional[Sequence[str]] = None,
+                 columns: Optional[List[str]] = None):
+        """
+        Args:
+            brand (str, optional): Only products of this brand (reads a single partition).
+            ids (Sequence[str], optional): Only these product ids.
+            columns (List[str], optional): Columns to read (default: all).
+
+        Returns:
+            pyarrow.Table: Latest record per product.
+        """
+        if not self.products_dir.exists():
+            return self.product_schema().empty_table()
+        expression = None
+        if brand is not None:
+            expression = ds.field("brand") == brand
+        if ids is not None:
+            id_filter = ds.field("id").isin(list(ids))
+            expression = id_filter if expression is None else expression & id_filter
+        if columns is not None:
+            columns = list(dict.fromkeys(list(columns) + ["id", "ingested_at"]))
+        table = self._dataset(self.products_dir, "brand").to_table(columns=columns, filter=expression)
+        return self._latest(table, "id")
+
+    def get_product(self, product_id: str) -> Optional[Dict]:
+        """Looks the product up in the index and reads only the file that holds it"""
+        if not any(self.index_dir.glob("*.parquet")):
+            return None
+        index = ds.dataset(str(self.index_dir), format="parquet").to_table(filter=ds.field("product_id") == product_id)
+        if index.num_rows == 0:
+            return None
+        entry = self._latest(index, "product_id").to_pylist()[0]
+        rows = pq.read_table(self.root / entry["file"], filters=[("id", "=", product_id)]).to_pylist()
+        if not rows:
+            return None
+        record = max(rows, key=lambda r: r["ingested_at"])
+        record["brand"] = entry["brand"]
+        return record
+
+    def labels(self, label: Optional[str] = None):
+        """
+        Args:
+            label (str, optional): Only this label (reads a single partition).
+
+        Returns:
+            pyarrow.Table: Latest label per image (image, product_id, label, ingested_at).
+        """
+        if not self.labels_dir.exists():
+            return self.label_schema().empty_table()
+        expression = ds.field("label") == label if label is not None else None
+        table = self._dataset(self.labels_dir, "label").to_table(filter=expression)
+        return self._latest(table, "image")
+
+    def labeled_products(self, label: Optional[str] = None, brand: Optional[str] = None):
+        """
+        Labels joined with their product (brand, name, price), for the training
+        dataset builder.
+
+        Returns:
+            pyarrow.Table: image, label, product_id, name, brand, price.
+        """
+        labels = self.labels(label).select(["image", "product_id", "label"])
+        products = self.products(brand=brand, columns=["name", "brand", "price"])
+        products = products.select(["id", "name", "brand", "price"]).rename_columns(["product_id", "name", "brand", "price"])
+        join_type = "inner" if brand is not None else "left outer"
+        return labels.join(products, "product_id", join_type=join_type)
+
+    # Compactación
+
+    def compact(self) -> Dict[str, int]:
+        """
+        Rewrites every partition as a single file holding only the latest
+        record per key, and rebuilds the index from it.
+
+        Returns:
+            Dict[str, int]: Products and labels kept.
+        """
+        with self._lock:
+            products = self.products() if self.products_dir.exists() else None
+            labels = self.labels() if self.labels_dir.exists() else None
+            old_files = (
+                list(self.root.glob("products/*/part-*.parquet"))
+                + list(self.root.glob("labels/*/part-*.parquet"))
+                + list(self.index_dir.glob("*.parquet"))
+            )
+            kept = {"products": 0, "labels": 0}
+            if products is not None and products.num_rows:
+                products = products.select(self.product_schema().names).cast(self.product_schema())
+                written = self._write_partitions(products, self.products_dir, "brand")
+                self._update_index(products, written)
+                kept["products"] = products.num_rows
+            if labels is not None and labels.num_rows:
+                labels = labels.select(self.label_schema().names).cast(self.label_schema())
+                self._write_partitions(labels, self.labels_dir, "label")
+                kept["labels"] = labels.num_rows
+            # Los archivos nuevos ya están escritos; recién ahora se borran los viejos
+            for path in old_files:
+                path.unlink()
+        return kept
+
+    def import_legacy(self, products_dir: Optional[str] = None, labels_csv: Optional[str] = None) -> Dict[str, int]:
+        """
+        Loads the per-product JSONL files and etiquetas_octogonos.csv into the
+        store and compacts it.
+
+        Args:
+            products_dir (str, optional): Directory with <id>.jsonl files.
+            labels_csv (str, optional): CSV with columns image,label.
+
+        Returns:
+            Dict[str, int]: Products and labels kept after compaction.
+        """
+        if products_dir:
+            records = []
+            for path in sorted(Path(products_dir).glob("*.jsonl")):
+                with open(path, encoding="utf-8") as f:
+                    records.extend(json.loads(line) for line in f if line.strip())
+            self.append_products(records)
+        if labels_csv:
+            with open(labels_csv, newline="") as f:
+                self.append_labels((row["image"], row["label"]) for row in csv.DictReader(f))
+        return self.compact()
+
+
+class BufferedAppender:
+    """
+    Accumulates records from many threads and appends them to the store in
+    batches, so incremental writers do not produce one tiny file per item.
+
+    Args:
+        store (DatasetStore): Destination store.
+        kind (str): "products" or "labels".
+        batch_size (int): Records per part file.
+    """
+
+    def __init__(self, store: DatasetStore, kind: str, batch_size: int = 500):
+        self.store = store
+        self.kind = kind
+        self.batch_size = batch_size
+        self._buffer = []
+        self._lock = threading.Lock()
+
+    def add(self, record) -> None:
+        with self._lock:
+            self._buffer.append(record)
+            if len(self._buffer) < self.batch_size:
+                return
+            batch, self._buffer = self._buffer, []
+        self._write(batch)
+
+    def flush(self) -> None:
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+        self._write(batch)
+
+    def _write(self, batch) -> None:
+        if not batch:
+            return
+        if self.kind == "products":
+            self.store.append_products(batch)
+        else:
+            self.store.append_labels(batch)
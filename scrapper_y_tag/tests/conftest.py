@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Los módulos del pipeline se importan como en main.py, desde src/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
@@ -0,0 +1,51 @@
+"""
+Import-time report of pipeline.py per subcommand (src/scripts/import_time_report.py).
+Each lazy subcommand must skip the other stages' dependencies and start
+faster than the previous eager entry point. Run with -s to see the table.
+"""
+import pytest
+
+from scripts import import_time_report as report
+
+LAZY_SUBCOMMANDS = [name for name in report.SUBCOMMANDS if name != report.EAGER]
+REPEATS = 7
+
+
+def measure(name, cwd):
+    try:
+        return report.measure(report.SUBCOMMANDS[name], cwd=cwd)
+    except RuntimeError as e:
+        if "ModuleNotFoundError" in str(e):
+            pytest.skip(f"pipeline dependencies not installed: {e}")
+        raise
+
+
+def best_case(runs):
+    """Suma del mejor tiempo de cada import de primer nivel entre varias corridas"""
+    best = {}
+    for _, top_level, _ in runs:
+        for us, module in top_level:
+            best[module] = min(us, best.get(module, us))
+    return sum(best.values()), sorted(((us, module) for module, us in best.items()), reverse=True)
+
+
+@pytest.mark.parametrize("subcommand", LAZY_SUBCOMMANDS)
+def test_subcommand_import_time(subcommand, tmp_path):
+    # Corridas intercaladas con las del import eager; cada import se toma en
+    # su mejor corrida, así el ruido de uno pesado (openai varía más que lo
+    # que ahorra --tag) no decide la comparación
+    runs, eager_runs = [], []
+    for _ in range(REPEATS):
+        runs.append(measure(subcommand, tmp_path))
+        eager_runs.append(measure(report.EAGER, tmp_path))
+    total, heaviest = best_case(runs)
+    eager, _ = best_case(eager_runs)
+    print(f"\n{subcommand:<16} {total / 1000:>9.1f} ms  (eager {eager / 1000:.1f} ms, {eager / total:.1f}x)")
+    for us, module in heaviest[:5]:
+        print(f"{'':<18}{us / 1000:>8.1f} ms  {module}")
+
+    skipped = report.SKIPPED_DEPENDENCIES[subcommand]
+    for _, _, packages in runs:
+        assert not packages & set(skipped)
+    if skipped:
+        assert total < eager
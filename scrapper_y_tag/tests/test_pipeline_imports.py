@@ -0,0 +1,28 @@
+"""
+The pipeline CLI imports each stage's heavy dependencies inside the function
+that runs the stage. Importing it must not pull them in.
+"""
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+STAGE_DEPENDENCIES = ["boto3", "botocore", "playwright", "openai"]
+
+
+def test_pipeline_import_skips_stage_dependencies(tmp_path):
+    code = (
+        "import json, sys\n"
+        "import pipeline\n"
+        f"print(json.dumps([name for name in {STAGE_DEPENDENCIES!r} if name in sys.modules]))\n"
+    )
+    env = {**os.environ, "PYTHONPATH": str(SRC_DIR)}
+    # En un proceso aparte: en el de pytest otro test pudo haberlas importado.
+    # cwd temporal para que el logger no deje archivos en el repo
+    completed = subprocess.run(
+        [sys.executable, "-c", code], cwd=tmp_path, env=env, capture_output=True, text=True, timeout=60,
+    )
+    assert completed.returncode == 0, completed.stderr
+    assert json.loads(completed.stdout.strip().splitlines()[-1]) == []
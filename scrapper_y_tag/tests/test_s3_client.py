@@ -0,0 +1,128 @@
+"""
+Bulk prefix operations of S3Client (delete, copy and move) against moto's
+in-memory S3, with more objects than one listing page or delete request.
+"""
+import pytest
+
+pytest.importorskip("boto3")
+moto = pytest.importorskip("moto")
+
+import boto3
+from botocore.exceptions import ClientError
+
+from connectors.s3_client import DELETE_BATCH, S3Client
+
+BUCKET = "test-bucket"
+N_OBJECTS = DELETE_BATCH + 500
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.delenv("S3_ENDPOINT_URL", raising=False)
+    with moto.mock_aws():
+        boto3.client("s3", region_name="us-east-1").create_bucket(Bucket=BUCKET)
+        yield S3Client(bucket_name=BUCKET, region_name="us-east-1")
+
+
+def put_objects(s3, prefix, n, body=b"x" * 10):
+    keys = [f"{prefix}{i:05d}.jpg" for i in range(n)]
+    for key in keys:
+        s3.s3_client.put_object(Bucket=BUCKET, Key=key, Body=body)
+    return keys
+
+
+def keys_under(s3, prefix):
+    return set(s3.list_files(prefix))
+
+
+def spy(monkeypatch, s3, method, fail_keys=()):
+    """Registra las llamadas a un método del cliente boto3; falla con AccessDenied para fail_keys"""
+    calls = []
+    original = getattr(s3.s3_client, method)
+
+    def wrapper(**kwargs):
+        calls.append(kwargs)
+        key = kwargs.get("CopySource", {}).get("Key")
+        if key in fail_keys:
+            raise ClientError({"Error": {"Code": "AccessDenied", "Message": "denied"}}, method)
+        return original(**kwargs)
+
+    monkeypatch.setattr(s3.s3_client, method, wrapper)
+    return calls
+
+
+def test_delete_prefix_batches_and_paginates(s3, monkeypatch):
+    put_objects(s3, "data/tmp/", N_OBJECTS)
+    kept = put_objects(s3, "data/keep/", 3)
+    calls = spy(monkeypatch, s3, "delete_objects")
+
+    stats = s3.delete_prefix("data/tmp/", workers=4)
+
+    assert stats["listed"] == stats["done"] == N_OBJECTS
+    assert stats["failed"] == 0 and stats["errors"] == []
+    assert stats["bytes"] == 10 * N_OBJECTS
+    assert max(len(call["Delete"]["Objects"]) for call in calls) == DELETE_BATCH
+    assert sum(len(call["Delete"]["Objects"]) for call in calls) == N_OBJECTS
+    assert keys_under(s3, "data/tmp/") == set()
+    assert keys_under(s3, "data/keep/") == set(kept)
+
+
+def test_delete_prefix_dry_run_only_counts(s3):
+    keys = put_objects(s3, "data/tmp/", N_OBJECTS)
+
+    stats = s3.delete_prefix("data/tmp/", dry_run=True)
+
+    assert stats["listed"] == N_OBJECTS
+    assert stats["done"] == 0
+    assert stats["bytes"] == 10 * N_OBJECTS
+    assert keys_under(s3, "data/tmp/") == set(keys)
+
+
+def test_delete_prefix_refuses_empty_prefix(s3):
+    with pytest.raises(ValueError):
+        s3.delete_prefix("")
+
+
+@pytest.mark.parametrize("dest", ["images/", "images/backup/"])
+def test_copy_prefix_refuses_destination_inside_source(s3, dest):
+    with pytest.raises(ValueError):
+        s3.copy_prefix("images/", dest)
+
+
+def test_copy_prefix_keeps_source(s3):
+    keys = put_objects(s3, "images/", 5)
+
+    stats = s3.copy_prefix("images/", "backup/images/", batch_size=2)
+
+    assert stats["done"] == 5 and stats["failed"] == 0
+    assert keys_under(s3, "images/") == set(keys)
+    assert keys_under(s3, "backup/images/") == {"backup/" + key for key in keys}
+
+
+def test_move_prefix_deletes_only_copied_objects(s3, monkeypatch):
+    keys = put_objects(s3, "images/", N_OBJECTS)
+    failing = keys[1234]
+    spy(monkeypatch, s3, "copy_object", fail_keys={failing})
+
+    stats = s3.move_prefix("images/", "data/scraped_data/images/", workers=8)
+
+    assert stats["listed"] == N_OBJECTS
+    assert stats["done"] == N_OBJECTS - 1
+    assert stats["failed"] == 1 and stats["errors"][0]["Key"] == failing
+    # El que no se pudo copiar sigue en origen; el resto quedó sólo en destino
+    assert keys_under(s3, "images/") == {failing}
+    assert keys_under(s3, "data/scraped_data/images/") == {
+        "data/scraped_data/" + key for key in keys if key != failing
+    }
+
+
+def test_move_prefix_dry_run_only_counts(s3):
+    keys = put_objects(s3, "images/", 3)
+
+    stats = s3.move_prefix("images/", "archive/", dry_run=True)
+
+    assert stats["listed"] == 3 and stats["done"] == 0
+    assert keys_under(s3, "images/") == set(keys)
+    assert keys_under(s3, "archive/") == set()